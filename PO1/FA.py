@@ -7,6 +7,8 @@
 #   license.                                          #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
+import engine
+import multiprocessing
 import sys
 
 
@@ -14,6 +16,8 @@ class FA:
     """
     Finite Automaton (FA)
     """
+    __slots__ = ('states', 'final_states', 'verbose', 'input_alphabet',
+                 'start_state', 'current_state', 'compiled', 'profile')
 
     def __init__(self, Q, Sigma, delta, s, F, verbose=False):
         """
@@ -72,6 +76,59 @@ class FA:
         self.input_alphabet = Sigma
         self.start_state = self.states[s]
         self.current_state = self.start_state
+        self.compiled = None
+        self.profile = None
+
+    @classmethod
+    def cached(cls, Q, Sigma, delta, s, F, verbose=False,
+               cache_dir=None):
+        """
+        Creates the FA object like FA(Q, Sigma, delta, s, F, verbose), but
+        skips input sanitization if the same definition was validated before
+        by this process or stored in the cache directory
+        cache_dir: Directory of the disk cache, by default the directory in
+                   the AUTOMATA_CACHE_DIR environment variable. Without
+                   either, nothing is written to disk.
+        """
+        key = engine.definition_key('FA', Q, Sigma, delta, s, F)
+        cache_dir = engine.cache_directory(cache_dir)
+        tables = engine.read_tables(key, cache_dir)
+        if tables is not None:
+            return cls.from_tables(tables, verbose)
+
+        fa = cls(Q, Sigma, delta, s, F, verbose)
+        engine.write_tables(key, fa.get_tables(), cache_dir)
+        return fa
+
+    def get_tables(self):
+        """
+        Retrieve the validated FA as a tuple of built-in types (see cached)
+        """
+        return ([(state.name, state.transition_table)
+                 for state in self.states.values()],
+                list(self.input_alphabet), self.start_state.name,
+                [state.name for state in self.final_states])
+
+    @classmethod
+    def from_tables(cls, tables, verbose=False):
+        """
+        Create an FA from the tables of an FA that was validated before,
+        without performing input sanitization
+        """
+        state_tables, Sigma, s, F = tables
+
+        fa = cls.__new__(cls)
+        fa.states = {}
+        for state_name, transition_table in state_tables:
+            fa.states[state_name] = State(state_name, transition_table)
+        fa.final_states = [fa.states[state_name] for state_name in F]
+        fa.verbose = verbose
+        fa.input_alphabet = Sigma
+        fa.start_state = fa.states[s]
+        fa.current_state = fa.start_state
+        fa.compiled = None
+        fa.profile = None
+        return fa
 
     def transition(self, symbol):
         """
@@ -79,30 +136,327 @@ class FA:
         returns: True if succeeded, False otherwise
         """
 
+        state = self.current_state
         try:
-            self.current_state = self.states[
-                self.current_state.transition_table[symbol]]
-            return True
+            self.current_state = self.states[state.transition_table[symbol]]
 
         except KeyError:
+            if self.profile is not None:
+                self.count_reject(state)
             if self.verbose:
                 print("Warning: State \'" + self.current_state.name +
                       "\' has no transition for symbol \'" + symbol +
                       "\', transition could not be performed")
             return False
 
+        if self.profile is not None:
+            self.count_transition(state, symbol)
+        return True
+
+    def transition_all(self, symbols):
+        """
+        Try to follow the transitions for all 'symbols' from the current
+        state, stopping at the first transition that does not exist
+        returns: True if all transitions succeeded, False otherwise
+        """
+        if self.compiled is None or self.verbose or self.profile is not None:
+            for symbol in symbols:
+                if not self.transition(symbol):
+                    return False
+            return True
+
+        run, state_names, state_numbers = self.compiled
+        state, succeeded = run(symbols,
+                               state_numbers[self.current_state.name])
+        self.current_state = self.states[state_names[state]]
+        return succeeded
+
+    def transition_runs(self, runs):
+        """
+        Follow the transitions of a run-length compressed input (see
+        runs.py) like transition_all, without decompressing it. A block is
+        followed until the FA is in a state it was in after an earlier
+        repetition, after which the repetitions which would only go around
+        the same cycle again are skipped.
+        runs:    A list of (block, count) tuples, where a block is a tuple of
+                 symbols
+        returns: True if all transitions succeeded, False otherwise
+        """
+        for block, count in runs:
+            seen = {}
+            repetition = 0
+            while repetition < count:
+                if seen is not None:
+                    state = self.current_state.name
+                    if state in seen:
+                        cycle = repetition - seen[state]
+                        repetition = count - (count - repetition) % cycle
+                        seen = None
+                        continue
+                    seen[state] = repetition
+                if not self.transition_all(block):
+                    return False
+                repetition += 1
+        return True
+
+    def compile(self):
+        """
+        Create a compact, picklable representation of the FA, which is sent
+        to worker processes (see transition_all_parallel)
+        returns: A tuple (table, state names), where table[number] maps a
+                 symbol to the number of the next state
+        """
+        state_names = list(self.states)
+        state_numbers = dict((name, number)
+                             for number, name in enumerate(state_names))
+        table = [dict((symbol, state_numbers[next_state]) for
+                      symbol, next_state in
+                      self.states[name].transition_table.items())
+                 for name in state_names]
+        return table, state_names
+
+    def transition_all_parallel(self, symbols, workers=None, chunks=None):
+        """
+        Follow the transitions for all 'symbols' like transition_all, using
+        a pool of worker processes for a single long input. Every worker
+        summarizes a chunk of the input as a function from the state it
+        starts in to the state it ends in (see summarize), after which the
+        summaries are composed in order. Verbose and profiling FAs are run
+        sequentially.
+        symbols: A list of symbols
+        workers: The number of worker processes, defaults to the number of
+                 CPUs. With a single worker no processes are started.
+        chunks:  The number of chunks, defaults to four per worker
+        returns: True if all transitions succeeded, False otherwise
+        """
+        if self.verbose or self.profile is not None:
+            return self.transition_all(symbols)
+
+        table, state_names = self.compile()
+        if chunks is None:
+            chunks = 4 * (workers or multiprocessing.cpu_count())
+        size = max(1, -(-len(symbols) // chunks))
+        parts = [symbols[start:start + size]
+                 for start in range(0, len(symbols), size)]
+
+        if workers == 1:
+            summaries = [summarize(table, part) for part in parts]
+        else:
+            with multiprocessing.Pool(workers, _init_worker,
+                                      (table,)) as pool:
+                summaries = pool.map(_summarize_worker, parts, 1)
+
+        state = state_names.index(self.current_state.name)
+        succeeded = True
+        for summary in summaries:
+            state, succeeded = summary[state]
+            if not succeeded:
+                break
+        self.current_state = self.states[state_names[state]]
+        return succeeded
+
+    def compile_to_python(self):
+        """
+        Generate Python source code specialized for this FA, which follows
+        the transitions with if/elif chains over numbered states and inlined
+        symbols instead of dictionary lookups. The compiled code is used by
+        transition_all from then on.
+        returns: The generated source code
+        """
+        state_names = list(self.states)
+        state_numbers = dict((name, number)
+                             for number, name in enumerate(state_names))
+
+        lines = ["def run(symbols, state):",
+                 "    for symbol in symbols:"]
+        for number, name in enumerate(state_names):
+            lines.append("        " + ("if" if number == 0 else "elif") +
+                         " state == " + str(number) + ":")
+            keyword = "if"
+            for symbol, next_state in \
+                    self.states[name].transition_table.items():
+                lines.append("            " + keyword + " symbol == " +
+                             repr(symbol) + ":")
+                lines.append("                state = " +
+                             str(state_numbers[next_state]))
+                keyword = "elif"
+            if keyword == "if":
+                lines.append("            return state, False")
+            else:
+                lines.append("            else:")
+                lines.append("                return state, False")
+        lines.append("    return state, True")
+        source = "\n".join(lines) + "\n"
+
+        self.compiled = (engine.compile_function(source), state_names,
+                         state_numbers)
+        return source
+
+    def enable_profiling(self):
+        """
+        Start counting transitions per state and symbol and failed
+        transitions per state (see get_profile). Profiling is off by
+        default, in which case it costs a single check per transition.
+        """
+        self.profile = {'transitions': {}, 'rejects': {}}
+
+    def disable_profiling(self):
+        """
+        Stop profiling and discard the counters
+        """
+        self.profile = None
+
+    def get_profile(self):
+        """
+        Retrieve the profiling counters
+        returns: None if profiling is off, otherwise a dictionary with
+                 'transitions' (a dictionary from state name to a dictionary
+                 from symbol to count, ready for a heatmap) and 'rejects' (a
+                 dictionary from state name to the number of failed
+                 transitions)
+        """
+        return self.profile
+
+    def get_profile_prometheus(self):
+        """
+        Retrieve the profiling counters in the Prometheus text format
+        """
+        return engine.prometheus_text('FA', self.profile)
+
+    def count_transition(self, state, symbol):
+        """ Count a transition from 'state' for 'symbol' while profiling """
+        counts = self.profile['transitions'].setdefault(state.name, {})
+        counts[symbol] = counts.get(symbol, 0) + 1
+
+    def count_reject(self, state):
+        """ Count a failed transition from 'state' while profiling """
+        rejects = self.profile['rejects']
+        rejects[state.name] = rejects.get(state.name, 0) + 1
+
     def is_final(self):
         """
         Check whether the current state is a final state
         """
         return self.current_state in self.final_states
 
+    def get_configuration(self):
+        """
+        returns: The name of the current state, which set_configuration
+                 accepts to continue a run later
+        """
+        return self.current_state.name
+
+    def set_configuration(self, configuration):
+        """
+        Continue a run from a configuration returned by get_configuration
+        """
+        self.current_state = self.states[configuration]
+
     def reset(self):
         self.current_state = self.start_state
 
+    def cursor(self):
+        """
+        Start a separate run of the FA, see Cursor
+        returns: A Cursor in the start state
+        """
+        return Cursor(self)
+
+
+class Cursor:
+    """
+    A run of an FA which keeps only the current state. The cursors of an FA
+    use its states and compiled code without changing the FA itself, so one
+    FA can be shared by any number of runs at the same time, for example in
+    different threads. Compile the FA before handing out cursors; profiling
+    counters are shared by all its runs.
+    """
+    # Attributes of the machine used by the runs, which are taken when the
+    # cursor is created
+    shared = ('states', 'final_states', 'start_state', 'input_alphabet',
+              'verbose', 'compiled', 'profile')
+    __slots__ = shared + ('machine', 'current_state')
+
+    def __init__(self, machine):
+        self.machine = machine
+        for name in self.shared:
+            setattr(self, name, getattr(machine, name))
+        self.current_state = machine.start_state
+
+    transition = FA.transition
+    transition_all = FA.transition_all
+    transition_runs = FA.transition_runs
+    transition_all_parallel = FA.transition_all_parallel
+    compile = FA.compile
+    count_transition = FA.count_transition
+    count_reject = FA.count_reject
+    is_final = FA.is_final
+    get_configuration = FA.get_configuration
+    set_configuration = FA.set_configuration
+    reset = FA.reset
+
+
+def summarize(table, symbols):
+    """
+    Summarize a chunk of an input by running it from all states at once.
+    Runs that reach the same state are merged, so usually only a single run
+    is left after a few symbols.
+    table:   The table of a compiled FA (see FA.compile)
+    returns: A list which maps the number of a state to a tuple (state,
+             succeeded) as returned by the compiled run (see
+             FA.compile_to_python) starting in that state
+    """
+    summary = [None] * len(table)
+    runs = dict((state, [state]) for state in range(len(table)))
+    position = 0
+    length = len(symbols)
+    while len(runs) > 1 and position < length:
+        symbol = symbols[position]
+        next_runs = {}
+        for state, starts in runs.items():
+            next_state = table[state].get(symbol)
+            if next_state is None:
+                for start in starts:
+                    summary[start] = (state, False)
+            elif next_state in next_runs:
+                next_runs[next_state] += starts
+            else:
+                next_runs[next_state] = starts
+        runs = next_runs
+        position += 1
+
+    # A single run is left, which does not need to track the start states
+    for state, starts in runs.items():
+        succeeded = True
+        while position < length:
+            next_state = table[state].get(symbols[position])
+            if next_state is None:
+                succeeded = False
+                break
+            state = next_state
+            position += 1
+        for start in starts:
+            summary[start] = (state, succeeded)
+    return summary
+
+
+# The table of the FA of a transition_all_parallel worker process, set once
+# by _init_worker
+_worker_table = None
+
+
+def _init_worker(table):
+    global _worker_table
+    _worker_table = table
+
+
+def _summarize_worker(symbols):
+    return summarize(_worker_table, symbols)
+
 
 class State:
     """State in a Finite Automaton (FA)"""
+    __slots__ = ('name', 'transition_table')
 
     def __init__(self, name, transition_table):
         """
@@ -0,0 +1,163 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from collections import OrderedDict
+import sys
+
+
+class NFA:
+    """
+    Nondeterministic Finite Automaton (NFA), which is determinized lazily:
+    the subsets of states (DFA states) are only constructed when a run
+    reaches them, and kept in a bounded cache.
+    """
+    __slots__ = ('transitions', 'verbose', 'input_alphabet', 'final_states',
+                 'cache_size', 'cache', 'closures', 'start_state',
+                 'current_state')
+
+    def __init__(self, Q, Sigma, delta, s, F, verbose=False,
+                 cache_size=4096):
+        """
+        Creates the NFA object and performs input sanitization
+        Q:       The finite set of states (list or set of strings)
+        Sigma:   The input alphabet (list of set of strings)
+        delta:   The transition function (dictionary of dictionaries), where
+                 a symbol maps to a single state or to a list or set of
+                 states. The symbol 'ϵ' is used for ϵ-moves.
+        s:       The start state (string)
+        F:       The finite set of final states (list or set of strings)
+        verbose: Indicator specifying whether a warning should be printed if
+                 the NFA attempts a transition which leads to no state
+        cache_size: The maximum number of DFA transitions that are kept
+        """
+
+        # Verify proper use of states
+        if len(Q) != len(set(Q)):
+            sys.exit("StateError: Q contains duplicates")
+
+        if s not in Q:
+            sys.exit("StateError: Starting state \'" + s + "\' not in Q")
+
+        for state in F:
+            if state not in Q:
+                sys.exit("StateError: Final state \'" + state + "\' not in Q")
+
+        # Verify proper use of transitions
+        self.transitions = {}
+        for state in delta:
+            if state not in Q:
+                sys.exit("TransitionError: State \'" + state + "\' not in Q")
+
+            self.transitions[state] = {}
+            for symbol, next_states in delta[state].items():
+                if symbol not in Sigma and symbol != 'ϵ':
+                    sys.exit("TransitionError: Symbol \'" + symbol +
+                             "\' for state \'" + state + "\' not in Sigma")
+                if isinstance(next_states, str):
+                    next_states = [next_states]
+                for next_state in next_states:
+                    if next_state not in Q:
+                        sys.exit("TransitionError: State \'" + next_state +
+                                 "\' for symbol \'" + symbol +
+                                 "\' and state \'" + state + "\' not in Q")
+                self.transitions[state][symbol] = frozenset(next_states)
+
+        # Retain and assign variables
+        self.verbose = verbose
+        self.input_alphabet = Sigma
+        self.final_states = frozenset(F)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.closures = {}
+        self.start_state = self.closure(frozenset([s]))
+        self.current_state = self.start_state
+
+    def closure(self, states):
+        """
+        Determine the ϵ-closure of a set of states
+        states: A frozenset of state names
+        returns: A frozenset of all states reachable using only ϵ-moves
+        """
+        if states in self.closures:
+            return self.closures[states]
+
+        result = set(states)
+        todo = list(states)
+        while todo:
+            state = todo.pop()
+            for next_state in self.transitions.get(state, {}).get('ϵ', ()):
+                if next_state not in result:
+                    result.add(next_state)
+                    todo.append(next_state)
+
+        result = frozenset(result)
+        if len(self.closures) < self.cache_size:
+            self.closures[states] = result
+        return result
+
+    def step(self, states, symbol):
+        """
+        Determine the DFA state reached from 'states' with 'symbol', using
+        the cache of DFA transitions if possible
+        returns: A frozenset of states, which is empty if there is no
+                 transition
+        """
+        key = (states, symbol)
+        try:
+            next_states = self.cache[key]
+            self.cache.move_to_end(key)
+            return next_states
+        except KeyError:
+            pass
+
+        targets = set()
+        for state in states:
+            targets.update(self.transitions.get(state, {}).get(symbol, ()))
+        next_states = self.closure(frozenset(targets))
+
+        self.cache[key] = next_states
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return next_states
+
+    def transition(self, symbol):
+        """
+        Try to follow the transition 'symbol' from the current states
+        returns: True if succeeded, False otherwise
+        """
+        next_states = self.step(self.current_state, symbol)
+        if not next_states:
+            if self.verbose:
+                print("Warning: States " + str(sorted(self.current_state)) +
+                      " have no transition for symbol \'" + symbol +
+                      "\', transition could not be performed")
+            return False
+
+        self.current_state = next_states
+        return True
+
+    def transition_all(self, symbols):
+        """
+        Try to follow the transitions for all 'symbols' from the current
+        states, stopping at the first transition that does not exist
+        returns: True if all transitions succeeded, False otherwise
+        """
+        for symbol in symbols:
+            if not self.transition(symbol):
+                return False
+        return True
+
+    def is_final(self):
+        """
+        Check whether one of the current states is a final state
+        """
+        return not self.final_states.isdisjoint(self.current_state)
+
+    def reset(self):
+        self.current_state = self.start_state
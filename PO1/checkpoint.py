@@ -0,0 +1,138 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Checkpoints for append-only log files. After a program has processed a
+file, it stores the byte offset up to which it did so together with the
+state it was in there, such as the configuration of an automaton and the
+text of a lexeme which may continue in the next part of the file. The next
+run continues from the checkpoint and only reads what was appended since.
+A checkpoint is only used if the file still starts with the same bytes, so
+a file which was truncated or replaced is processed from the start again.
+"""
+
+import codecs
+import hashlib
+import marshal
+import os
+
+
+# Directory in which checkpoints are stored
+CHECKPOINT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'automata',
+                              'checkpoints')
+
+# Number of bytes at the start of a file and before the offset which are
+# compared to recognize the file
+FINGERPRINT_SIZE = 4096
+
+
+def fingerprint(f, offset):
+    """
+    Hash of the first bytes of an open (binary) file and of the bytes before
+    'offset'
+    """
+    f.seek(0)
+    head = f.read(min(offset, FINGERPRINT_SIZE))
+    start = max(0, offset - FINGERPRINT_SIZE)
+    f.seek(start)
+    tail = f.read(offset - start)
+    return hashlib.blake2b(head + tail, digest_size=16).digest()
+
+
+class CheckpointStore:
+    """
+    Checkpoints by file and by the name of the program processing it, so
+    that several programs can follow the same file
+    """
+    __slots__ = ('directory',)
+
+    def __init__(self, directory=CHECKPOINT_DIR):
+        self.directory = directory
+
+    def path(self, path, name):
+        """
+        The file in which the checkpoint of 'name' for 'path' is stored
+        """
+        key = hashlib.sha256(repr((os.path.abspath(path), name)).encode(
+            'utf-8')).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def load(self, path, name):
+        """
+        Look up the checkpoint of 'name' for the file at 'path'
+        returns: A tuple (offset, state), or (0, None) if there is no
+                 checkpoint or the file changed other than by appending
+        """
+        try:
+            with open(self.path(path, name), 'rb') as f:
+                offset, checksum, state = marshal.load(f)
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < offset or \
+                        fingerprint(f, offset) != checksum:
+                    return 0, None
+        except (OSError, ValueError, EOFError, TypeError):
+            return 0, None
+        return offset, state
+
+    def save(self, path, name, offset, state=None):
+        """
+        Store a checkpoint. The file is written under a temporary name
+        first, so that a run which is interrupted leaves the previous
+        checkpoint intact.
+        offset:  The number of bytes of the file that were processed
+        state:   Anything marshal can write, describing where the program was
+                 at 'offset'
+        """
+        with open(path, 'rb') as f:
+            checksum = fingerprint(f, offset)
+        os.makedirs(self.directory, exist_ok=True)
+        checkpoint_path = self.path(path, name)
+        temporary_path = checkpoint_path + '.' + str(os.getpid())
+        with open(temporary_path, 'wb') as f:
+            marshal.dump((offset, checksum, state), f)
+        os.replace(temporary_path, checkpoint_path)
+
+
+def read_from(path, offset, end=None):
+    """
+    Read the part of a file from 'offset' up to 'end' (or the end of the
+    file)
+    returns: The bytes that were read
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return f.read() if end is None else f.read(end - offset)
+
+
+def split_lines(data, final=True):
+    """
+    Split bytes read from a file into lines
+    final:   Indicator of whether the data ends at the end of the file for
+             good. If not, a last line without a newline may still be
+             continued, and is returned separately.
+    returns: A tuple (lines, rest), where lines is a list of complete lines
+             without newlines and rest are the bytes of the unfinished line
+    """
+    lines = data.split(b'\n')
+    rest = lines.pop()
+    if final and rest:
+        lines.append(rest)
+        rest = b''
+    return lines, rest
+
+
+def decode_prefix(data):
+    """
+    Decode UTF-8 bytes which may end in the middle of a character
+    returns: A tuple (text, length), where length is the number of bytes
+             that were decoded
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    text = decoder.decode(data)
+    return text, len(data) - len(decoder.getstate()[0])
@@ -0,0 +1,151 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Code shared by the FA, PDA and TM engines: the cache of validated automata
+(see FA.cached, PDA.cached and TM.cached), the compilation of the code they
+generate (see compile_to_python) and the format of their profiling counters
+(see get_profile_prometheus).
+The PDA and TM modules use this module if PO1 is on the import path. PO2 and
+PO3 also work on their own, but then every automaton is validated each time
+it is created, compiled code is not shared and there is no Prometheus
+format.
+"""
+
+import hashlib
+import marshal
+import mmap
+import os
+
+
+# Version of the layout of the cached tables. Changing get_tables or
+# from_tables of an engine requires a new version, so that tables written by
+# an older version are not read.
+CACHE_VERSION = 1
+
+# Environment variable naming the directory in which validated automata are
+# cached. Without it (and without a directory passed to cached) nothing is
+# written to disk.
+CACHE_VARIABLE = 'AUTOMATA_CACHE_DIR'
+
+# Tables of cached automata that were already read or created by this
+# process
+loaded_tables = {}
+
+
+def cache_directory(cache_dir=None):
+    """
+    The directory of the disk cache: 'cache_dir' if given, otherwise the
+    directory named by the environment variable, or None for no disk cache
+    """
+    if cache_dir is not None:
+        return cache_dir
+    return os.environ.get(CACHE_VARIABLE) or None
+
+
+def definition_key(*definition):
+    """
+    Hash of an automaton definition and the version of the table layout,
+    used as the name of its cache file
+    """
+    return hashlib.sha256(repr((CACHE_VERSION,) + definition).encode(
+        'utf-8')).hexdigest()
+
+
+def read_tables(key, cache_dir):
+    """
+    Read the tables of a validated automaton from the cache
+    cache_dir: The directory of the disk cache, or None to only look at the
+               tables of this process
+    returns:   The tables, or None if the automaton is not cached
+    """
+    if key in loaded_tables:
+        return loaded_tables[key]
+    if cache_dir is None:
+        return None
+
+    path = os.path.join(cache_dir, key)
+    try:
+        with open(path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            tables = marshal.loads(m)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+
+    loaded_tables[key] = tables
+    return tables
+
+
+def write_tables(key, tables, cache_dir):
+    """
+    Write the tables of a validated automaton to the cache. The file is
+    written under a temporary name first, so that concurrent readers never
+    see a partial file.
+    cache_dir: The directory of the disk cache, or None to only keep the
+               tables in this process
+    """
+    loaded_tables[key] = tables
+    if cache_dir is None:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, key)
+        temporary_path = path + '.' + str(os.getpid())
+        with open(temporary_path, 'wb') as f:
+            marshal.dump(tables, f)
+        os.replace(temporary_path, path)
+    except OSError:
+        # The cache is only an optimization
+        pass
+
+
+# Functions generated by compile_to_python, by their source code
+compiled_functions = {}
+
+
+def compile_function(source):
+    """
+    Compile generated source code defining a function 'run', reusing the
+    function if the same source was compiled before
+    """
+    if source not in compiled_functions:
+        namespace = {}
+        exec(compile(source, '<compiled automaton>', 'exec'), namespace)
+        compiled_functions[source] = namespace['run']
+    return compiled_functions[source]
+
+
+def prometheus_text(machine, profile):
+    """
+    Format profiling counters (see get_profile) in the Prometheus text
+    exposition format
+    machine: Name of the machine, used as the 'machine' label
+    """
+    def label(value):
+        return '"' + str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n') + '"'
+
+    machine_label = 'machine=' + label(machine)
+    lines = ['# TYPE automaton_transitions_total counter']
+    for state, counts in profile['transitions'].items():
+        for symbol, count in counts.items():
+            lines.append('automaton_transitions_total{' + machine_label +
+                         ',state=' + label(state) + ',symbol=' +
+                         label(symbol) + '} ' + str(count))
+    if 'rejects' in profile:
+        lines.append('# TYPE automaton_rejects_total counter')
+        for state, count in profile['rejects'].items():
+            lines.append('automaton_rejects_total{' + machine_label +
+                         ',state=' + label(state) + '} ' + str(count))
+    for name, value in profile.items():
+        if name not in ('transitions', 'rejects'):
+            lines.append('# TYPE automaton_' + name + ' gauge')
+            lines.append('automaton_' + name + '{' + machine_label + '} ' +
+                         str(value))
+    return '\n'.join(lines) + '\n'
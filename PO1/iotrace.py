@@ -14,6 +14,9 @@ for a single file.
 """
 
 from FA import FA
+import checkpoint
+import engine
+import sys
 
 
 def create_fa():
@@ -34,7 +37,8 @@ def create_fa():
     s = 'START'
     F = ['ERROR']
 
-    M = FA(Q, Sigma, delta, s, F, verbose=False)
+    M = FA.cached(Q, Sigma, delta, s, F, verbose=False)
+    M.compile_to_python()
 
     return M
 
@@ -56,15 +60,58 @@ def verify_fileio(fa, trace):
     It also returns False if the trace if the input is incorrect.
     """
     fa.reset()
-    for i in range(len(trace)):
-        if(fa.transition(trace[i]) == False):
-            return False
+    if(fa.transition_all(trace) == False):
+        return False
     if(fa.is_final() == False):
         return True
     else:
         return False
 
 
+def verify_log(fa, path, checkpoints=None):
+    """
+    Verify proper file handling for a log file of syscalls separated by
+    whitespace, which may still grow
+    fa:      The finite automaton
+    checkpoints: A checkpoint.CheckpointStore, with which the FA continues
+             from where the previous call for the same file stopped, so
+             only the syscalls appended since are read
+    returns: See verify_fileio, for the whole log
+    """
+    name = 'iotrace ' + engine.definition_key(fa.get_tables())
+    offset, state = 0, None
+    if checkpoints is not None:
+        offset, state = checkpoints.load(path, name)
+
+    fa.reset()
+    configuration, pending = state or (fa.get_configuration(), '')
+    if configuration is not None:
+        fa.set_configuration(configuration)
+
+    text, length = checkpoint.decode_prefix(checkpoint.read_from(path,
+                                                                 offset))
+    text = pending + text
+    syscalls = text.split()
+
+    # The last syscall may still be continued, unless it is followed by
+    # whitespace
+    pending = ''
+    if syscalls and not text[-1].isspace():
+        pending = syscalls.pop()
+    if configuration is not None and not fa.transition_all(syscalls):
+        configuration = None
+    elif configuration is not None:
+        configuration = fa.get_configuration()
+
+    if checkpoints is not None:
+        checkpoints.save(path, name, offset + length,
+                         (configuration, pending))
+
+    if configuration is None or pending and not fa.transition(pending):
+        return False
+    return not fa.is_final()
+
+
 def main():
     """
     Create the FA and perform verification of a test trace
@@ -77,4 +124,11 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    arguments = [argument for argument in sys.argv[1:]
+                 if argument != '--resume']
+    if arguments:
+        print("Proper file handling: " + str(verify_log(
+            create_fa(), arguments[0], checkpoint.CheckpointStore()
+            if '--resume' in sys.argv else None)))
+    else:
+        main()
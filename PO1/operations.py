@@ -0,0 +1,271 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Operations on finite automata (FA and NFA) which never construct the full
+product automaton: lazy products, equivalence checking and inclusion
+checking. Internally both kinds of automata are run on sets of states, where
+the empty set is the (implicit) dead state.
+"""
+
+from collections import deque
+from FA import FA
+import sys
+
+
+OPERATIONS = {'intersection': lambda first, second: first and second,
+              'union': lambda first, second: first or second,
+              'difference': lambda first, second: first and not second}
+
+
+def start_states(machine):
+    """
+    The set of states a machine (FA or NFA) starts in
+    """
+    if isinstance(machine, FA):
+        return frozenset([machine.start_state.name])
+    return machine.start_state
+
+
+def next_states(machine, states, symbol):
+    """
+    The set of states a machine (FA or NFA) can be in after reading 'symbol'
+    in one of 'states'
+    """
+    if isinstance(machine, FA):
+        result = []
+        for state in states:
+            table = machine.states[state].transition_table
+            if symbol in table:
+                result.append(table[symbol])
+        return frozenset(result)
+    return machine.step(states, symbol)
+
+
+def final_states(machine):
+    """
+    The set of names of the final states of a machine (FA or NFA)
+    """
+    if isinstance(machine, FA):
+        return frozenset(state.name for state in machine.final_states)
+    return machine.final_states
+
+
+def alphabet(first, second):
+    """
+    The union of the input alphabets of two machines, in a fixed order
+    """
+    symbols = list(first.input_alphabet)
+    symbols += [symbol for symbol in second.input_alphabet
+                if symbol not in symbols]
+    return symbols
+
+
+class ProductFA:
+    """
+    Lazy product of two automata (FA or NFA). Only the pair of current states
+    is kept, the product states are never constructed up front.
+    """
+    __slots__ = ('first', 'second', 'operation', 'combine', 'verbose',
+                 'input_alphabet', 'first_final', 'second_final',
+                 'start_state', 'current_state')
+
+    def __init__(self, first, second, operation='intersection',
+                 verbose=False):
+        """
+        first, second: The automata to combine
+        operation:     'intersection', 'union' or 'difference' (accept what
+                       'first' accepts and 'second' does not)
+        verbose:       Indicator specifying whether a warning should be
+                       printed if both automata have no transition
+        """
+        if operation not in OPERATIONS:
+            sys.exit("OperationError: Operation \'" + operation +
+                     "\' should be \'intersection\', \'union\' or" +
+                     " \'difference\'")
+
+        self.first = first
+        self.second = second
+        self.operation = operation
+        self.combine = OPERATIONS[operation]
+        self.verbose = verbose
+        self.input_alphabet = alphabet(first, second)
+        self.first_final = final_states(first)
+        self.second_final = final_states(second)
+        self.start_state = (start_states(first), start_states(second))
+        self.current_state = self.start_state
+
+    def transition(self, symbol):
+        """
+        Follow the transition 'symbol' in both automata
+        returns: True if at least one of the automata could follow it, False
+                 otherwise
+        """
+        first_states, second_states = self.current_state
+        first_states = next_states(self.first, first_states, symbol)
+        second_states = next_states(self.second, second_states, symbol)
+        self.current_state = (first_states, second_states)
+
+        if not first_states and not second_states:
+            if self.verbose:
+                print("Warning: Neither automaton has a transition for" +
+                      " symbol \'" + symbol + "\'")
+            return False
+        return True
+
+    def transition_all(self, symbols):
+        """
+        Follow the transitions for all 'symbols', stopping as soon as neither
+        automaton has a transition
+        returns: True if all transitions succeeded, False otherwise
+        """
+        for symbol in symbols:
+            if not self.transition(symbol):
+                return False
+        return True
+
+    def is_final(self):
+        """
+        Check whether the current pair of states is final for the operation
+        """
+        first_states, second_states = self.current_state
+        return self.combine(
+            not self.first_final.isdisjoint(first_states),
+            not self.second_final.isdisjoint(second_states))
+
+    def reset(self):
+        self.current_state = self.start_state
+
+
+def counterexample(first, second):
+    """
+    Checks whether two automata (FA or NFA) accept the same language, using
+    the union-find algorithm of Hopcroft and Karp: pairs of states that are
+    already known to be equivalent (possibly through other pairs) are not
+    explored again.
+    returns: A list of symbols accepted by exactly one of the automata, or
+             None if they are equivalent
+    """
+    symbols = alphabet(first, second)
+    first_final = final_states(first)
+    second_final = final_states(second)
+
+    # Union-find over the (tagged) sets of states of both automata
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    start = (start_states(first), start_states(second))
+    paths = {start: None}
+    queue = deque([start])
+    parent[find((1, start[0]))] = find((2, start[1]))
+    while queue:
+        pair = queue.popleft()
+        first_states, second_states = pair
+        if first_final.isdisjoint(first_states) != \
+                second_final.isdisjoint(second_states):
+            word = []
+            while paths[pair] is not None:
+                pair, symbol = paths[pair]
+                word.append(symbol)
+            return word[::-1]
+
+        for symbol in symbols:
+            next_pair = (next_states(first, first_states, symbol),
+                         next_states(second, second_states, symbol))
+            first_root = find((1, next_pair[0]))
+            second_root = find((2, next_pair[1]))
+            if first_root != second_root:
+                parent[first_root] = second_root
+                paths[next_pair] = (pair, symbol)
+                queue.append(next_pair)
+
+    return None
+
+
+def equivalent(first, second):
+    """
+    Check whether two automata (FA or NFA) accept the same language
+    """
+    return counterexample(first, second) is None
+
+
+def inclusion_counterexample(first, second):
+    """
+    Checks whether every input accepted by 'first' is accepted by 'second'
+    (both FA or NFA), using antichains: the second automaton is determinized
+    on the fly, and a pair (state, set of states) is not explored if a pair
+    with the same state and a subset of the states was explored already,
+    since any input rejected from the larger set is also rejected from the
+    smaller one.
+    returns: A shortest list of symbols accepted by 'first' but not by
+             'second', or None if the language of 'first' is included in that
+             of 'second'
+    """
+    symbols = alphabet(first, second)
+    first_final = final_states(first)
+    second_final = final_states(second)
+
+    # For every state of 'first' the minimal sets of states of 'second'
+    antichain = {}
+
+    def covered(state, states):
+        for other in antichain.get(state, ()):
+            if other <= states:
+                return True
+        return False
+
+    def add(state, states):
+        minimal = [other for other in antichain.get(state, ())
+                   if not states <= other]
+        minimal.append(states)
+        antichain[state] = minimal
+
+    queue = deque()
+    paths = {}
+    second_start = start_states(second)
+    for state in start_states(first):
+        pair = (state, second_start)
+        if not covered(*pair):
+            add(*pair)
+            paths[pair] = None
+            queue.append(pair)
+
+    while queue:
+        pair = queue.popleft()
+        state, states = pair
+        if state in first_final and second_final.isdisjoint(states):
+            word = []
+            while paths[pair] is not None:
+                pair, symbol = paths[pair]
+                word.append(symbol)
+            return word[::-1]
+
+        for symbol in symbols:
+            successors = next_states(second, states, symbol)
+            for next_state in next_states(first, frozenset([state]), symbol):
+                next_pair = (next_state, successors)
+                if not covered(*next_pair):
+                    add(*next_pair)
+                    paths[next_pair] = (pair, symbol)
+                    queue.append(next_pair)
+
+    return None
+
+
+def is_included(first, second):
+    """
+    Check whether every input accepted by 'first' is accepted by 'second'
+    """
+    return inclusion_counterexample(first, second) is None
@@ -0,0 +1,353 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Compiles regular expressions to minimized finite automata (FA), and lists of
+(token name, regular expression) rules to longest-match lexers.
+Supported syntax: concatenation, alternation 'a|b', repetition 'a*', 'a+',
+optional 'a?', grouping '(a)', character classes '[a-z0-9_]' and escaping
+special characters with a backslash, e.g. '\\+'.
+"""
+
+from FA import FA
+import sys
+
+
+SPECIAL_CHARACTERS = '|*+?()[]\\'
+
+
+def parse(pattern):
+    """
+    Parses a regular expression
+    pattern: A string
+    returns: A syntax tree of tuples: ('symbols', set of characters),
+             ('concat', left, right), ('union', left, right), ('star', tree),
+             ('plus', tree), ('optional', tree) or ('empty',)
+    """
+    position = 0
+
+    def error(message):
+        sys.exit("RegexError: " + message + " at position " +
+                 str(position) + " in \'" + pattern + "\'")
+
+    def peek():
+        return pattern[position] if position < len(pattern) else None
+
+    def parse_union():
+        nonlocal position
+        tree = parse_concat()
+        while peek() == '|':
+            position += 1
+            tree = ('union', tree, parse_concat())
+        return tree
+
+    def parse_concat():
+        tree = ('empty',)
+        while peek() is not None and peek() not in '|)':
+            repeated = parse_repeat()
+            tree = repeated if tree == ('empty',) else \
+                ('concat', tree, repeated)
+        return tree
+
+    def parse_repeat():
+        nonlocal position
+        tree = parse_atom()
+        while peek() is not None and peek() in '*+?':
+            operator = {'*': 'star', '+': 'plus', '?': 'optional'}[peek()]
+            tree = (operator, tree)
+            position += 1
+        return tree
+
+    def parse_atom():
+        nonlocal position
+        char = peek()
+        position += 1
+        if char == '(':
+            tree = parse_union()
+            if peek() != ')':
+                error("Missing \')\'")
+            position += 1
+            return tree
+        if char == '[':
+            return ('symbols', parse_class())
+        if char == '\\':
+            if peek() is None:
+                error("Trailing backslash")
+            position += 1
+            return ('symbols', frozenset(pattern[position - 1]))
+        if char in SPECIAL_CHARACTERS:
+            error("Unexpected \'" + char + "\'")
+        return ('symbols', frozenset(char))
+
+    def parse_class():
+        nonlocal position
+        symbols = set()
+        while peek() != ']':
+            if peek() is None:
+                error("Missing \']\'")
+            char = peek()
+            if char == '\\':
+                position += 1
+                char = peek()
+                if char is None:
+                    error("Trailing backslash")
+            position += 1
+            if peek() == '-' and position + 1 < len(pattern) and \
+                    pattern[position + 1] != ']':
+                last = pattern[position + 1]
+                position += 2
+                if ord(last) < ord(char):
+                    error("Empty range \'" + char + "-" + last + "\'")
+                symbols.update(chr(code) for code in
+                               range(ord(char), ord(last) + 1))
+            else:
+                symbols.add(char)
+        position += 1
+        if not symbols:
+            error("Empty character class")
+        return frozenset(symbols)
+
+    tree = parse_union()
+    if position != len(pattern):
+        error("Unexpected \'" + pattern[position] + "\'")
+    return tree
+
+
+def thompson(tree, moves, epsilons):
+    """
+    Adds the Thompson construction of a syntax tree (see parse) to an NFA,
+    where moves[state] maps a character to a list of states and
+    epsilons[state] lists the ϵ-moves of a state
+    returns: The start and end state of the constructed fragment
+    """
+    def new_state():
+        moves.append({})
+        epsilons.append([])
+        return len(moves) - 1
+
+    start = new_state()
+    end = new_state()
+    kind = tree[0]
+    if kind == 'empty':
+        epsilons[start].append(end)
+    elif kind == 'symbols':
+        for char in tree[1]:
+            moves[start].setdefault(char, []).append(end)
+    elif kind == 'concat':
+        left_start, left_end = thompson(tree[1], moves, epsilons)
+        right_start, right_end = thompson(tree[2], moves, epsilons)
+        epsilons[start].append(left_start)
+        epsilons[left_end].append(right_start)
+        epsilons[right_end].append(end)
+    elif kind == 'union':
+        for branch in tree[1:]:
+            branch_start, branch_end = thompson(branch, moves, epsilons)
+            epsilons[start].append(branch_start)
+            epsilons[branch_end].append(end)
+    else:
+        inner_start, inner_end = thompson(tree[1], moves, epsilons)
+        epsilons[start].append(inner_start)
+        epsilons[inner_end].append(end)
+        if kind in ('star', 'plus'):
+            epsilons[inner_end].append(inner_start)
+        if kind in ('star', 'optional'):
+            epsilons[start].append(end)
+    return start, end
+
+
+def determinize(moves, epsilons, start, labels):
+    """
+    Subset construction of a DFA from an NFA (see thompson)
+    labels:  Dictionary from the accepting NFA states to their label, where
+             a lower label takes priority
+    returns: A tuple (transitions, accepting), where transitions[state] maps
+             a character to a DFA state, accepting[state] is the label of
+             the DFA state (or None) and state 0 is the start state
+    """
+    def closure(states):
+        result = set(states)
+        todo = list(states)
+        while todo:
+            for next_state in epsilons[todo.pop()]:
+                if next_state not in result:
+                    result.add(next_state)
+                    todo.append(next_state)
+        return frozenset(result)
+
+    first = closure([start])
+    numbers = {first: 0}
+    subsets = [first]
+    transitions = []
+    accepting = []
+    for subset in subsets:
+        targets = {}
+        for state in subset:
+            for char, next_states in moves[state].items():
+                targets.setdefault(char, set()).update(next_states)
+
+        table = {}
+        for char, next_states in targets.items():
+            next_subset = closure(next_states)
+            if next_subset not in numbers:
+                numbers[next_subset] = len(subsets)
+                subsets.append(next_subset)
+            table[char] = numbers[next_subset]
+        transitions.append(table)
+
+        subset_labels = [labels[state] for state in subset if state in labels]
+        accepting.append(min(subset_labels) if subset_labels else None)
+
+    return transitions, accepting
+
+
+def minimize(transitions, accepting):
+    """
+    Minimizes a DFA (see determinize) by refining the partition of states
+    with equal labels until all states in a block have transitions into the
+    same blocks (Moore's algorithm)
+    returns: The minimized DFA as a tuple (transitions, accepting)
+    """
+    blocks = {}
+    block_of = [blocks.setdefault(label, len(blocks)) for label in accepting]
+    while True:
+        signatures = {}
+        new_block_of = []
+        for state, table in enumerate(transitions):
+            signature = (block_of[state],
+                         frozenset((char, block_of[next_state])
+                                   for char, next_state in table.items()))
+            new_block_of.append(signatures.setdefault(signature,
+                                                      len(signatures)))
+        stable = len(signatures) == len(set(block_of))
+        block_of = new_block_of
+        if stable:
+            break
+
+    # Number the blocks such that the start state is still state 0
+    order = {block_of[0]: 0}
+    for block in block_of:
+        order.setdefault(block, len(order))
+
+    new_transitions = [None] * len(order)
+    new_accepting = [None] * len(order)
+    for state, table in enumerate(transitions):
+        block = order[block_of[state]]
+        new_transitions[block] = dict(
+            (char, order[block_of[next_state]])
+            for char, next_state in table.items())
+        new_accepting[block] = accepting[state]
+    return new_transitions, new_accepting
+
+
+def compile_dfa(rules):
+    """
+    Compiles a list of regular expressions into a single minimized DFA,
+    labelling accepting states with the index of the first matching rule
+    returns: A tuple (transitions, accepting), see determinize
+    """
+    moves = [{}]
+    epsilons = [[]]
+    labels = {}
+    for index, pattern in enumerate(rules):
+        start, end = thompson(parse(pattern), moves, epsilons)
+        epsilons[0].append(start)
+        labels[end] = index
+    return minimize(*determinize(moves, epsilons, 0, labels))
+
+
+def compile_regex(pattern, verbose=False):
+    """
+    Compiles a regular expression into a minimized FA, of which the final
+    states are exactly those reached by strings matching the pattern
+    returns: The FA, with states named 'S0' (the start state), 'S1', ...
+    """
+    transitions, accepting = compile_dfa([pattern])
+
+    Q = ['S' + str(state) for state in range(len(transitions))]
+    Sigma = sorted(set(char for table in transitions for char in table))
+    delta = dict((Q[state], dict((char, Q[next_state])
+                                 for char, next_state in table.items()))
+                 for state, table in enumerate(transitions) if table)
+    F = [Q[state] for state, label in enumerate(accepting)
+         if label is not None]
+
+    return FA(Q, Sigma, delta, Q[0], F, verbose)
+
+
+class Lexer:
+    """
+    Longest-match lexer generated from (token name, regular expression)
+    rules. All rules are combined into one DFA, so a text is tokenized in a
+    single pass. If several rules match the longest lexeme, the first rule
+    is used.
+    """
+
+    def __init__(self, rules):
+        """
+        rules: A list of (token name, regular expression) tuples
+        """
+        self.names = [name for name, _ in rules]
+        self.transitions, self.accepting = \
+            compile_dfa([pattern for _, pattern in rules])
+
+    def tokenize(self, text):
+        """
+        Splits 'text' into tokens
+        returns: A list of (lexeme, token name) tuples. If some part of the
+                 text does not match any rule, sys.exit is called.
+        """
+        return list(self.iter_tokens(text))
+
+    def tokenize_prefix(self, text):
+        """
+        Splits the start of 'text' into the tokens which stay the same when
+        more text is appended, for text which arrives in parts
+        returns: A tuple (tokens, rest), where tokens is a list of (lexeme,
+                 token name) tuples and rest is the end of the text which is
+                 not tokenized yet, to be put in front of the next part
+        """
+        tokens = list(self.iter_tokens(text, final=False))
+        return tokens, text[sum(len(lexeme) for lexeme, _ in tokens):]
+
+    def iter_tokens(self, text, final=True):
+        """
+        Splits 'text' into tokens lazily, so that they can be consumed while
+        the rest of the text is still being lexed
+        final:   Indicator of whether the text is complete. If not, the
+                 lexer stops at a lexeme which might still be continued.
+        returns: A generator of (lexeme, token name) tuples. If some part of
+                 the text does not match any rule, sys.exit is called when
+                 the lexer reaches it.
+        """
+        transitions = self.transitions
+        lookups = [table.get for table in self.transitions]
+        accepting = self.accepting
+        names = self.names
+        length = len(text)
+        start = 0
+        while start < length:
+            state = 0
+            position = start
+            match_end = -1
+            while position < length:
+                state = lookups[state](text[position])
+                if state is None:
+                    break
+                position += 1
+                if accepting[state] is not None:
+                    match_end = position
+                    label = accepting[state]
+
+            if not final and position == length and transitions[state]:
+                return
+            if match_end < 0:
+                sys.exit("LexError: No token matches \'" + text[start:] +
+                         "\' at position " + str(start))
+            yield text[start:match_end], names[label]
+            start = match_end
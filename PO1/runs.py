@@ -0,0 +1,102 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Run-length compressed traces. A trace is split into blocks of a fixed
+number of items (the period, which is 5 for the steps of a TM trace), and
+consecutive equal blocks are stored once with the number of repetitions:
+a list of (block, count) tuples, where a block is a tuple of items. The last
+block may be shorter than the period.
+The automata can follow such a trace directly (see FA.transition_runs,
+PDA.transition_runs and reverse.decode_runs), so the cost of storing and
+verifying a trace grows with its compressed size.
+"""
+
+import re
+
+
+# A run in the text format, see dumps
+RUN_PATTERN = re.compile(r'(\d+)\*\(([^)]*)\)')
+
+
+def compress(items, period=5):
+    """
+    Compresses a trace
+    items:   An iterable of items, for example (lexeme, token) tuples, which
+             is consumed lazily
+    returns: A list of (block, count) tuples
+    """
+    runs = []
+    block = []
+    for item in items:
+        block.append(item)
+        if len(block) == period:
+            add_block(runs, tuple(block))
+            block = []
+    if block:
+        add_block(runs, tuple(block))
+    return runs
+
+
+def add_block(runs, block):
+    """
+    Append a block to a list of runs, extending the last run if the block
+    is the same
+    """
+    if runs and runs[-1][0] == block:
+        runs[-1] = (block, runs[-1][1] + 1)
+    else:
+        runs.append((block, 1))
+
+
+def expand(runs):
+    """
+    Decompresses a trace
+    returns: A generator of the items of the trace
+    """
+    for block, count in runs:
+        for _ in range(count):
+            yield from block
+
+
+def project(runs, index):
+    """
+    The runs of a single element of every item, such as the tokens of runs
+    of (lexeme, token) tuples (index 1)
+    """
+    return [(tuple(item[index] for item in block), count)
+            for block, count in runs]
+
+
+def length(runs):
+    """
+    The number of items of a compressed trace
+    """
+    return sum(len(block) * count for block, count in runs)
+
+
+def dumps(runs):
+    """
+    Writes runs of (lexeme, token) tuples as a single line, in which every
+    run is written as 'count*(lexeme token lexeme token ...)'
+    """
+    return ' '.join(str(count) + '*(' +
+                    ' '.join(lexeme + ' ' + token for lexeme, token in block)
+                    + ')' for block, count in runs)
+
+
+def loads(line):
+    """
+    Reads runs of (lexeme, token) tuples from a line written by dumps
+    """
+    runs = []
+    for count, block in RUN_PATTERN.findall(line):
+        words = block.split()
+        runs.append((tuple(zip(words[::2], words[1::2])), int(count)))
+    return runs
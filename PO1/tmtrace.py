@@ -16,10 +16,24 @@ transitioning from the start position. Symbols will be grouped.
 """
 
 from FA import FA
+from regex import Lexer
+import checkpoint
+import runs
 import string
 import sys
 
 
+# Token rules for the generated lexer, equivalent to create_fa and lexer
+TOKEN_RULES = [('SPACE', ' '),
+               ('MLEFT', '<'),
+               ('MRIGHT', '>'),
+               ('READ', '-'),
+               ('WRITE', '\\+'),
+               ('BLANK', '⊔'),
+               ('LEM', '⊢'),
+               ('SYMBOL', '[a-zA-Z0-9]+')]
+
+
 def create_fa():
     """
     Creates the finite automaton (FA) for trace tokenization
@@ -44,11 +58,31 @@ def create_fa():
     s = 'START'
     F = ['SPACE', 'MLEFT', 'MRIGHT', 'READ', 'WRITE', 'BLANK', 'LEM', 'SYMBOL']
 
-    M = FA(Q, Sigma, delta, s, F, verbose=False)
+    M = FA.cached(Q, Sigma, delta, s, F, verbose=False)
 
     return M
 
 
+def create_lexer():
+    """
+    Creates a lexer which tokenizes a whole trace with a single DFA compiled
+    from TOKEN_RULES, producing the same tuples as lexer
+    """
+    return Lexer(TOKEN_RULES)
+
+
+def tokenize_runs(L, trace, period=5):
+    """
+    Tokenizes a trace with a lexer (see create_lexer) straight into a run-
+    length compressed trace (see runs.py), without the spaces
+    period:  The number of tokens in a block, 5 for the steps of a TM
+    returns: A list of (block, count) tuples, where a block is a tuple of
+             (lexeme, token name) tuples
+    """
+    return runs.compress(((lexeme, token) for lexeme, token in
+                          L.iter_tokens(trace) if token != 'SPACE'), period)
+
+
 def char_type(char):
     """
     Returns the type of a character found in the trace
@@ -114,26 +148,59 @@ def lexer(fa, trace):
     return tuples
 
 
-def main(path):
+def main(path, checkpoints=None):
     """
     Reads multiple traces from the file at 'path' and feeds them one by one to
-    the lexer.
+    the lexer. With 'checkpoints' (a checkpoint.CheckpointStore) only what was
+    appended to the file since the previous call is read. A last trace
+    without a newline may still be growing, so it is lexed as far as
+    possible and printed by the call which reads the rest of it.
     """
-    M = create_fa()
-
-    fo = open(path)
-    with fo as f:
-        traces = [line.rstrip('\n') for line in f]
-    fo.close()
+    L = create_lexer()
+
+    name = 'tmtrace ' + repr(TOKEN_RULES)
+    offset, partial = 0, None
+    if checkpoints is not None:
+        offset, partial = checkpoints.load(path, name)
+
+    data = checkpoint.read_from(path, offset)
+    lines, rest = checkpoint.split_lines(data, final=checkpoints is None)
+    position = offset
+    for line in lines:
+        trace = line.decode('utf-8')
+        if partial is None:
+            tokens = L.tokenize(trace)
+        else:
+            # The end of a trace of which the start was lexed before
+            start, tokens, pending = partial
+            tokens = tokens + L.tokenize(pending + trace)
+            trace = checkpoint.read_from(path, start, position +
+                                         len(line)).decode('utf-8')
+            partial = None
+        position += len(line) + 1
 
-    for trace in traces:
-        M.reset()
         print("Trace: \"" + trace + "\"")
-        print(lexer(M, trace))
+        print(tokens)
+
+    if rest:
+        # Keep the tokens of the unfinished trace and the text of the
+        # lexeme that may be continued
+        text, length = checkpoint.decode_prefix(rest)
+        start, tokens, pending = partial or (position, [], '')
+        new_tokens, pending = L.tokenize_prefix(pending + text)
+        partial = (start, tokens + new_tokens, pending)
+        position += length
+
+    if checkpoints is not None:
+        checkpoints.save(path, name, position, partial)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        sys.exit('RuntimeError: Use `python3 tmtrace.py tmtraces.txt`')
-    source = sys.argv[1]
-    main(source)
+    arguments = [argument for argument in sys.argv[1:]
+                 if argument != '--resume']
+    if len(arguments) < 1:
+        sys.exit('RuntimeError: Use `python3 tmtrace.py tmtraces.txt' +
+                 ' [--resume]`')
+    source = arguments[0]
+    main(source, checkpoint.CheckpointStore() if '--resume' in sys.argv
+         else None)
@@ -7,13 +7,26 @@
 #   license.                                          #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
+import bounded
+import counter
 import sys
 
+try:
+    import engine
+except ImportError:
+    # Without PO1 (see engine) the automata are validated every time they
+    # are created, and compiled code is not shared between them
+    engine = None
+
 
 class PDA:
     """
     Pushdown Automaton (PDA)
     """
+    __slots__ = ('states', 'final_states', 'pda_type', 'verbose',
+                 'input_alphabet', 'stack_alphabet', 'start_state',
+                 'current_state', 'stack', 'compiled', 'counter', 'fa',
+                 'profile')
 
     def __init__(self, Q, Sigma, Gamma, delta, s, F, pda_type="final_state",
                  verbose=False):
@@ -98,6 +111,71 @@ class PDA:
 
         # Setup stack
         self.stack = ['⊥']
+        self.compiled = None
+        self.counter = None
+        self.fa = None
+        self.profile = None
+
+    @classmethod
+    def cached(cls, Q, Sigma, Gamma, delta, s, F, pda_type="final_state",
+               verbose=False, cache_dir=None):
+        """
+        Creates the PDA object like PDA(Q, Sigma, Gamma, delta, s, F,
+        pda_type, verbose), but skips input sanitization if the same
+        definition was validated before by this process or stored in the
+        cache directory
+        cache_dir: See FA.cached
+        """
+        if engine is None:
+            return cls(Q, Sigma, Gamma, delta, s, F, pda_type, verbose)
+
+        key = engine.definition_key('PDA', Q, Sigma, Gamma, delta, s, F)
+        cache_dir = engine.cache_directory(cache_dir)
+        tables = engine.read_tables(key, cache_dir)
+        if tables is not None:
+            return cls.from_tables(tables, pda_type, verbose)
+
+        pda = cls(Q, Sigma, Gamma, delta, s, F, pda_type, verbose)
+        engine.write_tables(key, pda.get_tables(), cache_dir)
+        return pda
+
+    def get_tables(self):
+        """
+        Retrieve the validated PDA as a tuple of built-in types (see cached)
+        """
+        return ([(state.name, state.transition_table)
+                 for state in self.states.values()],
+                list(self.input_alphabet), list(self.stack_alphabet),
+                self.start_state.name,
+                [state.name for state in self.final_states])
+
+    @classmethod
+    def from_tables(cls, tables, pda_type="final_state", verbose=False):
+        """
+        Create a PDA from the tables of a PDA that was validated before,
+        without performing input sanitization
+        """
+        state_tables, Sigma, Gamma, s, F = tables
+
+        pda = cls.__new__(cls)
+        pda.states = {}
+        for state_name, transition_table in state_tables:
+            pda.states[state_name] = State(
+                state_name, [((state_name,) + lhs, rhs)
+                             for lhs, rhs in transition_table.items()])
+        pda.final_states = [pda.states[state_name] for state_name in F]
+        pda.pda_type = pda_type
+        pda.verbose = verbose
+        pda.input_alphabet = Sigma
+        pda.stack_alphabet = Gamma
+        pda.start_state = pda.states[s]
+        pda.current_state = pda.start_state
+        pda.stack = ['⊥']
+        pda.compiled = None
+        pda.counter = None
+        pda.fa = None
+        pda.profile = None
+        return pda
 
     def transition(self, symbol):
         """
@@ -105,17 +183,21 @@ class PDA:
         returns: True if succeeded, false otherwise
         """
 
-        if self.stack:
-            top_stack_symbol = self.stack.pop()
+        stack = self.stack
+        if stack:
+            top_stack_symbol = stack.pop()
         else:
             top_stack_symbol = "ϵ"
 
         try:
-            # Lookup new state and stack top
-            new_state_name, new_top_stack = \
-                self.current_state.transition_table[(symbol, top_stack_symbol)]
+            # Lookup new state and stack top, without building a key tuple
+            new_state_name, new_top_stack, pushed_symbols = \
+                self.current_state.relations_by_symbol[symbol][
+                    top_stack_symbol]
 
         except KeyError:
+            if self.profile is not None:
+                self.count_reject(self.current_state)
             if self.verbose:
                 print("Warning: State \'" + self.current_state.name +
                       "\' has no transition for input-symbol \'" + symbol +
@@ -124,7 +206,7 @@ class PDA:
 
             # Reappend the removed stack symbol
             if top_stack_symbol != "ϵ":
-                self.stack.append(top_stack_symbol)
+                stack.append(top_stack_symbol)
 
             return False
 
@@ -135,10 +217,11 @@ class PDA:
 
         # Add new stack symbols to existing stack. Unfortunately Kozen notation
         # has the top of the stack on the left, while Python has it on the
-        # right --> reverse append the symbols.
-        if new_top_stack != "ϵ":
-            for element in reversed(new_top_stack):
-                self.stack.append(element)
+        # right --> the symbols are stored in reverse (see State).
+        stack.extend(pushed_symbols)
+
+        if self.profile is not None:
+            self.count_transition(previous_state, symbol)
 
         if self.verbose:
             used_relation = ((previous_state.name, symbol, top_stack_symbol),
@@ -150,6 +233,148 @@ class PDA:
 
         return True
 
+    def compile_to_python(self):
+        """
+        Generate Python source code specialized for this PDA, which follows
+        the relations with if/elif chains over numbered states and inlined
+        input and stack symbols instead of dictionary lookups. The compiled
+        code is used by transition_all from then on (unless verbose).
+        returns: The generated source code
+        """
+        state_names = list(self.states)
+        state_numbers = dict((name, number)
+                             for number, name in enumerate(state_names))
+
+        lines = ["def run(symbols, state, stack, stop):",
+                 "    pop = stack.pop",
+                 "    push = stack.append",
+                 "    for symbol in symbols:",
+                 "        top = pop() if stack else 'ϵ'"]
+        for number, name in enumerate(state_names):
+            lines.append("        " + ("if" if number == 0 else "elif") +
+                         " state == " + str(number) + ":")
+
+            # Group the relations of the state by input symbol
+            relations = {}
+            for (symbol, top), rhs in \
+                    self.states[name].transition_table.items():
+                relations.setdefault(symbol, []).append((top, rhs))
+            if not relations:
+                lines.append("            pass")
+
+            keyword = "if"
+            for symbol, tops in relations.items():
+                lines.append("            " + keyword + " symbol == " +
+                             repr(symbol) + ":")
+                for top, (new_state_name, new_top_stack) in tops:
+                    lines.append("                if top == " + repr(top) +
+                                 ":")
+                    lines.append("                    state = " +
+                                 str(state_numbers[new_state_name]))
+                    if new_top_stack != "ϵ":
+                        for element in reversed(new_top_stack):
+                            lines.append("                    push(" +
+                                         repr(element) + ")")
+                    lines.append("                    continue")
+                keyword = "elif"
+
+        # Reached only if there is no relation, see transition
+        lines += ["        if top != 'ϵ':",
+                  "            push(top)",
+                  "        if stop:",
+                  "            return state, False",
+                  "    return state, True"]
+        source = "\n".join(lines) + "\n"
+
+        self.compiled = (compile_function(source), state_names,
+                         state_numbers)
+        return source
+
+    def compile_to_counter(self):
+        """
+        Recognize a PDA which uses its stack purely as a counter, and let
+        transition_all run it with vectorized prefix sums or summaries from
+        the start configuration (see counter.py), on numpy arrays of symbols
+        if it is also compiled to Python. Other PDAs, or all PDAs if numpy
+        is not available, keep running as before.
+        returns: True if the PDA is run as a counter, False otherwise
+        """
+        self.counter = counter.recognize(self)
+        return self.counter is not None
+
+    def compile_to_fa(self, max_configurations=4096):
+        """
+        Prove that the stack of the PDA never grows beyond a fixed height by
+        exploring the reachable configurations, and if so compile it to FAs
+        (see bounded.py) which transition_all uses from the start
+        configuration from then on, without any stack operations
+        max_configurations: The maximum number of configurations to explore
+        returns: True if the PDA was compiled, False otherwise (also if the
+                 FA of PO1 is not available)
+        """
+        self.fa = None
+        compiled = {}
+        definition = repr(self.get_tables())
+        for stop in [False, True]:
+            result = bounded.compile_to_fa(self, stop, max_configurations,
+                                           definition)
+            if result is None:
+                return False
+            fa, configurations = result
+            compiled[stop] = (fa, dict(('C' + str(number), configuration)
+                                       for number, configuration in
+                                       enumerate(configurations)))
+        self.fa = compiled
+        return True
+
+    def enable_profiling(self):
+        """
+        Start counting transitions per state and symbol, failed transitions
+        per state and the maximum stack depth (see get_profile). Profiling
+        is off by default, in which case it costs a single check per
+        transition.
+        """
+        self.profile = {'transitions': {}, 'rejects': {},
+                        'max_stack_depth': len(self.stack)}
+
+    def disable_profiling(self):
+        """
+        Stop profiling and discard the counters
+        """
+        self.profile = None
+
+    def get_profile(self):
+        """
+        Retrieve the profiling counters
+        returns: None if profiling is off, otherwise a dictionary with
+                 'transitions' (a dictionary from state name to a dictionary
+                 from symbol to count, ready for a heatmap), 'rejects' (a
+                 dictionary from state name to the number of failed
+                 transitions) and 'max_stack_depth'
+        """
+        return self.profile
+
+    def get_profile_prometheus(self):
+        """
+        Retrieve the profiling counters in the Prometheus text format
+        """
+        if engine is None:
+            sys.exit("ImportError: The Prometheus format needs engine.py" +
+                     " of PO1")
+        return engine.prometheus_text('PDA', self.profile)
+
+    def count_transition(self, state, symbol):
+        """ Count a transition from 'state' for 'symbol' while profiling """
+        counts = self.profile['transitions'].setdefault(state.name, {})
+        counts[symbol] = counts.get(symbol, 0) + 1
+        if len(self.stack) > self.profile['max_stack_depth']:
+            self.profile['max_stack_depth'] = len(self.stack)
+
+    def count_reject(self, state):
+        """ Count a failed transition from 'state' while profiling """
+        rejects = self.profile['rejects']
+        rejects[state.name] = rejects.get(state.name, 0) + 1
+
     def is_final(self):
         """
         Check whether the current state is a final state
@@ -162,15 +387,11 @@ class PDA:
         """
         return not bool(self.stack)
 
-    def transition_all(self, list_of_symbols):
+    def is_accepting(self):
         """
-        Run PDA against the complete input 'list_of_symbols'
-        returns: True if the input is accepted, False otherwise
+        Check whether the PDA accepts the input read so far, by final state
+        or by empty stack depending on its type
         """
-
-        for symbol in list_of_symbols:
-            self.transition(symbol)
-
         if self.is_final() and self.pda_type == "final_state":
             return True
 
@@ -179,13 +400,256 @@ class PDA:
 
         return False
 
+    def transition_all(self, list_of_symbols, stop=False):
+        """
+        Run PDA against the complete input 'list_of_symbols'
+        stop:    Indicator of whether to stop at the first symbol for which
+                 there is no transition, in which case the input is rejected
+        returns: True if the input is accepted, False otherwise
+        """
+
+        if self.fa is not None and not self.verbose and \
+                self.profile is None and self.at_start():
+            run = self.fa[stop][0].cursor()
+            accepted = self.finish_fa(run, run.transition_all(
+                list_of_symbols), stop)
+            if accepted is not None:
+                return accepted
+
+        # Numbering a list of symbols for the counter costs about as much as
+        # running the compiled code on it, which is slower on numpy arrays
+        if self.counter is not None and not stop and not self.verbose and \
+                self.profile is None and self.at_start() and \
+                (self.compiled is None or
+                 isinstance(list_of_symbols, counter.numpy.ndarray)):
+            state_name, self.stack = self.counter.run(list_of_symbols)
+            self.current_state = self.states[state_name]
+        elif self.compiled is None or self.verbose or \
+                self.profile is not None:
+            for symbol in list_of_symbols:
+                if not self.transition(symbol) and stop:
+                    return False
+        else:
+            run, state_names, state_numbers = self.compiled
+            state, succeeded = run(list_of_symbols,
+                                   state_numbers[self.current_state.name],
+                                   self.stack, stop)
+            self.current_state = self.states[state_names[state]]
+            if not succeeded:
+                return False
+
+        return self.is_accepting()
+
+    def transition_runs(self, runs, stop=False):
+        """
+        Run PDA against a run-length compressed input (see runs.py) like
+        transition_all, without decompressing it. A block is followed once,
+        keeping track of the part of the stack it read. If the PDA is back
+        in the same state and the stack it leaves has the same top as
+        before, the next repetitions of the block do exactly the same, so
+        they are applied at once: a block which leaves more than it read
+        pushes the extra symbols again, and a block which leaves less keeps
+        popping as long as the stack below repeats. Verbose and profiling
+        PDAs follow every repetition.
+        runs:    A list of (block, count) tuples, where a block is a tuple of
+                 input symbols
+        stop:    See transition_all
+        returns: True if the input is accepted, False otherwise
+        """
+        skip = not self.verbose and self.profile is None
+        for block, count in runs:
+            repetition = 0
+            while repetition < count:
+                state = self.current_state
+                stack = self.stack
+                low = len(stack)
+                popped = []
+                read_empty = False
+                for symbol in block:
+                    if not stack:
+                        read_empty = True
+                    elif len(stack) <= low:
+                        # A symbol which was on the stack before the block
+                        low = len(stack) - 1
+                        popped.append(stack[-1])
+                    if not self.transition(symbol) and stop:
+                        return False
+                repetition += 1
+                if not skip or self.current_state is not state or \
+                        repetition == count:
+                    continue
+
+                # The stack is stack[:low] + read before and
+                # stack[:low] + left after the block
+                read = popped[::-1]
+                left = stack[low:]
+                remaining = count - repetition
+                if read_empty:
+                    if left == read:
+                        repetition = count
+                elif len(left) >= len(read):
+                    if left[len(left) - len(read):] == read:
+                        stack[low:low] = left[:len(left) - len(read)] * \
+                            remaining
+                        repetition = count
+                elif left == read[len(read) - len(left):]:
+                    unit = read[:len(read) - len(left)]
+                    times = min(remaining, low // len(unit))
+                    while times and stack[low - times * len(unit):low] != \
+                            unit * times:
+                        times //= 2
+                    del stack[low - times * len(unit):low]
+                    repetition += times
+
+        return self.is_accepting()
+
+    def finish_fa(self, run, succeeded, stop):
+        """
+        Take the configuration of the PDA from a run of its FA (see
+        compile_to_fa) on all input symbols
+        run:       The cursor of the FA for 'stop'
+        succeeded: The result of the run
+        returns:   True if the input is accepted, False if not, or None if
+                   the FA stopped at a symbol which is not in Sigma, which
+                   the PDA itself ignores
+        """
+        if not (succeeded or stop):
+            return None
+
+        state_name, stack = self.fa[stop][1][run.current_state.name]
+        self.current_state = self.states[state_name]
+        self.stack = list(stack)
+        if not succeeded:
+            # The missing transition puts back the top of the stack, unless
+            # it is 'ϵ'
+            if self.stack and self.stack[-1] == "ϵ":
+                self.stack.pop()
+            return False
+        return self.is_accepting()
+
+    def transition_all_parallel(self, list_of_symbols, workers=None,
+                                chunks=None, stop=False):
+        """
+        Run PDA against the complete input 'list_of_symbols' like
+        transition_all, using a pool of worker processes for a single long
+        input. This requires a PDA which starts from its start configuration
+        and is compiled to an FA (see compile_to_fa and
+        FA.transition_all_parallel) or run as a counter without 'stop' (see
+        compile_to_counter and counter.run_parallel), other PDAs are run
+        sequentially.
+        workers: The number of worker processes, defaults to the number of
+                 CPUs. With a single worker no processes are started.
+        chunks:  The number of chunks, defaults to four per worker
+        stop:    See transition_all
+        returns: True if the input is accepted, False otherwise
+        """
+        if self.fa is not None and not self.verbose and \
+                self.profile is None and self.at_start():
+            run = self.fa[stop][0].cursor()
+            accepted = self.finish_fa(run, run.transition_all_parallel(
+                list_of_symbols, workers, chunks), stop)
+            if accepted is not None:
+                return accepted
+
+        if self.counter is None or stop or self.verbose or \
+                self.profile is not None or not self.at_start():
+            return self.transition_all(list_of_symbols, stop)
+
+        state_name, self.stack = counter.run_parallel(
+            self.counter, list_of_symbols, workers, chunks)
+        self.current_state = self.states[state_name]
+        return self.is_accepting()
+
+    def at_start(self):
+        """
+        Check whether the PDA is in its start configuration
+        """
+        return self.current_state is self.start_state and \
+            self.stack == ['⊥']
+
+    def get_configuration(self):
+        """
+        returns: A tuple (state name, stack), which set_configuration
+                 accepts to continue a run later
+        """
+        return self.current_state.name, list(self.stack)
+
+    def set_configuration(self, configuration):
+        """
+        Continue a run from a configuration returned by get_configuration
+        """
+        state_name, stack = configuration
+        self.current_state = self.states[state_name]
+        self.stack = list(stack)
+
     def reset(self):
         self.current_state = self.start_state
         self.stack = ['⊥']
 
+    def cursor(self):
+        """
+        Start a separate run of the PDA, see Cursor
+        returns: A Cursor in the start configuration
+        """
+        return Cursor(self)
+
+
+class Cursor:
+    """
+    A run of a PDA which keeps only the configuration (current state and
+    stack). The cursors of a PDA use its states and compiled code (see
+    compile_to_python, compile_to_counter and compile_to_fa) without
+    changing the PDA itself, so one PDA can be shared by any number of runs
+    at the same time, for example in different threads. Compile the PDA
+    before handing out cursors; profiling counters are shared by all its
+    runs.
+    """
+    # Attributes of the machine used by the runs, which are taken when the
+    # cursor is created
+    shared = ('states', 'final_states', 'pda_type', 'input_alphabet',
+              'stack_alphabet', 'start_state', 'verbose', 'compiled',
+              'counter', 'fa', 'profile')
+    __slots__ = shared + ('machine', 'current_state', 'stack')
+
+    def __init__(self, machine):
+        self.machine = machine
+        for name in self.shared:
+            setattr(self, name, getattr(machine, name))
+        self.current_state = machine.start_state
+        self.stack = ['⊥']
+
+    transition = PDA.transition
+    transition_all = PDA.transition_all
+    transition_runs = PDA.transition_runs
+    transition_all_parallel = PDA.transition_all_parallel
+    finish_fa = PDA.finish_fa
+    count_transition = PDA.count_transition
+    count_reject = PDA.count_reject
+    is_final = PDA.is_final
+    is_empty = PDA.is_empty
+    is_accepting = PDA.is_accepting
+    at_start = PDA.at_start
+    get_configuration = PDA.get_configuration
+    set_configuration = PDA.set_configuration
+    reset = PDA.reset
+
+
+def compile_function(source):
+    """
+    Compile generated source code defining a function 'run', with
+    engine.compile_function if PO1 is available
+    """
+    if engine is not None:
+        return engine.compile_function(source)
+    namespace = {}
+    exec(compile(source, '<compiled automaton>', 'exec'), namespace)
+    return namespace['run']
+
 
 class State:
     """State in a Pushdown Automaton (PDA)"""
+    __slots__ = ('name', 'transition_table', 'relations_by_symbol')
+
     def __init__(self, name, relations):
         """
         name:       State name
@@ -200,3 +664,17 @@ class State:
         for lhs, rhs in relations:
             transition_table[lhs[1:]] = rhs
         self.transition_table = transition_table
+
+        # The same relations by input symbol and then stack symbol, with the
+        # symbols to push in Python (reversed) order, so that a transition
+        # does not need to allocate a key tuple or a reversed iterator
+        relations_by_symbol = {}
+        for (symbol, top_stack), (state, top_stack_list) in \
+                transition_table.items():
+            if top_stack_list == "ϵ":
+                pushed_symbols = ()
+            else:
+                pushed_symbols = tuple(reversed(top_stack_list))
+            relations_by_symbol.setdefault(symbol, {})[top_stack] = \
+                (state, top_stack_list, pushed_symbols)
+        self.relations_by_symbol = relations_by_symbol
@@ -0,0 +1,150 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Compiles pushdown automata (PDA) whose stack never grows beyond a fixed
+height to finite automata (FA). The configurations (state and stack) which
+are reachable from the start configuration are explored up to a limit. If
+there are finitely many, every configuration becomes a state of an FA with
+the same runs, so the PDA can be run without any stack operations.
+This requires the FA of PO1, without it PDAs are not compiled to FAs.
+"""
+
+# Results of explore and compile_to_fa by PDA definition, so that PDAs
+# which are created over and over again (see verification) are only
+# explored and compiled once
+explored = {}
+compiled = {}
+
+
+def step(pda, configuration, symbol):
+    """
+    Follow a single input symbol from a configuration, exactly like
+    PDA.transition
+    configuration: A tuple (state name, stack tuple), with the top of the
+                   stack at the end
+    returns: A tuple (configuration, succeeded)
+    """
+    state_name, stack = configuration
+    if stack:
+        top = stack[-1]
+        rest = stack[:-1]
+    else:
+        top = "ϵ"
+        rest = ()
+
+    relation = pda.states[state_name].relations_by_symbol.get(
+        symbol, {}).get(top)
+    if relation is None:
+        # The popped stack symbol is put back, unless it is 'ϵ'
+        return (state_name, rest if top == "ϵ" else stack), False
+
+    new_state_name, _, pushed_symbols = relation
+    return (new_state_name, rest + pushed_symbols), True
+
+
+def explore(pda, stop, max_configurations=4096, definition=None):
+    """
+    Explore the configurations reachable from the start configuration
+    stop:    Indicator of whether a missing transition stops the run (see
+             PDA.transition_all), in which case it leads to no configuration
+    definition: repr(pda.get_tables()), if it is known already
+    returns: None if there are more than 'max_configurations', otherwise a
+             tuple (configurations, transitions), where transitions[number]
+             maps an input symbol to the number of the next configuration
+             and configuration 0 is the start configuration
+    """
+    if definition is None:
+        definition = repr(pda.get_tables())
+    key = (definition, stop, max_configurations)
+    if key in explored:
+        return explored[key]
+
+    start = (pda.start_state.name, ('⊥',))
+    numbers = {start: 0}
+    configurations = [start]
+    transitions = []
+    for configuration in configurations:
+        table = {}
+        for symbol in pda.input_alphabet:
+            next_configuration, succeeded = step(pda, configuration, symbol)
+            if not succeeded and stop:
+                continue
+            if next_configuration not in numbers:
+                if len(configurations) == max_configurations:
+                    explored[key] = None
+                    return None
+                numbers[next_configuration] = len(configurations)
+                configurations.append(next_configuration)
+            table[symbol] = numbers[next_configuration]
+        transitions.append(table)
+
+    explored[key] = (configurations, transitions)
+    return explored[key]
+
+
+def stack_bound(pda, max_configurations=4096):
+    """
+    Determine the maximum height of the stack over all runs of a PDA
+    returns: The height, or None if no bound was found within
+             'max_configurations' configurations
+    """
+    result = explore(pda, False, max_configurations)
+    if result is None:
+        return None
+    return max(len(stack) for _, stack in result[0])
+
+
+def compile_to_fa(pda, stop, max_configurations=4096, definition=None):
+    """
+    Compile a PDA with a bounded stack to an FA with the same runs from the
+    start configuration, with states named 'C0' (the start configuration),
+    'C1', ... The final states are the configurations in which the PDA
+    accepts.
+    stop, definition: See explore. Without 'stop' a missing transition is
+             a transition to the configuration with the top of the stack put
+             back.
+    returns: None if no bound was found (see explore) or the FA of PO1 is
+             not available, otherwise a tuple (FA, configurations) where the
+             configuration of 'C<n>' is configurations[n]. The FA is shared
+             by all PDAs with the same definition, which run it through
+             cursors (see FA.cursor).
+    """
+    try:
+        from FA import FA
+    except ImportError:
+        return None
+
+    if definition is None:
+        definition = repr(pda.get_tables())
+    key = (definition, pda.pda_type, stop, max_configurations)
+    if key in compiled:
+        return compiled[key]
+
+    result = explore(pda, stop, max_configurations, definition)
+    if result is None:
+        compiled[key] = None
+        return None
+    configurations, transitions = result
+
+    Q = ['C' + str(number) for number in range(len(configurations))]
+    delta = dict((Q[number], dict((symbol, Q[next_number])
+                                  for symbol, next_number in table.items()))
+                 for number, table in enumerate(transitions) if table)
+    final_names = set(state.name for state in pda.final_states)
+    F = []
+    for number, (state_name, stack) in enumerate(configurations):
+        if pda.pda_type == "final_state" and state_name in final_names or \
+                pda.pda_type == "empty_stack" and not stack:
+            F.append(Q[number])
+
+    fa = FA.cached(Q, list(pda.input_alphabet), delta, Q[0], F)
+    fa.compile_to_python()
+    compiled[key] = (fa, configurations)
+    return compiled[key]
@@ -0,0 +1,736 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Vectorized runs of pushdown automata (PDA) which use their stack purely as a
+counter, such as a PDA which pushes a symbol for every move to the right and
+pops one for every move to the left to keep track of the head of a Turing
+machine. Instead of following the relations symbol by symbol, the counter
+before every input symbol is computed at once with a prefix sum, after which
+the relations that depend on the counter being zero are masked lookups.
+This requires numpy, without it (numpy is None) PDAs are run as before.
+
+The PDAs that are recognized (see recognize) consist of:
+- a main state, the start state, which is final. On the counter symbol every
+  input symbol adds one to the counter, subtracts one, leaves it unchanged or
+  leads to a sink. On '⊥' (the counter is zero) it either does the same as on
+  the counter symbol, leads to a sink, or leads to the check state.
+- at most one check state, entered without changing the counter, where the
+  next input symbol that has a relation decides between returning to the
+  main state or going to a sink.
+- sinks, which are not final and have no relations.
+
+Or, if that is not the case (see recognize_control), of relations which all
+replace the top of the stack by a new top with zero or more copies of the
+counter symbol below it, such as the PDAs of verify_position and verify_lem,
+which replace the top '1' by 'ϵ' on a move to the left. Such a PDA never
+looks below the top, so the state and the top of the stack (the control)
+are a finite automaton and the counter symbols below are only counted.
+"""
+
+import itertools
+import multiprocessing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Stack operations of the relations of the main state, by right-hand side
+INCREMENT = 1
+DECREMENT = -1
+UNCHANGED = 0
+
+# The number of input symbols of a ControlProgram that are summarized at
+# once, which bounds the memory of a summary to a multiple of this, and the
+# number of symbols of which all sequences are summarized in advance
+BLOCK_SIZE = 2 ** 16
+GRAM = 4
+
+# The lowest change of the counter in a summary of a ControlProgram that
+# never removes the top of the stack, and the zero control of one that
+# pushes a counter symbol from zero
+UNREVEALED = 2 ** 62
+LEAVES_ZERO = -1
+
+# The program of a run_parallel worker process, set once by _init_worker
+_worker_program = None
+
+
+class Program:
+    """
+    The numbering of the input symbols of a recognized PDA. The last number
+    is used for symbols which have no relation at all.
+    """
+    __slots__ = ('symbols', 'numbers')
+
+    def __init__(self, symbols):
+        self.symbols = numpy.array(sorted(symbols))
+        self.numbers = dict((symbol, number)
+                            for number, symbol in enumerate(sorted(symbols)))
+
+    def encode(self, list_of_symbols):
+        """
+        Number the input symbols, which is the only step that loops over
+        them in Python if they are given as a list
+        list_of_symbols: A list of strings, or a numpy array of strings
+        returns: A numpy array of symbol numbers
+        """
+        other = len(self.symbols)
+        if not isinstance(list_of_symbols, numpy.ndarray):
+            return numpy.fromiter(map(self.numbers.get, list_of_symbols,
+                                      itertools.repeat(other)),
+                                  numpy.intp, len(list_of_symbols))
+
+        positions = numpy.searchsorted(self.symbols, list_of_symbols)
+        positions[positions == other] = 0
+        return numpy.where(self.symbols[positions] == list_of_symbols,
+                           positions, other)
+
+
+class CounterProgram(Program):
+    """
+    Tables of a recognized PDA, indexed by the number of an input symbol
+    """
+    __slots__ = ('main_state', 'check_state', 'counter_symbol',
+                 'main_relations', 'check_relations', 'deltas',
+                 'reject_above', 'reject_zero', 'enter_check',
+                 'check_handled', 'check_reject')
+
+    def __init__(self, main_state, check_state, counter_symbol, tables):
+        """
+        main_state, check_state: The State objects (check_state may be None)
+        counter_symbol: The stack symbol which is counted
+        tables:  A dictionary from input symbol to a dictionary with the
+                 'delta' and the booleans 'reject_above', 'reject_zero',
+                 'enter_check', 'check_handled' and 'check_reject'
+        """
+        Program.__init__(self, tables)
+        self.main_state = main_state
+        self.check_state = check_state
+        self.counter_symbol = counter_symbol
+        self.main_relations = main_state.relations_by_symbol
+        self.check_relations = {} if check_state is None else \
+            check_state.relations_by_symbol
+
+        def column(name, dtype):
+            values = [tables[symbol][name] for symbol in self.symbols]
+            return numpy.array(values + [0], dtype=dtype)
+
+        self.deltas = column('delta', numpy.int8)
+        self.reject_above = column('reject_above', bool)
+        self.reject_zero = column('reject_zero', bool)
+        self.enter_check = column('enter_check', bool)
+        self.check_handled = column('check_handled', bool)
+        self.check_reject = column('check_reject', bool)
+
+    def run(self, list_of_symbols):
+        """
+        Run the PDA from its start configuration on all input symbols
+        returns: A tuple (state name, stack) of the configuration the PDA
+                 ends in
+        """
+        state_name, counter, pushed_symbols = \
+            self.evaluate(self.encode(list_of_symbols))
+        return state_name, self.stack(counter, pushed_symbols)
+
+    def stack(self, counter, pushed_symbols=None):
+        """
+        The stack for a counter, of which the top is replaced by
+        'pushed_symbols' if given (see evaluate)
+        """
+        stack = ['⊥'] + [self.counter_symbol] * counter
+        if pushed_symbols is not None:
+            stack.pop()
+            stack.extend(pushed_symbols)
+        return stack
+
+    def evaluate(self, codes, in_check=False, counter=0):
+        """
+        Run the PDA on numbered input symbols (see encode)
+        in_check: Indicator of whether the PDA starts in the check state,
+                  otherwise it starts in the main state
+        counter:  The counter the PDA starts with, which is zero in the
+                  check state
+        returns:  A tuple (state name, counter, pushed symbols) of the
+                  configuration the PDA ends in. If it ends in a sink, the
+                  top of the counter was replaced by the pushed symbols,
+                  otherwise these are None.
+        """
+        length = len(codes)
+
+        # The counter before every symbol
+        deltas = self.deltas[codes]
+        counters = numpy.cumsum(deltas, dtype=numpy.int64) + counter
+        zero = (counters - deltas) == 0
+
+        rejected = (self.reject_above[codes] & ~zero) | \
+            (self.reject_zero[codes] & zero)
+
+        # Symbols which enter the check state (where -1 stands for the start)
+        # and the symbols which are read in the check state and decide where
+        # to go next
+        entries = numpy.flatnonzero(zero & self.enter_check[codes])
+        if in_check:
+            entries = numpy.concatenate(([-1], entries))
+        ends_in_check = False
+        first_check_reject = length
+        if entries.size:
+            handled = self.check_handled[codes]
+            following = numpy.where(handled, numpy.arange(length), length)
+            following = numpy.minimum.accumulate(following[::-1])[::-1]
+            following = numpy.append(following, length)
+            decisions = following[entries + 1]
+            ends_in_check = decisions[-1] == length
+            decisions = numpy.unique(decisions[decisions < length])
+
+            # These symbols are not read in the main state
+            rejected[decisions] = False
+            check_rejects = decisions[self.check_reject[codes[decisions]]]
+            if check_rejects.size:
+                first_check_reject = int(check_rejects[0])
+
+        first_reject = length
+        if rejected.any():
+            first_reject = int(numpy.argmax(rejected))
+
+        if first_reject < first_check_reject:
+            position = first_reject
+            counter = int(counters[position] - deltas[position])
+            top = self.counter_symbol if counter else '⊥'
+            relations = self.main_relations
+        elif first_check_reject < length:
+            position = first_check_reject
+            counter = 0
+            top = '⊥'
+            relations = self.check_relations
+        elif ends_in_check:
+            return self.check_state.name, 0, None
+        elif length:
+            return self.main_state.name, int(counters[-1]), None
+        else:
+            return self.main_state.name, counter, None
+
+        # The configuration in the sink, see PDA.transition
+        symbol = str(self.symbols[codes[position]])
+        state_name, _, pushed_symbols = relations[symbol][top]
+        return state_name, counter, pushed_symbols
+
+    def summarize(self, list_of_symbols):
+        """
+        Summarize a part of the input for run_parallel. Unless the counter
+        drops to zero in the part, the PDA only reads it in the main state
+        and its relations do not depend on the counter it starts with.
+        returns: A tuple (total, lowest, result), where total is the change
+                 of the counter over the part and lowest the lowest change
+                 before a symbol. The result is (state name, change of the
+                 counter, pushed symbols) of the configuration the PDA ends
+                 in when it starts the part in the main state with a counter
+                 above -lowest (see evaluate).
+        """
+        codes = self.encode(list_of_symbols)
+        if not len(codes):
+            return 0, 0, (self.main_state.name, 0, None)
+
+        changes = numpy.cumsum(self.deltas[codes], dtype=numpy.int64)
+        total = int(changes[-1])
+        lowest = min(0, int((changes - self.deltas[codes]).min()))
+        counter = 1 - lowest
+        state_name, end_counter, pushed_symbols = \
+            self.evaluate(codes, False, counter)
+        return total, lowest, (state_name, end_counter - counter,
+                               pushed_symbols)
+
+    def schedule(self, summaries):
+        """
+        The parts of the input which the summaries do not decide, because
+        the counter may drop to zero in them, from the counter every part
+        starts with, which is exact as long as no sink was reached before
+        summaries: A list of summaries (see summarize), one for every part
+        returns: A list of (part index, in check state, counter) tuples,
+                 where the counter is zero in the check state
+        """
+        tasks = []
+        counter = 0
+        for index, (total, lowest, _) in enumerate(summaries):
+            if counter <= -lowest:
+                tasks.append((index, False, counter))
+                if counter == 0 and self.check_state is not None:
+                    tasks.append((index, True, counter))
+            counter += total
+        return tasks
+
+    def evaluate_part(self, list_of_symbols, in_check, counter):
+        """ Run the PDA on a part of the input, see evaluate """
+        return self.evaluate(self.encode(list_of_symbols), in_check, counter)
+
+    def combine(self, summaries, evaluate):
+        """
+        Chain the parts of the input in order
+        evaluate: A function which runs evaluate_part for a list of (part
+                  index, arguments...) tuples and returns a list of results
+        returns:  A tuple (state name, stack) of the configuration the PDA
+                  ends in
+        """
+        tasks = self.schedule(summaries)
+        results = dict(((task[0], task[1]), result)
+                       for task, result in zip(tasks, evaluate(tasks)))
+        check_name = None if self.check_state is None else \
+            self.check_state.name
+        state_name = self.main_state.name
+        counter = 0
+        for index, (_, _, result) in enumerate(summaries):
+            key = (index, state_name == check_name)
+            if key in results:
+                state_name, counter, pushed_symbols = results[key]
+            else:
+                state_name, change, pushed_symbols = result
+                counter += change
+            if pushed_symbols is not None:
+                return state_name, self.stack(counter, pushed_symbols)
+        return state_name, self.stack(counter)
+
+
+class ControlProgram(Program):
+    """
+    Tables of a PDA which is run as a finite automaton on its controls, the
+    tuples (state name, top of the stack), while it counts the counter
+    symbols below the top (see recognize_control). The top is None for an
+    empty stack.
+
+    Input is summarized by the tuple (next controls, counts, lowest, zero
+    controls) of arrays indexed by the number of the control it starts in.
+    The first three are for a counter that does not drop to zero: the
+    control it ends in, the change of the counter, and the lowest change of
+    the counter before the top of the stack was removed, or UNREVEALED if
+    it never was. If the counter is above -lowest, they are exact. The zero
+    controls are the controls it ends in when it starts with a counter of
+    zero and keeps it at zero, or LEAVES_ZERO if it pushes a counter symbol.
+    """
+    __slots__ = ('controls', 'counter_symbol', 'symbol_summaries',
+                 'gram_summaries')
+
+    def __init__(self, controls, counter_symbol, tables):
+        """
+        controls: A list of controls, of which the first is the control of
+                  the start configuration
+        counter_symbol: The stack symbol which is counted, or None if no
+                  relation pushes it
+        tables:   A dictionary from input symbol, or None for symbols which
+                  have no relation at all, to a list of (next control
+                  number, change of the counter, reveals, control number at
+                  zero) tuples, one for every control, where 'reveals'
+                  indicates whether the top of the stack is removed without
+                  a replacement, leaving the stack empty at zero
+        """
+        Program.__init__(self, [symbol for symbol in tables
+                                if symbol is not None])
+        self.controls = controls
+        self.counter_symbol = counter_symbol
+
+        # The last number pads the input to whole grams, and changes nothing
+        padding = [(number, 0, False, number)
+                   for number in range(len(controls))]
+        rows = [tables[symbol] for symbol in self.symbols] + \
+            [tables[None], padding]
+
+        def column(index, dtype):
+            return numpy.array([[entry[index] for entry in row]
+                                for row in rows], dtype)
+
+        counts = column(1, numpy.int64)
+        self.symbol_summaries = (
+            column(0, numpy.intp), counts,
+            numpy.where(column(2, bool), 0, UNREVEALED),
+            numpy.where(counts > 0, LEAVES_ZERO, column(3, numpy.intp)))
+
+        # Summaries of all sequences of GRAM numbered symbols, of which the
+        # number is the sum of their numbers times powers of len(rows)
+        summaries = self.symbol_summaries
+        for length in range(1, GRAM):
+            summaries = compose(
+                tuple(numpy.tile(array, (len(rows), 1))
+                      for array in summaries),
+                tuple(numpy.repeat(array, len(rows) ** length, 0)
+                      for array in self.symbol_summaries))
+        self.gram_summaries = summaries
+
+    def run(self, list_of_symbols):
+        """
+        Run the PDA from its start configuration on all input symbols
+        returns: A tuple (state name, stack) of the configuration the PDA
+                 ends in
+        """
+        return self.configuration(*self.evaluate_part(list_of_symbols, 0, 0))
+
+    def configuration(self, control, counter):
+        """ The tuple (state name, stack) of a control and a counter """
+        state_name, top = self.controls[control]
+        stack = [self.counter_symbol] * counter
+        if top is not None:
+            stack.append(top)
+        return state_name, stack
+
+    def identity(self):
+        """ The summary of no input """
+        return tuple(array[-1] for array in self.symbol_summaries)
+
+    def levels(self, codes):
+        """
+        Summaries of the numbered input symbols (see encode) in grams of
+        GRAM symbols, and of pairs of grams, pairs of pairs and so on, up to
+        a single summary
+        returns: A list of summaries, of which the arrays have a row for
+                 every gram, pair and so on
+        """
+        padding = len(self.symbol_summaries[0]) - 1
+        codes = numpy.concatenate(
+            (codes, numpy.full(-len(codes) % GRAM, padding, numpy.intp)))
+        grams = codes.reshape(-1, GRAM) @ \
+            (padding + 1) ** numpy.arange(GRAM)
+        level = tuple(array[grams] for array in self.gram_summaries)
+        levels = [level]
+        while len(level[0]) > 1:
+            if len(level[0]) % 2:
+                level = tuple(numpy.concatenate((array, [part]))
+                              for array, part in zip(level, self.identity()))
+            level = compose(tuple(array[0::2] for array in level),
+                            tuple(array[1::2] for array in level))
+            levels.append(level)
+        return codes, levels
+
+    def summarize(self, list_of_symbols):
+        """
+        Summarize a part of the input for run_parallel
+        returns: A summary (see above)
+        """
+        codes = self.encode(list_of_symbols)
+        summary = self.identity()
+        for start in range(0, len(codes), BLOCK_SIZE):
+            _, levels = self.levels(codes[start:start + BLOCK_SIZE])
+            summary = compose(summary,
+                              tuple(array[0] for array in levels[-1]))
+        return summary
+
+    def evaluate_part(self, list_of_symbols, control, counter):
+        """
+        Run the PDA on a part of the input from a control and a counter.
+        Summaries are only followed while they are exact, otherwise their
+        halves are followed, down to the single symbols at which the
+        counter leaves zero or the top of the stack is removed at zero.
+        returns: A tuple (control, counter) of the configuration the PDA
+                 ends in
+        """
+        codes = self.encode(list_of_symbols)
+        for start in range(0, len(codes), BLOCK_SIZE):
+            block, levels = self.levels(codes[start:start + BLOCK_SIZE])
+            control, counter = self.follow(block, levels, len(levels) - 1,
+                                           0, control, counter)
+        return control, counter
+
+    def follow(self, codes, levels, depth, index, control, counter):
+        """
+        Follow the summary of 'index' at 'depth' of levels (see levels)
+        codes:   The numbered symbols of the levels, padded to whole grams
+        returns: A tuple (control, counter)
+        """
+        next_controls, counts, lowest, zero_controls = levels[depth]
+        if counter + lowest[index, control] > 0:
+            return (int(next_controls[index, control]),
+                    counter + int(counts[index, control]))
+        if counter == 0 and zero_controls[index, control] != LEAVES_ZERO:
+            return int(zero_controls[index, control]), 0
+
+        if depth == 0:
+            # A single symbol either keeps the counter above zero, or
+            # removes the top of the stack at zero
+            next_controls, counts, lowest, zero_controls = \
+                self.symbol_summaries
+            for code in codes[index * GRAM:(index + 1) * GRAM]:
+                if counter + lowest[code, control] > 0:
+                    counter += int(counts[code, control])
+                    control = int(next_controls[code, control])
+                else:
+                    control = int(zero_controls[code, control])
+            return control, counter
+
+        for half in [2 * index, 2 * index + 1]:
+            if half < len(levels[depth - 1][0]):
+                control, counter = self.follow(codes, levels, depth - 1,
+                                               half, control, counter)
+        return control, counter
+
+    def combine(self, summaries, evaluate):
+        """
+        Chain the parts of the input in order, see CounterProgram.combine.
+        A part is only evaluated if its summary is not exact, which depends
+        on the parts before it.
+        """
+        control = counter = 0
+        for index, summary in enumerate(summaries):
+            next_controls, counts, lowest, zero_controls = summary
+            if counter + lowest[control] > 0:
+                counter += int(counts[control])
+                control = int(next_controls[control])
+            elif counter == 0 and zero_controls[control] != LEAVES_ZERO:
+                control = int(zero_controls[control])
+            else:
+                [(control, counter)] = evaluate([(index, control, counter)])
+        return self.configuration(control, counter)
+
+
+def compose(first, second):
+    """
+    The summary of two consecutive parts of the input for a ControlProgram,
+    where the arrays of the summaries may also have a row for every part
+    returns: A tuple (next controls, counts, lowest, zero controls)
+    """
+    first_controls, first_counts, first_lowest, first_zero = first
+
+    # Positions in the flattened arrays of the second summary
+    offsets = 0
+    if first_controls.ndim == 2:
+        offsets = numpy.arange(0, first_controls.size,
+                               first_controls.shape[1])[:, None]
+    positions = first_controls + offsets
+    second_controls, second_counts, second_lowest, second_zero = second
+
+    zero = numpy.take(second_zero, numpy.maximum(first_zero, 0) + offsets)
+    return (numpy.take(second_controls, positions),
+            first_counts + numpy.take(second_counts, positions),
+            numpy.minimum(first_lowest,
+                          first_counts + numpy.take(second_lowest,
+                                                    positions)),
+            numpy.where(first_zero == LEAVES_ZERO, LEAVES_ZERO, zero))
+
+
+def run_parallel(program, list_of_symbols, workers=None, chunks=None):
+    """
+    Run a recognized PDA (see recognize) from its start configuration on a
+    single long input, using a pool of worker processes. The input is split
+    into chunks, which the workers number and summarize (see summarize), so
+    that only the summaries are sent back. These are chained in order, and
+    the chunks that a summary does not decide, because the counter may drop
+    to zero in them, are evaluated by the workers as well (see combine).
+    workers: The number of worker processes, defaults to the number of
+             CPUs. With a single worker no processes are started.
+    chunks:  The number of chunks, defaults to four per worker
+    returns: A tuple (state name, stack) of the configuration the PDA ends in
+    """
+    if chunks is None:
+        chunks = 4 * (workers or multiprocessing.cpu_count())
+    size = max(1, -(-len(list_of_symbols) // chunks))
+    parts = [list_of_symbols[start:start + size]
+             for start in range(0, len(list_of_symbols), size)]
+
+    def arguments(tasks):
+        return [(parts[task[0]],) + tuple(task[1:]) for task in tasks]
+
+    if workers == 1:
+        summaries = [program.summarize(part) for part in parts]
+        return program.combine(summaries, lambda tasks: [
+            program.evaluate_part(*task) for task in arguments(tasks)])
+
+    with multiprocessing.Pool(workers, _init_worker, (program,)) as pool:
+        summaries = pool.map(_summarize_worker, parts, 1)
+        return program.combine(summaries, lambda tasks: pool.starmap(
+            _evaluate_worker, arguments(tasks), 1))
+
+
+def _init_worker(program):
+    global _worker_program
+    _worker_program = program
+
+
+def _summarize_worker(list_of_symbols):
+    return _worker_program.summarize(list_of_symbols)
+
+
+def _evaluate_worker(list_of_symbols, *start):
+    return _worker_program.evaluate_part(list_of_symbols, *start)
+
+
+def recognize(pda):
+    """
+    Check whether a PDA uses its stack purely as a counter (see above)
+    returns: A CounterProgram or a ControlProgram for the PDA, or None if it
+             is not such a PDA or numpy is not available
+    """
+    if numpy is None or pda.pda_type != "final_state":
+        return None
+    program = recognize_counter(pda)
+    if program is None:
+        program = recognize_control(pda)
+    return program
+
+
+def recognize_counter(pda):
+    """
+    Check whether a PDA has a main state, a check state and sinks (see
+    above)
+    returns: A CounterProgram for the PDA, or None if it is not such a PDA
+    """
+    main = pda.start_state
+    if main not in pda.final_states:
+        return None
+
+    sinks = set(state.name for state in pda.states.values()
+                if not state.transition_table and
+                state not in pda.final_states)
+
+    # The counter symbol is the only stack symbol besides '⊥'
+    stack_symbols = set()
+    for state in pda.states.values():
+        for (_, top), (_, rhs) in state.transition_table.items():
+            stack_symbols.add(top)
+            if rhs != "ϵ":
+                stack_symbols.update(rhs)
+    stack_symbols.discard('⊥')
+    if len(stack_symbols) > 1 or 'ϵ' in stack_symbols:
+        return None
+    counter = stack_symbols.pop() if stack_symbols else None
+
+    operations = {(): DECREMENT, (counter,): UNCHANGED,
+                  (counter, counter): INCREMENT}
+
+    tables = {}
+    for symbol in pda.input_alphabet:
+        tables[symbol] = {'delta': UNCHANGED, 'reject_above': False,
+                          'reject_zero': False, 'enter_check': False,
+                          'check_handled': False, 'check_reject': False}
+
+    # Relations of the main state when the counter is not zero
+    for (symbol, top), (state_name, rhs) in main.transition_table.items():
+        if top == '⊥':
+            continue
+        pushed = () if rhs == "ϵ" else tuple(rhs)
+        if state_name in sinks:
+            tables[symbol]['reject_above'] = True
+        elif state_name == main.name and pushed in operations:
+            tables[symbol]['delta'] = operations[pushed]
+        else:
+            return None
+
+    # Relations of the main state when the counter is zero
+    check = None
+    for symbol, row in tables.items():
+        relation = main.transition_table.get((symbol, '⊥'))
+        delta = row['delta']
+        if relation is None:
+            # No transition, which leaves the counter unchanged
+            if delta != UNCHANGED:
+                return None
+            continue
+        state_name, rhs = relation
+        if state_name in sinks:
+            row['reject_zero'] = True
+        elif state_name == main.name:
+            if not (rhs == ['⊥'] and delta == UNCHANGED) and \
+                    not (rhs == [counter, '⊥'] and delta == INCREMENT):
+                return None
+        elif rhs == ['⊥'] and delta == UNCHANGED and \
+                (check is None or check.name == state_name):
+            check = pda.states[state_name]
+            row['enter_check'] = True
+        else:
+            return None
+
+    # Relations of the check state, which is only reached at zero
+    if check is not None:
+        for (symbol, top), (state_name, rhs) in \
+                check.transition_table.items():
+            row = tables[symbol]
+            if top != '⊥':
+                return None
+            if state_name in sinks:
+                row['check_handled'] = row['check_reject'] = True
+            elif state_name == main.name and rhs == ['⊥'] and \
+                    row['delta'] == UNCHANGED and not row['enter_check']:
+                row['check_handled'] = True
+            elif state_name != check.name or rhs != ['⊥']:
+                return None
+
+        # Symbols skipped in the check state must not act in the main state
+        for row in tables.values():
+            if not row['check_handled'] and \
+                    (row['delta'] != UNCHANGED or row['reject_zero']):
+                return None
+
+    return CounterProgram(main, check, counter, tables)
+
+
+def recognize_control(pda):
+    """
+    Check whether every relation of a PDA replaces the top of the stack by
+    a new top with only copies of a single counter symbol below it, or
+    removes the top without a replacement (see ControlProgram)
+    returns: A ControlProgram for the PDA, or None if it is not such a PDA
+    """
+    counter = None
+    for state in pda.states.values():
+        for _, rhs in state.transition_table.values():
+            if rhs == "ϵ":
+                continue
+            if not rhs:
+                return None
+            for stack_symbol in rhs[1:]:
+                if counter is None:
+                    counter = stack_symbol
+                elif stack_symbol != counter:
+                    return None
+
+    # Number the controls which can be reached from the start configuration,
+    # the list grows while it is explored
+    controls = [(pda.start_state.name, '⊥')]
+    numbers = {controls[0]: 0}
+
+    def number(control):
+        if control not in numbers:
+            numbers[control] = len(controls)
+            controls.append(control)
+        return numbers[control]
+
+    # None stands for the symbols which have no relation at all
+    tables = dict((symbol, []) for symbol in pda.input_alphabet)
+    tables[None] = []
+    for state_name, top in controls:
+        transition_table = pda.states[state_name].transition_table
+        for symbol, row in tables.items():
+            relation = transition_table.get(
+                (symbol, 'ϵ' if top is None else top))
+            if relation is not None and relation[1] != "ϵ":
+                next_state_name, rhs = relation
+                row.append((number((next_state_name, rhs[0])), len(rhs) - 1,
+                            False, None))
+                continue
+
+            if relation is not None:
+                next_state_name = relation[0]
+            elif top == 'ϵ':
+                # The top 'ϵ' is not put back, see PDA.transition
+                next_state_name = state_name
+            else:
+                row.append((number((state_name, top)), 0, False, None))
+                continue
+
+            # The top is removed, revealing a counter symbol or an empty
+            # stack
+            empty = number((next_state_name, None))
+            if counter is None:
+                row.append((empty, 0, False, empty))
+            else:
+                row.append((number((next_state_name, counter)), -1, True,
+                            empty))
+
+    for row in tables.values():
+        for position, (control, count, reveals, empty) in enumerate(row):
+            if empty is None:
+                row[position] = (control, count, reveals, control)
+    return ControlProgram(controls, counter, tables)
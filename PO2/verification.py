@@ -14,9 +14,53 @@
     It will print the valid traces afterwards.
 """
 
-from PDA import PDA
+from collections import OrderedDict
+import dbm
+import hashlib
+import os
 import sys
 
+if __name__ == '__main__':
+    # The traces are read with the checkpoints of PO1, which PDA also uses
+    # to share its code with the other engines if available (see engine)
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'PO1'))
+
+from PDA import PDA  # noqa: E402
+import checkpoint  # noqa: E402
+
+
+# PDAs by the functions which create and compile them, created once and
+# shared by all verifications, which run them through cursors (see
+# shared_pda)
+shared_pdas = {}
+
+
+def shared_pda(create, compile_pda):
+    """
+    The PDA made by 'create' and compiled by 'compile_pda', which is only
+    created once. It must only be run through cursors (see PDA.cursor), so
+    that verifications in different threads do not interfere.
+    """
+    key = (create, compile_pda)
+    if key not in shared_pdas:
+        my_pda = create()
+        compile_pda(my_pda)
+        shared_pdas[key] = my_pda
+    return shared_pdas[key]
+
+
+def compile_bounded(my_pda):
+    """ Compile a PDA to an FA if its stack is bounded """
+    if not my_pda.compile_to_fa():
+        my_pda.compile_to_python()
+
+
+def compile_counter(my_pda):
+    """ Compile a PDA to a vectorized counter if it is one """
+    my_pda.compile_to_counter()
+    my_pda.compile_to_python()
+
 
 """
     This function defines a PDA to find out if a trace follows the correct
@@ -25,12 +69,10 @@ import sys
 """
 
 
-def verify_steps(trace):
+def create_steps_pda():
     """
-    Creates and uses a PDA to verify proper Turing machine (TM) position in a
-    single execution trace
-    trace: A list of events (tokens)
-    returns: True if the trace behaviour is valid, False otherwise
+    Creates the PDA which verifies that a trace consists of proper Turing
+    machine (TM) steps
     """
 
     """
@@ -58,18 +100,24 @@ def verify_steps(trace):
     F = ['READ']
     pda_type = 'final_state'
 
-    my_pda = PDA(Q, Sigma, Gamma, delta, s, F, pda_type, verbose=False)
+    return PDA.cached(Q, Sigma, Gamma, delta, s, F, pda_type, verbose=False)
+
+
+def verify_steps(trace):
+    """
+    Creates and uses a PDA to verify proper Turing machine (TM) position in a
+    single execution trace
+    trace: A list of events (tokens)
+    returns: True if the trace behaviour is valid, False otherwise
+    """
+    my_pda = shared_pda(create_steps_pda, compile_bounded).cursor()
 
     # Note: you can use my_pda.transition(symbol) to test a single transition
     """
     In the discussions a TA said you could also use the lack of a transition
     to see if a trace was false, so I did so.
     """
-    for i in range(len(trace)):
-        if(not my_pda.transition(trace[i])):
-            return False
-
-    return my_pda.is_final()
+    return my_pda.transition_all(trace, stop=True)
 
 
 """
@@ -78,12 +126,10 @@ def verify_steps(trace):
 """
 
 
-def verify_position(trace):
+def create_position_pda():
     """
-    Creates and uses a PDA to verify proper Turing machine (TM) position in a
-    single execution trace
-    trace: A list of events (tokens)
-    returns: True if the trace behaviour is valid, False otherwise
+    Creates the PDA which verifies that the head of a Turing machine (TM)
+    stays on the tape
     """
 
     """
@@ -106,8 +152,17 @@ def verify_position(trace):
     F = ['ONTAPE']
     pda_type = 'final_state'
 
-    my_pda = PDA(Q, Sigma, Gamma, delta, s, F, pda_type, verbose=False)
+    return PDA.cached(Q, Sigma, Gamma, delta, s, F, pda_type, verbose=False)
 
+
+def verify_position(trace):
+    """
+    Creates and uses a PDA to verify proper Turing machine (TM) position in a
+    single execution trace
+    trace: A list of events (tokens)
+    returns: True if the trace behaviour is valid, False otherwise
+    """
+    my_pda = shared_pda(create_position_pda, compile_counter).cursor()
     return my_pda.transition_all(trace)
 
 
@@ -117,12 +172,10 @@ def verify_position(trace):
 """
 
 
-def verify_lem(trace):
+def create_lem_pda():
     """
-    Creates and uses a PDA to verify Turing machine (TM) left endmarker safety
-    for a single execution trace
-    trace: A list of events (tokens)
-    returns: True if the trace behaviour is valid, False otherwise
+    Creates the PDA which verifies that a Turing machine (TM) never
+    overwrites the left endmarker
     """
 
     """
@@ -146,21 +199,250 @@ def verify_lem(trace):
     F = ['SAFE']
     pda_type = 'final_state'
 
-    my_pda = PDA(Q, Sigma, Gamma, delta, s, F, pda_type, verbose=False)
+    return PDA.cached(Q, Sigma, Gamma, delta, s, F, pda_type, verbose=False)
+
 
+def verify_lem(trace):
+    """
+    Creates and uses a PDA to verify Turing machine (TM) left endmarker safety
+    for a single execution trace
+    trace: A list of events (tokens)
+    returns: True if the trace behaviour is valid, False otherwise
+    """
+    my_pda = shared_pda(create_lem_pda, compile_counter).cursor()
     return my_pda.transition_all(trace)
 
 
-def main(path):
+def verify_runs(trace_runs):
+    """
+    Verifies a run-length compressed trace with the PDAs of verify_steps,
+    verify_position and verify_lem, without decompressing it
+    trace_runs: A list of (block, count) tuples, where a block is a tuple of
+                tokens (see runs.project)
+    returns: True if the trace behaviour is valid, False otherwise
+    """
+    pdas = shared_cursors()
+    if not pdas[0].transition_runs(trace_runs, stop=True):
+        return False
+
+    for my_pda in pdas[1:]:
+        if not my_pda.transition_runs(trace_runs):
+            return False
+    return True
+
+
+def verify_parallel(trace, workers=None, chunks=None):
+    """
+    Verifies a single long trace with the PDAs of verify_steps,
+    verify_position and verify_lem, of which worker processes summarize
+    chunks that are combined in order (see PDA.transition_all_parallel)
+    trace:   A list of events (tokens)
+    workers: The number of worker processes, defaults to the number of CPUs
+    chunks:  The number of chunks, defaults to four per worker
+    returns: True if the trace behaviour is valid, False otherwise
+    """
+    pdas = shared_cursors()
+    if not pdas[0].transition_all_parallel(trace, workers, chunks,
+                                           stop=True):
+        return False
+
+    for my_pda in pdas[1:]:
+        if not my_pda.transition_all_parallel(trace, workers, chunks):
+            return False
+    return True
+
+
+def shared_cursors():
+    """
+    New cursors of the PDAs of verify_steps, verify_position and verify_lem
+    """
+    return [shared_pda(create_steps_pda, compile_bounded).cursor(),
+            shared_pda(create_position_pda, compile_counter).cursor(),
+            shared_pda(create_lem_pda, compile_counter).cursor()]
+
+
+def start_partial():
+    """
+    The configurations of the PDAs of verify_steps, verify_position and
+    verify_lem before a trace, for traces which are verified in parts
+    """
+    return [my_pda.get_configuration() for my_pda in shared_cursors()]
+
+
+def continue_partial(configurations, trace):
+    """
+    Feed the next part of a trace to the PDAs
+    configurations: See start_partial, or None if the trace is known to be
+                    invalid already
+    trace:   A list of events (tokens)
+    returns: The new configurations, or None if the trace is invalid
+    """
+    if configurations is None:
+        return None
+
+    pdas = shared_cursors()
+    for my_pda, configuration in zip(pdas, configurations):
+        my_pda.set_configuration(configuration)
+
+    # A step without a transition makes the trace invalid (see verify_steps)
+    steps_pda = pdas[0]
+    for token in trace:
+        if not steps_pda.transition(token):
+            return None
+    for my_pda in pdas[1:]:
+        my_pda.transition_all(trace)
+    return [my_pda.get_configuration() for my_pda in pdas]
+
+
+def finish_partial(configurations):
+    """
+    Check the configurations of the PDAs at the end of a trace
+    returns: True if the trace behaviour is valid, False otherwise
+    """
+    if configurations is None:
+        return False
+
+    pdas = shared_cursors()
+    for my_pda, configuration in zip(pdas, configurations):
+        my_pda.set_configuration(configuration)
+    return all(my_pda.is_accepting() for my_pda in pdas)
+
+
+class VerdictCache:
+    """
+    Verdicts of traces, by a hash of their tokens. The most recently used
+    verdicts are kept in memory, and all verdicts can also be kept on disk so
+    that they survive between runs. The hash is keyed with the definitions of
+    the PDAs, so changing a PDA invalidates the verdicts on disk.
+    """
+    __slots__ = ('size', 'memory', 'disk', 'version')
+
+    def __init__(self, size=65536, path=None):
+        """
+        size: The maximum number of verdicts kept in memory
+        path: The file (a dbm database) in which verdicts are kept on disk,
+              or None to only keep them in memory
+        """
+        self.size = size
+        self.memory = OrderedDict()
+        self.disk = None if path is None else dbm.open(path, 'c')
+        definitions = [create().get_tables() for create in
+                       [create_steps_pda, create_position_pda,
+                        create_lem_pda]]
+        self.version = hashlib.blake2b(repr(definitions).encode('utf-8'),
+                                       digest_size=32).digest()
+
+    def key(self, trace):
+        """
+        The hash of a trace, which does not depend on the whitespace that
+        separated its tokens
+        trace: A list of events (tokens)
+        """
+        return hashlib.blake2b(' '.join(trace).encode('utf-8'),
+                               digest_size=16, key=self.version).digest()
+
+    def get(self, key):
+        """
+        Look up a verdict
+        returns: True or False, or None if the verdict is not known
+        """
+        try:
+            verdict = self.memory[key]
+            self.memory.move_to_end(key)
+            return verdict
+        except KeyError:
+            pass
+
+        if self.disk is None or key not in self.disk:
+            return None
+        verdict = self.disk[key] == b'1'
+        self.remember(key, verdict)
+        return verdict
+
+    def put(self, key, verdict):
+        """
+        Store a verdict in memory and, if there is one, on disk
+        """
+        self.remember(key, verdict)
+        if self.disk is not None:
+            self.disk[key] = b'1' if verdict else b'0'
+
+    def remember(self, key, verdict):
+        """ Keep a verdict in memory, forgetting the least recently used """
+        self.memory[key] = verdict
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+
+def main(path, cache=None, checkpoints=None):
     """
     Reads multiple tokenized traces from the file at 'path' and feeds them to
-    the various verification functions.
+    the various verification functions. Identical traces are verified only
+    once, and traces of which the verdict is in 'cache' (a VerdictCache) are
+    not verified at all.
+    With 'checkpoints' (a checkpoint.CheckpointStore) only what was appended
+    to the file since the previous call is read. A last trace without a
+    newline may still be growing, so the PDAs are run on it as far as
+    possible and their configurations are kept until a later call reads the
+    rest of it.
     """
-    # Read and parse traces
-    fo = open(path)
-    with fo as f:
-        traces = [trace.split() for trace in [line.rstrip('\n') for line in f]]
-    fo.close()
+    if cache is None:
+        cache = VerdictCache()
+
+    name = 'verification ' + cache.version.hex()
+    offset, partial = 0, None
+    if checkpoints is not None:
+        offset, partial = checkpoints.load(path, name)
+
+    data = checkpoint.read_from(path, offset)
+    lines, rest = checkpoint.split_lines(data, final=checkpoints is None)
+    lines = [line.decode('utf-8') for line in lines]
+    position = offset + len(data) - len(rest)
+
+    # Finish the trace that was started by an earlier call
+    finished = None
+    if partial is not None and lines:
+        start, pending, configurations = partial
+        configurations = continue_partial(configurations,
+                                          (pending + lines[0]).split())
+        if finish_partial(configurations):
+            finished = checkpoint.read_from(
+                path, start, offset + len(lines[0].encode('utf-8')))
+        lines = lines[1:]
+        partial = None
+
+    # Start or continue the unfinished trace, keeping the text of the token
+    # which may still be continued
+    if rest:
+        text, length = checkpoint.decode_prefix(rest)
+        start, pending, configurations = partial or \
+            (position, '', start_partial())
+        text = pending + text
+        trace = text.split()
+        pending = ''
+        if trace and not text[-1].isspace():
+            pending = trace.pop()
+        partial = (start, pending, continue_partial(configurations, trace))
+        position += length
+
+    if finished is not None:
+        print(finished.decode('utf-8').split())
+
+    tokenized = [line.split() for line in lines]
+    keys = [cache.key(trace) for trace in tokenized]
+    verdicts = {}
+    traces = []
+    for key, trace in zip(keys, tokenized):
+        if key not in verdicts:
+            verdicts[key] = cache.get(key)
+            if verdicts[key] is None:
+                traces.append((key, trace))
 
     """
     This checks for every trace if the steps are correct and adds it to
@@ -168,7 +450,7 @@ def main(path):
     """
     steps_correct = []
     for i in range(len(traces)):
-        if(verify_steps(traces[i])):
+        if(verify_steps(traces[i][1])):
             steps_correct.append(traces[i])
 
     """
@@ -177,7 +459,7 @@ def main(path):
     """
     position_correct = []
     for i in range(len(steps_correct)):
-        if(verify_position(steps_correct[i])):
+        if(verify_position(steps_correct[i][1])):
             position_correct.append(steps_correct[i])
 
     """
@@ -186,18 +468,35 @@ def main(path):
     """
     lem_correct = []
     for i in range(len(position_correct)):
-        if(verify_lem(position_correct[i])):
+        if(verify_lem(position_correct[i][1])):
             lem_correct.append(position_correct[i])
 
+    # Remember the new verdicts
+    for key, _ in traces:
+        verdicts[key] = False
+    for key, _ in lem_correct:
+        verdicts[key] = True
+    for key, _ in traces:
+        cache.put(key, verdicts[key])
+
     """
     This prints the valid traces.
     """
-    for i in range(len(lem_correct)):
-        print(lem_correct[i])
+    for key, trace in zip(keys, tokenized):
+        if verdicts[key]:
+            print(trace)
+
+    if checkpoints is not None:
+        checkpoints.save(path, name, position, partial)
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
+    arguments = [argument for argument in sys.argv[1:]
+                 if argument != '--resume']
+    if len(arguments) < 1:
         sys.exit('RuntimeError: Use `python3 verification.py \
-                 tokenized_traces.txt`')
-    source = sys.argv[1]
-    main(source)
+                 tokenized_traces.txt [verdicts.db] [--resume]`')
+    source = arguments[0]
+    cache = VerdictCache(path=arguments[1] if len(arguments) > 1 else None)
+    main(source, cache, checkpoint.CheckpointStore() if '--resume' in
+         sys.argv else None)
+    cache.close()
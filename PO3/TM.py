@@ -7,16 +7,31 @@
 #   license.                                          #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
+import multiprocessing
 import sys
 
+try:
+    import engine
+except ImportError:
+    # Without PO1 (see engine) the automata are validated every time they
+    # are created, and compiled code is not shared between them
+    engine = None
+
 
 class TM:
     """
     Turing machine (TM)
     """
+    __slots__ = ('states', 'input_alphabet', 'input_symbols', 'tape_alphabet',
+                 'verbose', 'verbose_radius', 'verbose_every', 'max_steps',
+                 'start_state', 'accept_state', 'reject_state',
+                 'undefined_transitions', 'unreachable_states',
+                 'unsafe_transitions', 'is_safe', 'tape', 'current_state',
+                 'step_counter', 'input_string', 'compiled', 'profile')
 
     def __init__(self, Q, Sigma, Gamma, delta, s, t, r, verbose=False,
-                 no_halt=1000):
+                 no_halt=1000, verbose_radius=20, verbose_every=1,
+                 strict=False):
         """
         Creates the TM object and performs input sanitization
         Q:       The finite set of states (list of strings)
@@ -32,48 +47,37 @@ class TM:
         verbose: Indicator of whether to print updates after a transition.
         no_halt: The amount of steps the TM is allowed to make before it is
                  assumed that it will not halt
+        verbose_radius: The number of tape cells on either side of the head
+                 that are printed in verbose mode (None prints the whole tape)
+        verbose_every: In verbose mode, only print updates after every
+                 'verbose_every'-th transition
+        strict:  Indicator of whether to reject a TM for which the static
+                 analysis (see analyze) finds reachable missing or unsafe
+                 transitions
         """
 
-        # Verify that Gamma contains the left endmarker and blank symbol
-        if '⊔' not in Gamma:
-            sys.exit("TM-Error: Blank symbol \'⊔\' should be an element of" +
-                     " Gamma, but it is not")
-        if '⊢' not in Gamma:
-            sys.exit("TM-Error: Left endmarker symbol \'⊢\' should be an" +
-                     " element of Gamma, but it is not")
-
-        # Verify proper use of states
-        if len(Q) != len(set(Q)):
-            sys.exit("StateError: Q contains duplicates")
-
-        if s not in Q:
-            sys.exit("StateError: Start state \'" + s + "\' not in Q")
-
-        if t not in Q:
-            sys.exit("StateError: Accept state \'" + t + "\' not in Q")
-
-        if r not in Q:
-            sys.exit("StateError: Reject state \'" + r + "\' not in Q")
+        state_names, symbols = check_definition(Q, Sigma, Gamma, s, t, r,
+                                                verbose_every)
 
         # Verify proper use of transitions
         for lhs, rhs in delta:
 
             # Left-hand side
             state, tape_symbol = lhs
-            if state not in Q:
+            if state not in state_names:
                 sys.exit("TransitionError: State \'" + state +
                          "\' not in Q")
-            if tape_symbol not in Gamma:
+            if tape_symbol not in symbols:
                 sys.exit("TransitionError: Symbol \'" + tape_symbol +
                          "\' for transition \'" + str((lhs, rhs)) +
                          "\' not in Gamma")
 
             # Right-hand side
             state, tape_symbol, movement = rhs
-            if state not in Q:
+            if state not in state_names:
                 sys.exit("TransitionError: State \'" + state +
                          "\' not in Q")
-            if tape_symbol not in Gamma:
+            if tape_symbol not in symbols:
                 sys.exit("TransitionError: Symbol \'" + tape_symbol +
                          "\' for transition \'" + str((lhs, rhs)) +
                          "\' not in Gamma")
@@ -82,44 +86,146 @@ class TM:
                          "\' for relation \'" + str((lhs, rhs)) +
                          "\' does not equal either \'R\' or \'L\'")
 
-        # Verify that the tape alphabet contains the input alphabet as a subset
-        if not set(Sigma).issubset(Gamma):
-            sys.exit("TM-Error: Gamma does not contain all elements of Sigma")
-
-        # Create states
+        # Create states, grouping the transitions by state first
+        state_transitions = dict((name, []) for name in Q)
+        for transition in delta:
+            state_transitions[transition[0][0]].append(transition)
         self.states = {}
         for new_state_name in Q:
-            # Check if the state-to-be has any transitions
-            new_state_transitions = []
-            for transition in delta:
-                if transition[0][0] == new_state_name:
-                    new_state_transitions.append(transition)
-            new_state = State(new_state_name, new_state_transitions)
+            new_state = State(new_state_name,
+                              state_transitions[new_state_name])
             self.states[new_state_name] = new_state
 
         # Retain and assign variables
         self.input_alphabet = Sigma
+        self.input_symbols = frozenset(Sigma)
         self.tape_alphabet = Gamma
         self.verbose = verbose
+        self.verbose_radius = verbose_radius
+        self.verbose_every = verbose_every
         self.max_steps = no_halt
         self.start_state = self.states[s]
         self.accept_state = self.states[t]
         self.reject_state = self.states[r]
 
+        # Find missing and unsafe transitions before running the TM
+        self.analyze()
+
+        if self.undefined_transitions or self.unsafe_transitions:
+            message = ("missing transitions " +
+                       str(self.undefined_transitions) +
+                       ", unsafe transitions " +
+                       str(self.unsafe_transitions))
+            if strict:
+                sys.exit("TM-Error: The TM can reach " + message)
+            if verbose:
+                print("Warning: The TM can reach " + message)
+        if self.unreachable_states and verbose:
+            print("Warning: States " + str(self.unreachable_states) +
+                  " can not be reached from the start state")
+
         # Setup the tape and the rest of the TM
         self.tape = Tape("")  # init with empty tape
         self.current_state = self.start_state
         self.step_counter = 0
         self.input_string = None
+        self.compiled = None
+        self.profile = None
 
         if verbose:
             print("TM initialization complete, waiting for input...")
 
+    @classmethod
+    def cached(cls, Q, Sigma, Gamma, delta, s, t, r, verbose=False,
+               no_halt=1000, verbose_radius=20, verbose_every=1,
+               strict=False, cache_dir=None):
+        """
+        Creates the TM object like TM(Q, Sigma, Gamma, delta, s, t, r, ...),
+        but skips input sanitization and the static analysis if the same
+        definition was validated before by this process or stored in the
+        cache directory
+        cache_dir: See FA.cached
+        """
+        if engine is None:
+            return cls(Q, Sigma, Gamma, delta, s, t, r, verbose, no_halt,
+                       verbose_radius, verbose_every, strict)
+
+        key = engine.definition_key('TM', Q, Sigma, Gamma, delta, s, t, r)
+        cache_dir = engine.cache_directory(cache_dir)
+        tables = engine.read_tables(key, cache_dir)
+        if tables is None:
+            tm = cls(Q, Sigma, Gamma, delta, s, t, r, verbose, no_halt,
+                     verbose_radius, verbose_every, strict)
+            engine.write_tables(key, tm.get_tables(), cache_dir)
+            return tm
+
+        tm = cls.from_tables(tables, verbose, no_halt, verbose_radius,
+                             verbose_every)
+        if strict and (tm.undefined_transitions or tm.unsafe_transitions):
+            sys.exit("TM-Error: The TM can reach missing transitions " +
+                     str(tm.undefined_transitions) +
+                     ", unsafe transitions " + str(tm.unsafe_transitions))
+        return tm
+
+    def get_tables(self):
+        """
+        Retrieve the validated and analyzed TM as a tuple of built-in types
+        (see cached)
+        """
+        return ([(state.name, state.transition_table)
+                 for state in self.states.values()],
+                list(self.input_alphabet), list(self.tape_alphabet),
+                self.start_state.name, self.accept_state.name,
+                self.reject_state.name, self.undefined_transitions,
+                self.unreachable_states, self.unsafe_transitions)
+
+    @classmethod
+    def from_tables(cls, tables, verbose=False, no_halt=1000,
+                    verbose_radius=20, verbose_every=1):
+        """
+        Create a TM from the tables of a TM that was validated and analyzed
+        before, without performing input sanitization
+        """
+        check_verbose_every(verbose_every)
+        state_tables, Sigma, Gamma, s, t, r, undefined, unreachable, \
+            unsafe = tables
+
+        tm = cls.__new__(cls)
+        tm.states = {}
+        for state_name, transition_table in state_tables:
+            state = State(state_name, [])
+            state.transition_table = transition_table
+            tm.states[state_name] = state
+        tm.input_alphabet = Sigma
+        tm.input_symbols = frozenset(Sigma)
+        tm.tape_alphabet = Gamma
+        tm.verbose = verbose
+        tm.verbose_radius = verbose_radius
+        tm.verbose_every = verbose_every
+        tm.max_steps = no_halt
+        tm.start_state = tm.states[s]
+        tm.accept_state = tm.states[t]
+        tm.reject_state = tm.states[r]
+        tm.undefined_transitions = undefined
+        tm.unreachable_states = unreachable
+        tm.unsafe_transitions = unsafe
+        tm.is_safe = not unsafe
+        tm.tape = Tape("")
+        tm.current_state = tm.start_state
+        tm.step_counter = 0
+        tm.input_string = None
+        tm.compiled = None
+        tm.profile = None
+        return tm
+
     def reset(self):
         """
         Reset the TM
         """
-        self.tape = Tape(self.input_string)
+        if self.is_safe:
+            self.tape = SafeTape(self.input_string)
+        else:
+            self.tape = Tape(self.input_string)
         self.current_state = self.start_state
         self.step_counter = 0
 
@@ -130,7 +236,7 @@ class TM:
 
         # Verify validity of the input string
         for element in input_string:
-            if element not in self.input_alphabet:
+            if element not in self.input_symbols:
                 sys.exit("InputError: Input symbol \'" + element +
                          "\' not in input alphabet")
 
@@ -140,7 +246,7 @@ class TM:
         if self.verbose:
             print("Input specified: " + self.input_string)
             print("New tape:")
-            print(self.tape)
+            print(self.tape.render(self.verbose_radius))
 
     def transition(self):
         """
@@ -149,7 +255,7 @@ class TM:
         """
 
         # Check if the TM has an input string
-        if not self.input_string:
+        if self.input_string is None:
             sys.exit("InputError: The TM has no input, specify using the" +
                      " set_input(input_string) function")
 
@@ -197,17 +303,63 @@ class TM:
         # Change state in accordance with the transition
         self.current_state = self.states[new_state_name]
 
-        if self.verbose:
+        if self.profile is not None:
+            self.count_transition(previous_state, current_tape_element)
+
+        self.step_counter += 1
+
+        if self.verbose and self.step_counter % self.verbose_every == 0:
             used_transition = ((previous_state.name, current_tape_element),
                                (new_state_name, new_tape_element, movement))
             print("Made transition using: " + str(used_transition))
             print("New tape:")
-            print(self.tape)
-
-        self.step_counter += 1
+            print(self.tape.render(self.verbose_radius))
 
         return True
 
+    def enable_profiling(self):
+        """
+        Start counting transitions per state and symbol and the maximum tape
+        extent (see get_profile). A TM stalls at most once, which ends the
+        run, so unlike FA and PDA it does not count failed transitions.
+        Profiling is off by default, in which case it costs a single check
+        per transition.
+        """
+        self.profile = {'transitions': {}, 'max_tape_extent': 0}
+
+    def disable_profiling(self):
+        """
+        Stop profiling and discard the counters
+        """
+        self.profile = None
+
+    def get_profile(self):
+        """
+        Retrieve the profiling counters
+        returns: None if profiling is off, otherwise a dictionary with
+                 'transitions' (a dictionary from state name to a dictionary
+                 from symbol to count, ready for a heatmap) and
+                 'max_tape_extent' (the number of tape cells used)
+        """
+        return self.profile
+
+    def get_profile_prometheus(self):
+        """
+        Retrieve the profiling counters in the Prometheus text format
+        """
+        if engine is None:
+            sys.exit("ImportError: The Prometheus format needs engine.py" +
+                     " of PO1")
+        return engine.prometheus_text('TM', self.profile)
+
+    def count_transition(self, state, symbol):
+        """ Count a transition from 'state' for 'symbol' while profiling """
+        counts = self.profile['transitions'].setdefault(state.name, {})
+        counts[symbol] = counts.get(symbol, 0) + 1
+        profile = self.profile
+        if len(self.tape.tape_actual) > profile['max_tape_extent']:
+            profile['max_tape_extent'] = len(self.tape.tape_actual)
+
     def has_halted(self):
         """
         Check whether the TM has halted.
@@ -221,8 +373,11 @@ class TM:
         returns: True if the input is accepted, False if rejected.
         """
 
-        while self.transition():
-            pass
+        if self.compiled is None or self.verbose or self.profile is not None:
+            while self.transition():
+                pass
+        else:
+            self.run_compiled_code()
 
         if self.current_state == self.accept_state:
             return True
@@ -232,6 +387,250 @@ class TM:
 
         sys.exit("TM-Error: Input was neither accepted or rejected")
 
+    def run_compiled_code(self):
+        """
+        Take TM steps with the code generated by compile_to_python until the
+        TM halts, with the same checks as transition
+        """
+        if self.input_string is None:
+            sys.exit("InputError: The TM has no input, specify using the" +
+                     " set_input(input_string) function")
+
+        run, state_names, state_numbers = self.compiled
+        trace = []
+        state, self.tape.index, self.step_counter, error = run(
+            self.tape.tape_actual, state_numbers[self.current_state.name],
+            self.tape.index, self.step_counter, self.max_steps, trace)
+        self.tape.trace_parts += trace
+        self.current_state = self.states[state_names[state]]
+
+        if error == 'loop':
+            sys.exit("LogicError: The TM has taken more than " +
+                     str(self.max_steps) + " steps without entering the" +
+                     " accept or reject state, it is unlikely to halt!")
+        if error == 'stall':
+            sys.exit("TM-Error: State \'" + str(self.current_state.name) +
+                     "\' has no transition for current tape symbol \'" +
+                     self.tape.read() + "\', the TM has stalled")
+        if error == 'overwrite':
+            sys.exit("TapeError: The TM has overwritten the left endmarker" +
+                     " at the leftmost piece of tape")
+        if error == 'off':
+            sys.exit("TapeError: The TM has moved off the tape")
+
+    def compile_to_python(self):
+        """
+        Generate Python source code specialized for this TM, which takes
+        steps with if/elif chains over numbered states and inlined tape
+        symbols instead of dictionary lookups and Tape method calls. Left
+        endmarker checks are only generated for transitions reading '⊢', and
+        left out entirely if the TM is proven safe (see analyze). The
+        compiled code is used by transition_all from then on (unless
+        verbose).
+        returns: The generated source code
+        """
+        state_names = list(self.states)
+        state_numbers = dict((name, number)
+                             for number, name in enumerate(state_names))
+        halting = (self.accept_state.name, self.reject_state.name)
+
+        lines = ["def run(tape, state, index, steps, max_steps, trace):",
+                 "    append = trace.append",
+                 "    while True:",
+                 "        if state == " +
+                 str(state_numbers[halting[0]]) + " or state == " +
+                 str(state_numbers[halting[1]]) + ":",
+                 "            return state, index, steps, None",
+                 "        if steps > max_steps:",
+                 "            return state, index, steps, 'loop'",
+                 "        symbol = tape[index]"]
+        keyword = "if"
+        for number, name in enumerate(state_names):
+            if name in halting:
+                continue
+            lines.append("        " + keyword + " state == " + str(number) +
+                         ":")
+            keyword = "elif"
+
+            symbol_keyword = "if"
+            for symbol, (new_state_name, new_symbol, movement) in \
+                    self.states[name].transition_table.items():
+                lines.append("            " + symbol_keyword +
+                             " symbol == " + repr(symbol) + ":")
+                symbol_keyword = "elif"
+
+                # Only the left endmarker can be read at index 0
+                if symbol == '⊢' and not self.is_safe:
+                    if new_symbol != '⊢':
+                        lines += ["                if index == 0:",
+                                  "                    return state, index," +
+                                  " steps, 'overwrite'"]
+                    if movement == 'L':
+                        lines += ["                if index == 0:",
+                                  "                    return state, index," +
+                                  " steps, 'off'"]
+
+                lines.append("                tape[index] = " +
+                             repr(new_symbol))
+                if movement == 'R':
+                    lines += ["                append(" +
+                              repr("- " + symbol + " + " + new_symbol +
+                                   " > ") + ")",
+                              "                index += 1",
+                              "                if index == len(tape):",
+                              "                    tape.append('⊔')"]
+                else:
+                    lines += ["                append(" +
+                              repr("- " + symbol + " + " + new_symbol +
+                                   " < ") + ")",
+                              "                index -= 1"]
+                lines.append("                state = " +
+                             str(state_numbers[new_state_name]))
+
+            if symbol_keyword == "if":
+                lines.append("            return state, index, steps," +
+                             " 'stall'")
+            else:
+                lines += ["            else:",
+                          "                return state, index, steps," +
+                          " 'stall'"]
+        lines.append("        steps += 1")
+        source = "\n".join(lines) + "\n"
+
+        self.compiled = (compile_function(source), state_names,
+                         state_numbers)
+        return source
+
+    def analyze(self):
+        """
+        Statically determine which transitions the TM can reach, without
+        running it. The tape is abstracted to the head being either on the
+        left endmarker (index 0) or further right, where it may read any input
+        symbol, the blank, or a symbol written by a reachable transition.
+        The results are stored in:
+        undefined_transitions: Reachable (state, symbol) pairs without a
+                               transition
+        unreachable_states:    States other than t and r that can not be
+                               reached from s
+        unsafe_transitions:    Reachable transitions that overwrite the left
+                               endmarker or move left from it
+        is_safe:               True if there are no unsafe transitions, in
+                               which case the tape safety checks are skipped
+        """
+        halting = (self.accept_state.name, self.reject_state.name)
+        readable = set(self.input_symbols)
+        readable.add('⊔')
+
+        # Abstract configurations (state, head on the left endmarker), and
+        # the pairs (state, symbol, head on the left endmarker) to check,
+        # so that every symbol is checked only once for every state
+        seen = set()
+        undefined = []
+        missing = set()
+        unsafe = []
+        todo = [(self.start_state.name, True)]
+        pairs = []
+        while todo or pairs:
+            if todo:
+                configuration = todo.pop()
+                if configuration in seen:
+                    continue
+                seen.add(configuration)
+
+                state_name, on_lem = configuration
+                if state_name in halting:
+                    continue
+                if on_lem:
+                    pairs.append((state_name, '⊢', True))
+                else:
+                    pairs.extend((state_name, symbol, False)
+                                 for symbol in readable)
+                continue
+
+            state_name, symbol, on_lem = pairs.pop()
+            table = self.states[state_name].transition_table
+            if symbol not in table:
+                if (state_name, symbol) not in missing:
+                    missing.add((state_name, symbol))
+                    undefined.append((state_name, symbol))
+                continue
+
+            new_state_name, new_symbol, movement = table[symbol]
+            if on_lem:
+                if new_symbol != '⊢' or movement == 'L':
+                    unsafe.append(((state_name, symbol), table[symbol]))
+                if movement == 'R':
+                    todo.append((new_state_name, False))
+                continue
+
+            if new_symbol not in readable:
+                # A new symbol may be read by every state seen so far
+                readable.add(new_symbol)
+                pairs.extend((name, new_symbol, False)
+                             for name, lem in seen
+                             if not lem and name not in halting)
+            todo.append((new_state_name, False))
+            if movement == 'L':
+                todo.append((new_state_name, True))
+
+        reached = set(state_name for state_name, _ in seen)
+        self.undefined_transitions = undefined
+        self.unreachable_states = [name for name in self.states
+                                   if name not in reached and
+                                   name not in halting]
+        self.unsafe_transitions = unsafe
+        self.is_safe = not unsafe
+
+    def compile(self):
+        """
+        Create a compact, picklable representation of the TM which can be
+        simulated without the TM object itself (see run_compiled)
+        returns: A tuple (transition table, start, accept, reject, input
+                 alphabet, max steps, is_safe). The transition table maps a
+                 state name to a dictionary from tape symbol to (state,
+                 symbol, step), where step is +1 for 'R' and -1 for 'L'.
+        """
+        table = {}
+        for name, state in self.states.items():
+            table[name] = {symbol: (new_state, new_symbol,
+                                    1 if movement == 'R' else -1)
+                           for symbol, (new_state, new_symbol, movement)
+                           in state.transition_table.items()}
+
+        return (table, self.start_state.name, self.accept_state.name,
+                self.reject_state.name, self.input_symbols, self.max_steps,
+                self.is_safe)
+
+    def run_many(self, inputs, workers=None, output=False, chunksize=256):
+        """
+        Run the TM on every input string in 'inputs' using a pool of worker
+        processes. The compiled TM is sent to every worker only once.
+        inputs:    An iterable of input strings
+        workers:   The number of worker processes, defaults to the number of
+                   CPUs. With a single worker no processes are started.
+        output:    Indicator of whether to also return the tape contents
+        chunksize: The number of inputs sent to a worker at a time
+        returns: A list containing, in the order of 'inputs', the verdict
+                 'accept', 'reject', 'loop' (more than no_halt steps) or
+                 'error' (the TM stalled or violated the tape), or a tuple
+                 (verdict, tape contents) if 'output' is True
+        """
+        machine = self.compile()
+
+        if workers == 1:
+            return [run_compiled(machine, input_string, output)
+                    for input_string in inputs]
+
+        # Check the inputs before starting the workers, since an input error
+        # ends a worker without a result and leaves the pool waiting for it
+        inputs = list(inputs)
+        for input_string in inputs:
+            check_input(self.input_symbols, input_string)
+
+        with multiprocessing.Pool(workers, _init_worker,
+                                  (machine, output)) as pool:
+            return list(pool.imap(_run_worker, inputs, chunksize))
+
     def get_tape_contents(self):
         """
         Retrieve a list representing the current finite part of the tape
@@ -247,9 +646,189 @@ class TM:
         # Omit the final space
         return self.tape.execution_trace[:-1]
 
+    def cursor(self):
+        """
+        Start a separate run of the TM, see Cursor
+        returns: A Cursor without input, see set_input
+        """
+        return Cursor(self)
+
+
+class Cursor:
+    """
+    A run of a TM which keeps only the configuration (tape, current state and
+    step counter) and the input. The cursors of a TM use its states and
+    compiled code without changing the TM itself, so one TM can be shared by
+    any number of runs at the same time, for example in different threads.
+    Compile the TM before handing out cursors; profiling counters are shared
+    by all its runs.
+    """
+    # Attributes of the machine used by the runs, which are taken when the
+    # cursor is created
+    shared = ('states', 'input_alphabet', 'input_symbols', 'tape_alphabet',
+              'verbose', 'verbose_radius', 'verbose_every', 'max_steps',
+              'start_state', 'accept_state', 'reject_state', 'is_safe',
+              'compiled', 'profile')
+    __slots__ = shared + ('machine', 'tape', 'current_state',
+                          'step_counter', 'input_string')
+
+    def __init__(self, machine):
+        self.machine = machine
+        for name in self.shared:
+            setattr(self, name, getattr(machine, name))
+        self.tape = Tape("")
+        self.current_state = machine.start_state
+        self.step_counter = 0
+        self.input_string = None
+
+    reset = TM.reset
+    set_input = TM.set_input
+    transition = TM.transition
+    transition_all = TM.transition_all
+    run_compiled_code = TM.run_compiled_code
+    count_transition = TM.count_transition
+    has_halted = TM.has_halted
+    get_tape_contents = TM.get_tape_contents
+    get_execution_trace = TM.get_execution_trace
+
+
+def compile_function(source):
+    """
+    Compile generated source code defining a function 'run', with
+    engine.compile_function if PO1 is available
+    """
+    if engine is not None:
+        return engine.compile_function(source)
+    namespace = {}
+    exec(compile(source, '<compiled automaton>', 'exec'), namespace)
+    return namespace['run']
+
+
+def check_definition(Q, Sigma, Gamma, s, t, r, verbose_every):
+    """
+    Exit if the states, alphabets or verbose_every of a TM (see TM) are not
+    valid, which does not depend on the number of tapes. The transitions
+    are checked by the constructor.
+    returns: A tuple (state names, tape symbols) of sets to check the
+             transitions with
+    """
+    # Verify that Gamma contains the left endmarker and blank symbol
+    if '⊔' not in Gamma:
+        sys.exit("TM-Error: Blank symbol \'⊔\' should be an element of" +
+                 " Gamma, but it is not")
+    if '⊢' not in Gamma:
+        sys.exit("TM-Error: Left endmarker symbol \'⊢\' should be an" +
+                 " element of Gamma, but it is not")
+
+    check_verbose_every(verbose_every)
+
+    # Verify proper use of states
+    state_names = set(Q)
+    if len(Q) != len(state_names):
+        sys.exit("StateError: Q contains duplicates")
+
+    for state, kind in [(s, "Start"), (t, "Accept"), (r, "Reject")]:
+        if state not in state_names:
+            sys.exit("StateError: " + kind + " state \'" + state +
+                     "\' not in Q")
+
+    # Verify that the tape alphabet contains the input alphabet as a subset
+    symbols = set(Gamma)
+    if not symbols.issuperset(Sigma):
+        sys.exit("TM-Error: Gamma does not contain all elements of Sigma")
+
+    return state_names, symbols
+
+
+def check_verbose_every(verbose_every):
+    """
+    Exit if 'verbose_every' (see TM) is not a positive number of transitions
+    """
+    if verbose_every < 1:
+        sys.exit("TM-Error: verbose_every should be at least 1, but it is " +
+                 str(verbose_every))
+
+
+def check_input(input_symbols, input_string):
+    """
+    Exit if 'input_string' contains a symbol that is not in 'input_symbols'
+    """
+    for element in input_string:
+        if element not in input_symbols:
+            sys.exit("InputError: Input symbol \'" + element +
+                     "\' not in input alphabet")
+
+
+def run_compiled(machine, input_string, output=False):
+    """
+    Run a compiled TM (see TM.compile) on a single input string
+    returns: The verdict 'accept', 'reject', 'loop' or 'error', or a tuple
+             (verdict, tape contents) if 'output' is True
+    """
+    table, state, accept, reject, input_symbols, max_steps, safe = machine
+    check_input(input_symbols, input_string)
+
+    tape = ['⊢']
+    tape += input_string
+    index = 0
+    steps = 0
+    verdict = None
+
+    while verdict is None:
+        if state == accept:
+            verdict = 'accept'
+        elif state == reject:
+            verdict = 'reject'
+        elif steps > max_steps:
+            verdict = 'loop'
+        else:
+            try:
+                state, symbol, step = table[state][tape[index]]
+            except KeyError:
+                verdict = 'error'
+                break
+
+            # Same left endmarker safety as Tape.write and Tape.move
+            if not safe and index == 0 and (symbol != '⊢' or step < 0):
+                verdict = 'error'
+                break
+
+            tape[index] = symbol
+            index += step
+            if index == len(tape):
+                tape.append('⊔')
+            steps += 1
+
+    if output:
+        return verdict, tape
+    return verdict
+
+
+# The compiled TM of a run_many worker process, set once by _init_worker
+_worker_machine = None
+_worker_output = False
+
+
+def _init_worker(machine, output):
+    global _worker_machine, _worker_output
+    _worker_machine = machine
+    _worker_output = output
+
+
+def _run_worker(input_string):
+    return run_compiled(_worker_machine, input_string, _worker_output)
+
+
+# Parts of the execution trace by tape symbol, shared between all tapes so
+# that taking a step does not need to build new strings
+read_fragments = {}
+write_fragments = {}
+
 
 class State:
     """State in a Turing machine (TM)"""
+    __slots__ = ('name', 'transition_table')
+
     def __init__(self, name, transitions):
         """
         name:        State name
@@ -272,6 +851,8 @@ class Tape:
     Tape (and head) of a Turing machine (TM)
     The tape also keeps track of the produced execution trace.
     """
+    __slots__ = ('tape_actual', 'index', 'trace_parts')
+
     def __init__(self, tm_input):
 
         # The (initial) relevant 'finite' part of the tape
@@ -283,35 +864,55 @@ class Tape:
         # The current index of the TM head
         self.index = 0
 
-        self.execution_trace = ""
+        # The parts of the execution trace, joined by execution_trace
+        self.trace_parts = []
 
-    def __str__(self):
-        # Assume a monospace terminal font.
-        tape_result = ""
-        head_result = ""
-
-        for index in range(0, len(self.tape_actual)):
-            if index > 0:
-                tape_result += ' '
-                head_result += ' '
-
-            # Check if the head should be pointing to the current element
-            if index == self.index:
-                head_result += '^'
-            else:
-                head_result += ' ' * len(self.tape_actual[index])
+    @property
+    def execution_trace(self):
+        """ The execution trace produced so far """
+        return ''.join(self.trace_parts)
 
-            tape_result += self.tape_actual[index]
+    def __str__(self):
+        return self.render()
 
-        tape_result += " ⊔ ⊔ ⊔ ..."
+    def render(self, radius=None):
+        """
+        Render the tape and a line with the head position below it
+        radius: The number of cells on either side of the head to render, the
+                whole tape is rendered if None. Cells that are left out are
+                shown as '...'.
+        """
+        # Assume a monospace terminal font.
+        first = 0
+        last = len(self.tape_actual)
+        if radius is not None:
+            first = max(first, self.index - radius)
+            last = min(last, self.index + radius + 1)
+
+        cells = self.tape_actual[first:last]
+        head_offset = sum(len(cell) + 1 for cell in cells[:self.index - first])
+
+        tape_result = ' '.join(cells)
+        if first > 0:
+            tape_result = "... " + tape_result
+            head_offset += 4
+        if last < len(self.tape_actual):
+            tape_result += " ..."
+        else:
+            tape_result += " ⊔ ⊔ ⊔ ..."
 
-        return tape_result + "\n" + head_result
+        return tape_result + "\n" + ' ' * head_offset + '^'
 
     def read(self):
         """ Read tape contents at the current position of the head """
 
-        self.execution_trace += "- " + self.tape_actual[self.index]
-        return self.tape_actual[self.index]
+        symbol = self.tape_actual[self.index]
+        try:
+            self.trace_parts.append(read_fragments[symbol])
+        except KeyError:
+            read_fragments[symbol] = "- " + symbol
+            self.trace_parts.append(read_fragments[symbol])
+        return symbol
 
     def write(self, symbol):
         """ Write symbol to the current position of the head """
@@ -321,24 +922,61 @@ class Tape:
             sys.exit("TapeError: The TM has overwritten the left endmarker" +
                      " at the leftmost piece of tape")
 
-        self.execution_trace += " + " + symbol
+        try:
+            self.trace_parts.append(write_fragments[symbol])
+        except KeyError:
+            write_fragments[symbol] = " + " + symbol
+            self.trace_parts.append(write_fragments[symbol])
         self.tape_actual[self.index] = symbol
 
     def move(self, direction):
-        """ Move position of the head either to the left or to the right """
+        """
+        Move position of the head either to the left or to the right, or keep
+        it in place ('S', only used by multi-tape TMs, see multitape.py)
+        """
         if direction == 'R':
             # Check if we are at the end of the current 'finite' part.
             if self.index == (len(self.tape_actual) - 1):
                 # Extend the finite part of the tape
                 self.tape_actual.append('⊔')
             self.index += 1
-            self.execution_trace += " > "
+            self.trace_parts.append(" > ")
         elif direction == 'L':
             # Check if we are at the beginning of the tape
             if self.index == 0:
                 sys.exit("TapeError: The TM has moved off the tape")
             self.index -= 1
-            self.execution_trace += " < "
+            self.trace_parts.append(" < ")
+        elif direction == 'S':
+            self.trace_parts.append(" = ")
         else:
             sys.exit("TapeError: Movement \'" + direction +
-                     "\' does not equal either \'R\' or \'L\'")
+                     "\' does not equal either \'R\', \'L\' or \'S\'")
+
+
+class SafeTape(Tape):
+    """
+    Tape for a TM which is proven to never overwrite or move left from the
+    left endmarker (see TM.analyze), so the safety checks are left out
+    """
+    __slots__ = ()
+
+    def write(self, symbol):
+        """ Write symbol to the current position of the head """
+        try:
+            self.trace_parts.append(write_fragments[symbol])
+        except KeyError:
+            write_fragments[symbol] = " + " + symbol
+            self.trace_parts.append(write_fragments[symbol])
+        self.tape_actual[self.index] = symbol
+
+    def move(self, direction):
+        """ Move position of the head either to the left or to the right """
+        if direction == 'R':
+            if self.index == (len(self.tape_actual) - 1):
+                self.tape_actual.append('⊔')
+            self.index += 1
+            self.trace_parts.append(" > ")
+        else:
+            self.index -= 1
+            self.trace_parts.append(" < ")
@@ -0,0 +1,503 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Turing machines with several tapes. Every tape has its own head, and a
+single transition reads the symbols under all heads, writes a symbol on
+every tape and moves every head to the right, to the left or keeps it in
+place. Many algorithms need a linear number of steps on such a TM instead of
+the quadratic number of steps spent shuttling back and forth on a single
+tape. A multi-tape TM can be converted to an equivalent single-tape TM (see
+MultiTapeTM.to_single_tape).
+"""
+
+from TM import check_definition, State, Tape, TM
+import sys
+
+
+# Movements of a head, 'S' keeps it in place
+MOVEMENTS = ['R', 'L', 'S']
+
+# Characters which separate the tracks of a cell in the symbols of a TM
+# converted to a single tape (see track_symbol)
+TRACK_CHARACTERS = '[|^]'
+
+
+class MultiTapeTM:
+    """
+    Turing machine (TM) with k tapes. The first tape starts with the input,
+    the other tapes start empty (only the left endmarker), and all heads
+    start on the left endmarker.
+    """
+    __slots__ = ('states', 'input_alphabet', 'input_symbols', 'tape_alphabet',
+                 'tape_count', 'verbose', 'verbose_radius', 'verbose_every',
+                 'max_steps', 'start_state', 'accept_state', 'reject_state',
+                 'tapes', 'current_state', 'step_counter', 'input_string')
+
+    def __init__(self, Q, Sigma, Gamma, delta, s, t, r, k, verbose=False,
+                 no_halt=1000, verbose_radius=20, verbose_every=1):
+        """
+        Creates the TM object and performs input sanitization
+        Q, Sigma, Gamma, s, t, r, verbose, no_halt, verbose_radius and
+        verbose_every: See TM
+        delta:   The transition function, a list of tuples containing elements
+                 of the form: ((Q, (Gamma, ...)), (Q, (Gamma, ...), (D, ...))),
+                 with a tape symbol and a movement for each of the k tapes.
+                 Where 'D' must equal 'R', 'L' or 'S', signalling movement to
+                 the right or left, or staying in place respectively.
+        k:       The number of tapes
+        """
+
+        state_names, symbols = check_definition(Q, Sigma, Gamma, s, t, r,
+                                                verbose_every)
+        if k < 1:
+            sys.exit("TM-Error: A TM needs at least one tape")
+
+        # Verify proper use of transitions
+        for lhs, rhs in delta:
+
+            # Left-hand side
+            state, tape_symbols = lhs
+            if state not in state_names:
+                sys.exit("TransitionError: State \'" + state +
+                         "\' not in Q")
+            if len(tape_symbols) != k:
+                sys.exit("TransitionError: Transition \'" + str((lhs, rhs)) +
+                         "\' does not read exactly " + str(k) + " symbols")
+
+            # Right-hand side
+            state, new_tape_symbols, movements = rhs
+            if state not in state_names:
+                sys.exit("TransitionError: State \'" + state +
+                         "\' not in Q")
+            if len(new_tape_symbols) != k or len(movements) != k:
+                sys.exit("TransitionError: Transition \'" + str((lhs, rhs)) +
+                         "\' does not write and move exactly " + str(k) +
+                         " times")
+            for tape_symbol in list(tape_symbols) + list(new_tape_symbols):
+                if tape_symbol not in symbols:
+                    sys.exit("TransitionError: Symbol \'" + tape_symbol +
+                             "\' for transition \'" + str((lhs, rhs)) +
+                             "\' not in Gamma")
+            for movement in movements:
+                if movement not in MOVEMENTS:
+                    sys.exit("TransitionError: Movement \'" + movement +
+                             "\' for transition \'" + str((lhs, rhs)) +
+                             "\' does not equal \'R\', \'L\' or \'S\'")
+
+        # Create states, with transition tables by tuples of tape symbols,
+        # grouping the transitions by state first
+        state_transitions = dict((name, []) for name in Q)
+        for lhs, rhs in delta:
+            state_transitions[lhs[0]].append(
+                ((lhs[0], tuple(lhs[1])), (rhs[0], tuple(rhs[1]),
+                                           tuple(rhs[2]))))
+        self.states = {}
+        for new_state_name in Q:
+            self.states[new_state_name] = State(
+                new_state_name, state_transitions[new_state_name])
+
+        # Retain and assign variables
+        self.input_alphabet = Sigma
+        self.input_symbols = frozenset(Sigma)
+        self.tape_alphabet = Gamma
+        self.tape_count = k
+        self.verbose = verbose
+        self.verbose_radius = verbose_radius
+        self.verbose_every = verbose_every
+        self.max_steps = no_halt
+        self.start_state = self.states[s]
+        self.accept_state = self.states[t]
+        self.reject_state = self.states[r]
+
+        # Setup the tapes and the rest of the TM
+        self.tapes = [Tape("") for _ in range(k)]
+        self.current_state = self.start_state
+        self.step_counter = 0
+        self.input_string = None
+
+        if verbose:
+            print("TM initialization complete, waiting for input...")
+
+    def reset(self):
+        """
+        Reset the TM
+        """
+        self.tapes = [Tape(self.input_string)] + \
+            [Tape("") for _ in range(self.tape_count - 1)]
+        self.current_state = self.start_state
+        self.step_counter = 0
+
+    def set_input(self, input_string):
+        """
+        Reset the TM and write a new input on the first tape
+        """
+
+        # Verify validity of the input string
+        for element in input_string:
+            if element not in self.input_symbols:
+                sys.exit("InputError: Input symbol \'" + element +
+                         "\' not in input alphabet")
+
+        self.input_string = input_string
+        self.reset()
+
+        if self.verbose:
+            print("Input specified: " + self.input_string)
+            print("New tapes:")
+            print(self.render())
+
+    def render(self):
+        """
+        Render all tapes, one below the other
+        """
+        return '\n'.join(tape.render(self.verbose_radius)
+                         for tape in self.tapes)
+
+    def transition(self):
+        """
+        Try to take a single step in the TM.
+        returns: True if the transition was successful, False otherwise.
+        """
+
+        # Check if the TM has an input string
+        if self.input_string is None:
+            sys.exit("InputError: The TM has no input, specify using the" +
+                     " set_input(input_string) function")
+
+        # Check whether the TM has already entered the accept or reject state
+        if self.has_halted():
+            if self.verbose:
+                print("Warning: the TM has already halted, no transition was" +
+                      " made")
+            return False
+
+        # Check whether we should assume that the TM is not going to halt
+        if self.step_counter > self.max_steps:
+            sys.exit("LogicError: The TM has taken more than " +
+                     str(self.max_steps) + " steps without entering the" +
+                     " accept or reject state, it is unlikely to halt!")
+
+        # Read the current elements from all tapes and try to transition
+        current_tape_elements = tuple(tape.read() for tape in self.tapes)
+
+        try:
+            new_state_name, new_tape_elements, movements = \
+                self.current_state.transition_table[current_tape_elements]
+
+        except KeyError:
+            sys.exit("TM-Error: State \'" + self.current_state.name +
+                     "\' has no transition for current tape symbols \'" +
+                     str(current_tape_elements) + "\', the TM has stalled")
+
+        # Write and move on every tape
+        for tape, new_tape_element, movement in \
+                zip(self.tapes, new_tape_elements, movements):
+            tape.write(new_tape_element)
+            tape.move(movement)
+
+        previous_state = self.current_state
+        self.current_state = self.states[new_state_name]
+        self.step_counter += 1
+
+        if self.verbose and self.step_counter % self.verbose_every == 0:
+            used_transition = ((previous_state.name, current_tape_elements),
+                               (new_state_name, new_tape_elements, movements))
+            print("Made transition using: " + str(used_transition))
+            print("New tapes:")
+            print(self.render())
+
+        return True
+
+    def has_halted(self):
+        """
+        Check whether the TM has halted.
+        """
+        return self.current_state == self.accept_state or \
+            self.current_state == self.reject_state
+
+    def transition_all(self):
+        """
+        Take TM steps until the input is accepted or rejected.
+        returns: True if the input is accepted, False if rejected.
+        """
+        while self.transition():
+            pass
+
+        if self.current_state == self.accept_state:
+            return True
+
+        if self.current_state == self.reject_state:
+            return False
+
+        sys.exit("TM-Error: Input was neither accepted or rejected")
+
+    def get_tape_contents(self, tape=0):
+        """
+        Retrieve a list representing the current finite part of a tape
+        touched by the TM
+        tape:    The number of the tape, the first tape (0) by default
+        """
+        return self.tapes[tape].tape_actual
+
+    def get_execution_trace(self, tape=None):
+        """
+        Retrieve a string representing the execution trace of the steps that
+        the TM has taken so far
+        tape:    The number of a tape to retrieve the trace of that tape only,
+                 in the format of a single-tape TM (with '=' for staying in
+                 place). By default the traces of all tapes are combined: for
+                 every step, the parts of the tapes are separated by ' | '.
+        """
+        if tape is not None:
+            # Omit the final space
+            return self.tapes[tape].execution_trace[:-1]
+
+        # Every step adds a read, a write and a move to the trace of a tape
+        steps = zip(*[zip(*[iter(tape.trace_parts)] * 3)
+                      for tape in self.tapes])
+        return ' '.join(' | '.join(''.join(parts).rstrip() for parts in step)
+                        for step in steps)
+
+    def to_single_tape(self, no_halt=None):
+        """
+        Convert the TM to a single-tape TM which accepts and rejects the same
+        inputs. Every cell of the single tape after the left endmarker holds
+        the cells of all k tapes (tracks), together with marks for the heads
+        that are on it (see track_symbol), while an input symbol stands for a
+        cell with that symbol on the first track and blanks on the others.
+        Which heads are on the left endmarker is kept in the state.
+        A step of this TM is simulated by a sweep to the left, collecting the
+        symbols under the heads, and a sweep from the left endmarker to the
+        right, writing the new symbols and moving the marks. Only the states
+        and symbols which can be reached from the start are created.
+        no_halt: See TM. By default a bound for the steps of the sweeps if
+                 the input is not longer than max_steps.
+        returns: A TM object
+        """
+        k = self.tape_count
+        for symbol in self.tape_alphabet:
+            if any(char in TRACK_CHARACTERS for char in symbol):
+                sys.exit("TM-Error: Symbol \'" + symbol + "\' can not be" +
+                         " used in a track of a single-tape TM")
+        blank_tracks = ('⊔',) * (k - 1)
+        halting = {self.accept_state.name: 't', self.reject_state.name: 'r'}
+        everywhere = frozenset(range(k))
+
+        # The tracks and head marks of the symbols of the single tape
+        cells = dict((symbol, ((symbol,) + blank_tracks, frozenset()))
+                     for symbol in self.tape_alphabet if symbol != '⊢')
+
+        def write_cell(tracks, marks):
+            if not marks and tracks[1:] == blank_tracks and \
+                    tracks[0] != '⊢':
+                return tracks[0]
+            symbol = track_symbol(tracks, marks)
+            cells[symbol] = (tracks, marks)
+            return symbol
+
+        def decide(state_name, found, at_start):
+            """
+            The single-tape step on the left endmarker, after the symbols
+            under all heads are collected
+            """
+            rhs = self.states[state_name].transition_table.get(tuple(found))
+            if rhs is None:
+                # The TM stalls
+                return None
+            _, new_tape_elements, movements = rhs
+
+            # Write and move the heads on the left endmarker in the order of
+            # the tapes, so that the single tape fails in the same way
+            for head in sorted(at_start):
+                if new_tape_elements[head] != '⊢':
+                    return ('stuck',), new_tape_elements[head], 'R'
+                if movements[head] == 'L':
+                    return ('stuck',), '⊢', 'L'
+            staying = frozenset(head for head in at_start
+                                if movements[head] == 'S')
+            pending = frozenset(head for head in at_start
+                                if movements[head] == 'R')
+            return ('apply', rhs, staying, pending, k - len(at_start)), \
+                '⊢', 'R'
+
+        def collect(found, tracks, marks):
+            found = list(found)
+            for head in marks:
+                found[head] = tracks[head]
+            return tuple(found)
+
+        def step(control, symbol):
+            """
+            The single-tape step for a control state reading 'symbol'. The
+            control states are:
+            ('collect', state, at start, found): sweeping left, with the
+                symbols found under the heads so far
+            ('apply', transition, at start, pending, remaining): sweeping
+                right, with the heads that move onto this cell and the
+                number of heads yet to be found
+            ('left', transition, at start, marks, pending, remaining,
+                found): one cell to the left to put the heads in 'marks',
+                after which the sweep continues to the right, or to the
+                left collecting if 'found' is not None
+            ('back', ...): back to the right after 'left'
+            returns: A tuple (control state, written symbol, movement), or
+                     None if there is no transition
+            """
+            kind = control[0]
+            if kind == 'stuck':
+                return None
+            if symbol == '⊢':
+                if kind == 'collect':
+                    _, state_name, at_start, found = control
+                    return decide(state_name, collect(
+                        found, ('⊢',) * k, at_start), at_start)
+                if kind == 'left':
+                    _, rhs, at_start, marks, pending, remaining, found = \
+                        control
+                    at_start = at_start | marks
+                    if found is not None:
+                        return decide(rhs[0], collect(
+                            found, ('⊢',) * k, at_start), at_start)
+                    return ('back', rhs, at_start, pending, remaining), \
+                        '⊢', 'R'
+                return None
+            if symbol not in cells:
+                return None
+            tracks, marks = cells[symbol]
+
+            # Combinations of a control state and a cell which can not occur
+            # have no transitions, which also keeps the exploration finite
+            if kind == 'collect':
+                _, state_name, at_start, found = control
+                if any(found[head] is not None for head in marks) or \
+                        marks & at_start:
+                    return None
+                return ('collect', state_name, at_start,
+                        collect(found, tracks, marks)), symbol, 'L'
+
+            if kind == 'back':
+                return ('apply',) + control[1:], symbol, 'R'
+
+            if kind == 'left':
+                _, rhs, at_start, new_marks, pending, remaining, found = \
+                    control
+                if marks & new_marks:
+                    return None
+                marks = marks | new_marks
+                new_symbol = write_cell(tracks, marks)
+                if found is not None:
+                    return ('collect', rhs[0], at_start,
+                            collect(found, tracks, marks)), new_symbol, 'L'
+                return ('back', rhs, at_start, pending, remaining), \
+                    new_symbol, 'R'
+
+            # Write and move the heads on this cell
+            _, rhs, at_start, pending, remaining = control
+            if len(marks) > remaining or marks & (pending | at_start):
+                return None
+            new_state_name, new_tape_elements, movements = rhs
+            tracks = tuple(new_tape_elements[head] if head in marks else
+                           track for head, track in enumerate(tracks))
+            right = frozenset(head for head in marks
+                              if movements[head] == 'R')
+            left = frozenset(head for head in marks
+                             if movements[head] == 'L')
+            new_marks = pending | frozenset(head for head in marks
+                                            if movements[head] == 'S')
+            new_symbol = write_cell(tracks, new_marks)
+            remaining -= len(marks)
+            if remaining or right:
+                if left:
+                    return ('left', rhs, at_start, left, right, remaining,
+                            None), new_symbol, 'L'
+                return ('apply', rhs, at_start, right, remaining), \
+                    new_symbol, 'R'
+
+            # All heads are on this cell or to the left of it
+            if new_state_name in halting:
+                return halting[new_state_name], new_symbol, 'L'
+            found = collect((None,) * k, tracks, new_marks)
+            if left:
+                return ('left', rhs, at_start, left, right, remaining,
+                        found), new_symbol, 'L'
+            return ('collect', new_state_name, at_start, found), \
+                new_symbol, 'L'
+
+        # Explore the control states and symbols reachable from the start,
+        # following every pair of a control state and a symbol once
+        controls = {}
+        symbols = ['⊢'] + list(cells)
+        known_symbols = set(symbols)
+        pairs = []
+        delta = []
+
+        def number(control):
+            if control in halting.values():
+                return control
+            if control not in controls:
+                controls[control] = 'M' + str(len(controls))
+                pairs.extend((control, symbol) for symbol in symbols)
+            return controls[control]
+
+        start = self.start_state.name
+        if start in halting:
+            start_name = halting[start]
+        else:
+            start_name = number(('collect', start, everywhere, (None,) * k))
+
+        while pairs:
+            control, symbol = pairs.pop()
+            result = step(control, symbol)
+            if result is None:
+                continue
+            next_control, new_symbol, movement = result
+            if new_symbol not in known_symbols:
+                known_symbols.add(new_symbol)
+                symbols.append(new_symbol)
+                pairs.extend((known, new_symbol) for known in controls)
+            delta.append(((controls[control], symbol),
+                          (number(next_control), new_symbol, movement)))
+
+        if no_halt is None:
+            no_halt = (self.max_steps + 1) * (6 * self.max_steps + 10)
+
+        Q = list(controls.values()) + ['t', 'r']
+        Gamma = sorted(set(symbols) | set(self.tape_alphabet))
+        return TM(Q, list(self.input_alphabet), Gamma, delta, start_name,
+                  't', 'r', no_halt=no_halt)
+
+
+def track_symbol(tracks, marks):
+    """
+    The symbol of a cell of a single-tape TM holding the cells of several
+    tapes (see MultiTapeTM.to_single_tape), such as '[a^|⊔]' for a cell
+    with 'a' on the first track, on which the first head is, and a blank on
+    the second track
+    """
+    return '[' + '|'.join(symbol + ('^' if head in marks else '')
+                          for head, symbol in enumerate(tracks)) + ']'
+
+
+def split_tracks(tape_contents, k):
+    """
+    Split the tape of a single-tape TM converted from a k-tape TM into the
+    contents of the k tapes
+    returns: A list with a list of symbols for every tape
+    """
+    tapes = [['⊢'] for _ in range(k)]
+    for symbol in tape_contents[1:]:
+        if symbol.startswith('[') and symbol.endswith(']'):
+            tracks = [track.rstrip('^') for track in
+                      symbol[1:-1].split('|')]
+        else:
+            tracks = [symbol] + ['⊔'] * (k - 1)
+        for tape, track in zip(tapes, tracks):
+            tape.append(track)
+    return tapes
@@ -16,87 +16,429 @@
 """
 
 from TM import TM
+import heapq
+import string
 import sys
 
 
-def extract_input(trace, trace_tokenized):
+# Characters which the tmtrace lexer groups into a single SYMBOL
+SYMBOL_CHARACTERS = frozenset(string.digits + string.ascii_letters)
+
+# Movement of the head for the move tokens
+MOVEMENTS = {"MRIGHT": 'R', "MLEFT": 'L'}
+
+
+def split_trace(trace):
     """
-    Determines (and returns) the input string that the TM used when doing the
-    computation which produced the given trace.
-    returns: the input (as a string without spaces)
+    Splits an original trace into its lexemes, grouping letters and digits
+    into multi-character symbols in the same way as the tmtrace lexer
+    trace: A single string
+    returns: A generator of lexemes, excluding spaces
     """
+    symbol_start = None
+    for i, char in enumerate(trace):
+        if char in SYMBOL_CHARACTERS:
+            if symbol_start is None:
+                symbol_start = i
+            continue
+        if symbol_start is not None:
+            yield trace[symbol_start:i]
+            symbol_start = None
+        if char != ' ':
+            yield char
 
-    # Characters for left endmarker and BLANK: ⊢ , ⊔
+    if symbol_start is not None:
+        yield trace[symbol_start:]
+
+
+class TraceDecoder:
+    """
+    Replays a trace one (lexeme, token) pair at a time, see decode_trace.
+    The tape keeps every cell the head has visited. When the head reads a
+    cell for the first time, what it reads is part of the input, up to the
+    first BLANK. Writes are applied to the tape, so that what remains at the
+    end is the output.
+    """
+    __slots__ = ('tape', 'inputlist', 'input_ended', 'position',
+                 'max_position', 'left', 'right', 'steps', 'previous')
+
+    def __init__(self):
+        self.tape = []
+        self.inputlist = []
+        self.input_ended = False
+        self.position = 0
+        self.max_position = 0
+        self.left = 0
+        self.right = 0
+        self.steps = 0
+        self.previous = None
+
+    def feed(self, lexeme, token):
+        """
+        Replay the next lexeme of the trace (excluding spaces) and its token
+        """
+        previous = self.previous
+        if previous == "READ":
+            tape = self.tape
+            if self.position == len(tape):
+                tape.append(lexeme)
+                if lexeme == '⊔':
+                    self.input_ended = True
+                elif not self.input_ended and self.position > 0:
+                    self.inputlist.append(lexeme)
+        elif previous == "WRITE":
+            self.tape[self.position] = lexeme
+        elif token == "MLEFT":
+            self.position -= 1
+            self.left += 1
+            self.steps += 1
+        elif token == "MRIGHT":
+            self.position += 1
+            self.right += 1
+            self.steps += 1
+            if self.position > self.max_position:
+                self.max_position = self.position
+        self.previous = token
+
+    def feed_run(self, block, count):
+        """
+        Replay a block of (lexeme, token) pairs 'count' times, see runs.py.
+        A block which is a single step of the TM is replayed at once: moving
+        right it writes the same symbol to 'count' cells, of which the new
+        ones are read into the input, and moving left it does the same for
+        the cells it passes on the tape.
+        """
+        feed = self.feed
+        if count > 1 and len(block) == 5 and \
+                self.previous not in ("READ", "WRITE") and \
+                block[0][1] == "READ" and block[2][1] == "WRITE" and \
+                block[4][1] in MOVEMENTS and \
+                0 <= self.position <= len(self.tape):
+            read = block[1][0]
+            written = block[3][0]
+            tape = self.tape
+            position = self.position
+            if block[4][1] == "MRIGHT":
+                new = count - (len(tape) - position)
+                if new > 0:
+                    if read == '⊔':
+                        self.input_ended = True
+                    elif not self.input_ended:
+                        # The cell at position 0 is not part of the input
+                        self.inputlist.extend([read] *
+                                              (new if tape else new - 1))
+                    tape[position:] = [written] * count
+                else:
+                    tape[position:position + count] = [written] * count
+                self.position = position + count
+                self.right += count
+                self.steps += count
+                if self.position > self.max_position:
+                    self.max_position = self.position
+                self.previous = "MRIGHT"
+                return
+
+            # The first step may read a new cell, after which the head stays
+            # on the tape for as long as it does not pass the start
+            for lexeme, token in block:
+                feed(lexeme, token)
+            count -= 1
+            position = self.position
+            times = min(count, position + 1)
+            tape[position - times + 1:position + 1] = [written] * times
+            self.position = position - times
+            self.left += times
+            self.steps += times
+            count -= times
+
+        for _ in range(count):
+            for lexeme, token in block:
+                feed(lexeme, token)
+
+    def result(self):
+        """
+        returns: A tuple (input, output, statistics) for the trace replayed so
+                 far, see decode_trace
+        """
+        tape = self.tape
+        output_length = len(tape)
+        while output_length > 1 and tape[output_length - 1] == '⊔':
+            output_length -= 1
+
+        statistics = {'steps': self.steps, 'left': self.left,
+                      'right': self.right, 'final': self.position,
+                      'max': self.max_position}
+        return ''.join(self.inputlist), ''.join(tape[1:output_length]), \
+            statistics
 
+
+def decode_trace(trace, trace_tokenized):
     """
-    This function extracts the Turin machine's input from an execution trace.
-    It does this by keeping track of the position, and when we go further
-    right than we have been, it adds what it reads to the inputlist,
-    which it converts to a string at the end.
+    Replays the original trace and its tokenized counterpart together in a
+    single pass.
+    returns: A tuple (input, output, statistics), where input and output are
+             strings as returned by extract_input and extract_output, and
+             statistics is a dictionary with the number of 'steps', the number
+             of 'left' and 'right' moves, and the 'final' and 'max' position
+             of the head
     """
+    decoder = TraceDecoder()
+    feed = decoder.feed
+    for lexeme, token in zip(split_trace(trace), trace_tokenized):
+        feed(lexeme, token)
+    return decoder.result()
 
-    inputlist = []
-    position = 0
-    reading = False
-    for i in range(len(trace_tokenized)):
-        if(reading):
-            if(position >= len(inputlist)):
-                inputlist.append(trace[2*i])
-            reading = False
-        if(trace_tokenized[i] == "READ"):
-            reading = True
-        if(trace_tokenized[i] == "MLEFT"):
-            position -= 1
-        if(trace_tokenized[i] == "MRIGHT"):
-            position += 1
 
-    inputstring = ""
-    for i in range(1, len(inputlist)):
-        inputstring += inputlist[i]
+def decode_runs(trace_runs):
+    """
+    Replays a run-length compressed trace of (lexeme, token) pairs (see
+    runs.py and tmtrace.tokenize_runs) without decompressing it
+    returns: A tuple (input, output, statistics), see decode_trace
+    """
+    decoder = TraceDecoder()
+    feed_run = decoder.feed_run
+    for block, count in trace_runs:
+        feed_run(block, count)
+    return decoder.result()
 
-    return inputstring
 
+def extract_input(trace, trace_tokenized=None):
+    """
+    Determines (and returns) the input string that the TM used when doing the
+    computation which produced the given trace. The input is what the head
+    reads on the cells after the left endmarker the first time it visits
+    them, up to the first BLANK ('⊔'): blanks, and anything read after the
+    first blank, are not part of the input.
+    trace:   The original trace, or a compressed trace (see decode_runs) if
+             'trace_tokenized' is not given
+    returns: the input (as a string without spaces)
+    """
+
+    # Characters for left endmarker and BLANK: ⊢ , ⊔
+    if trace_tokenized is None:
+        return decode_runs(trace)[0]
+    return decode_trace(trace, trace_tokenized)[0]
 
-def extract_output(trace, trace_tokenized):
+
+def extract_output(trace, trace_tokenized=None):
     """
     Determines (and returns) the tape output produced by the TM when doing the
     computation which produced the given trace. The ouput is the longest string
     _after_ the left endmarker that does not end in a BLANK ('⊔').
+    trace:   See extract_input
     returns: the output (as a string without spaces)
     """
 
     # Characters for left endmarker and BLANK: ⊢ , ⊔
+    if trace_tokenized is None:
+        return decode_runs(trace)[1]
+    return decode_trace(trace, trace_tokenized)[1]
+
+
+def trace_steps(trace, trace_tokenized):
+    """
+    Splits a trace into the steps the TM took
+    returns: A list of (read symbol, written symbol, movement) tuples, where
+             movement is either 'R' or 'L'
+    """
+    lexemes = list(zip(split_trace(trace), trace_tokenized))
+    if len(lexemes) % 5 != 0:
+        sys.exit("TraceError: Trace \'" + trace + "\' contains an" +
+                 " incomplete step")
+
+    steps = []
+    for i in range(0, len(lexemes), 5):
+        (_, read), (read_symbol, _), (_, write), (write_symbol, _), \
+            (_, move) = lexemes[i:i + 5]
+        if read != "READ" or write != "WRITE" or move not in MOVEMENTS:
+            sys.exit("TraceError: Trace \'" + trace + "\' is not a" +
+                     " sequence of read, write and move steps")
+        steps.append((read_symbol, write_symbol, MOVEMENTS[move]))
+
+    return steps
+
 
+def build_prefix_tree(all_steps, accepted):
     """
-    This function extracts the Turing machine's output from an execution trace.
-    It does so by starting with the input, then looping through the
-    execution trace while writing over the input. The outputlist starts with
-    a 0 in the front to accommodate for the ⊢.
-    """
-    inputstring = extract_input(trace, trace_tokenized)
-    outputlist = [0]
-    for i in range(len(inputstring)):
-        outputlist.append(inputstring[i])
-
-    position = 0
-    writing = False
-    for i in range(len(trace_tokenized)):
-        if(writing):
-            outputlist[position] = trace[2*i]
-            writing = False
-        if(trace_tokenized[i] == "WRITE"):
-            writing = True
-        if(trace_tokenized[i] == "MLEFT"):
-            position -= 1
-        if(trace_tokenized[i] == "MRIGHT"):
-            position += 1
-    outputstring = ""
-    for i in range(1, len(outputlist)):
-        outputstring += outputlist[i]
-    return outputstring
-
-
-def reverse_tm(traces, traces_tokenized):
+    Builds a tree in which traces that start with the same steps share the
+    same path, so that identical step sequences are stored (and later
+    merged) only once. A deterministic TM is in the same state after the same
+    sequence of reads, so every node stands for a single state.
+    all_steps: A list of step lists (see trace_steps)
+    accepted:  A list with for every step list whether it ends in the accept
+               state (True) or in the reject state (False)
+    returns: A tuple (transitions, halting), where transitions[node] maps a
+             read symbol to [written symbol, movement, next node] and halting
+             is the pair of nodes (accept, reject) the traces end in. Node 1
+             is the start state.
+    """
+    halting = (0, 2)
+    transitions = [{}, {}, {}]
+    for steps, accepting in zip(all_steps, accepted):
+        end = halting[0] if accepting else halting[1]
+        node = 1
+        for i, (read, write, move) in enumerate(steps):
+            table = transitions[node]
+            if read in table:
+                if table[read][0] != write or table[read][1] != move:
+                    sys.exit("TraceError: The traces are inconsistent, the" +
+                             " same reads lead to different writes or moves")
+                node = table[read][2]
+                continue
+
+            if i == len(steps) - 1:
+                table[read] = [write, move, end]
+            else:
+                table[read] = [write, move, len(transitions)]
+                transitions.append({})
+            node = table[read][2]
+
+        if node in halting and node != end:
+            sys.exit("TraceError: The traces are inconsistent, the same" +
+                     " steps end in both the accept and the reject state")
+        if node != end:
+            sys.exit("TraceError: The traces are inconsistent, one trace" +
+                     " halts where another one continues")
+
+    return transitions, halting
+
+
+def merge_states(transitions, halting):
+    """
+    Merges the states of a prefix tree (see build_prefix_tree) in the style of
+    the RPNI automata learning algorithm: every candidate ('blue') state is
+    merged with the first compatible confirmed ('red') state, or confirmed
+    itself when no merge is consistent with all traces.
+    returns: A list mapping every node to its (merged) state, and the list of
+             red states in the order in which they were confirmed
+    """
+    parent = list(range(len(transitions)))
+
+    # Breadth first order of the nodes, used to choose the next blue state
+    order = [0] * len(transitions)
+    queue = [1]
+    for position, node in enumerate(queue):
+        order[node] = position
+        for _, _, child in transitions[node].values():
+            if child not in halting:
+                queue.append(child)
+    for position, node in enumerate(halting, len(queue)):
+        order[node] = position
+
+    def find(node, undo=None):
+        while parent[node] != node:
+            if undo is not None:
+                undo.append((parent, node, parent[node]))
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def merge(red, blue, undo):
+        """ Fold 'blue' into 'red', logging changes to 'undo' """
+        pairs = [(red, blue)]
+        while pairs:
+            red, blue = pairs.pop()
+            red, blue = find(red, undo), find(blue, undo)
+            if red == blue:
+                continue
+            if blue in halting:
+                red, blue = blue, red
+            if red in halting and (blue in halting or transitions[blue]):
+                return False
+
+            undo.append((parent, blue, parent[blue]))
+            parent[blue] = red
+            table = transitions[red]
+            for read, (write, move, child) in transitions[blue].items():
+                if read not in table:
+                    undo.append((table, read, None))
+                    table[read] = [write, move, child]
+                elif table[read][0] != write or table[read][1] != move:
+                    return False
+                else:
+                    pairs.append((table[read][2], child))
+        return True
+
+    def signature(node):
+        return frozenset((read, write, move) for read, (write, move, _)
+                         in transitions[node].items())
+
+    # The red states indexed by the symbols they read and by the steps they
+    # take, so that red states which take a different step for a symbol the
+    # blue state reads are not tried. The index and the blue states are kept
+    # up to date as states are merged or confirmed.
+    red = []
+    red_set = set()
+    signatures = {}
+    reading = {}
+    taking = {}
+    blue = set()
+    candidates = []
+
+    def index(state, steps):
+        for step in steps:
+            reading.setdefault(step[0], set()).add(state)
+            taking.setdefault(step, set()).add(state)
+
+    def add_blue(node):
+        node = find(node)
+        if node not in red_set and node not in blue:
+            blue.add(node)
+            heapq.heappush(candidates, (order[node], node))
+
+    def confirm(state):
+        red.append(state)
+        red_set.add(state)
+        signatures[state] = signature(state)
+        index(state, signatures[state])
+        for _, _, child in transitions[state].values():
+            add_blue(child)
+
+    confirm(1)
+    while candidates:
+        _, candidate = heapq.heappop(candidates)
+        if find(candidate) != candidate or candidate in red_set:
+            continue
+
+        conflicting = set()
+        for step in signature(candidate):
+            if step[0] in reading:
+                conflicting |= reading[step[0]] - taking.get(step, set())
+        options = sorted(red_set - conflicting, key=order.__getitem__)
+
+        for state in options:
+            undo = []
+            if merge(state, candidate, undo):
+                break
+            for target, key, value in reversed(undo):
+                if value is None:
+                    del target[key]
+                else:
+                    target[key] = value
+        else:
+            confirm(candidate)
+            continue
+
+        # Red states that took over other states can take new steps, and
+        # blue states that were merged are represented by their new state
+        for target, key, _ in undo:
+            if target is not parent:
+                continue
+            if key in blue:
+                add_blue(key)
+            state = find(key)
+            if state in red_set:
+                # Merging only adds steps to a state
+                new_signature = signature(state)
+                index(state, new_signature - signatures[state])
+                signatures[state] = new_signature
+                for _, _, child in transitions[state].values():
+                    add_blue(child)
+
+    return [find(node) for node in range(len(transitions))], red
+
+
+def reverse_tm(traces, traces_tokenized, accepted=None):
     """
     Recreates (reverse engineers) a TM which behaves identically to the TM that
     produced the supplied list of traces. Note: 'behaves identically' implies
@@ -104,23 +446,63 @@ def reverse_tm(traces, traces_tokenized):
     execution traces as the original.
     traces: A list of traces produced by the original
     traces_tokenized: Tokenized versions of the original traces
+    accepted: A list with for every trace whether the original accepted
+              (True) or rejected (False) its input. A trace does not show in
+              which state the TM halted, so by default every trace is
+              assumed to end in the accept state.
     returns: A TM object capable of reproducing the traces given the same input
     """
 
     # Characters for left endmarker and BLANK: ⊢ , ⊔
 
     """
-    I could not figure this function out.
+    All traces are replayed together into a prefix tree, after which states
+    that behave the same on every trace are merged.
     """
-    Q = [0, 't', 'r']
-    Sigma = ['0', '1']
-    Gamma = ['0', '1', '⊔', '⊢']
-    delta = [((0, '⊔'), ('t', '⊔', 'R'))]
-    s = 0
+    if not traces:
+        sys.exit("TraceError: There are no traces to recreate a TM from")
+    if accepted is None:
+        accepted = [True] * len(traces)
+    elif len(accepted) != len(traces):
+        sys.exit("TraceError: There should be a verdict for every trace")
+
+    all_steps = []
+    Sigma = set()
+    Gamma = {'⊔', '⊢'}
+    for i in range(len(traces)):
+        steps = trace_steps(traces[i], traces_tokenized[i])
+        if not steps:
+            sys.exit("TraceError: Trace " + str(i + 1) + " is empty, every" +
+                     " trace should contain at least one step")
+        all_steps.append(steps)
+        Sigma.update(decode_trace(traces[i], traces_tokenized[i])[0])
+        for read, write, _ in steps:
+            Gamma.add(read)
+            Gamma.add(write)
+
+    transitions, halting = build_prefix_tree(all_steps, accepted)
+    states, red = merge_states(transitions, halting)
+
+    names = {halting[0]: 't'}
+    for state in red:
+        if state not in halting:
+            names[state] = 'q' + str(len(names) - 1)
+    names[halting[1]] = 'r'
+
+    delta = []
+    for state in red:
+        for read, (write, move, child) in transitions[state].items():
+            delta.append(((names[state], read),
+                          (names[states[child]], write, move)))
+
+    Q = list(names.values())
+    s = names[1]
     t = 't'
     r = 'r'
+    no_halt = max([len(steps) for steps in all_steps] + [1000])
 
-    my_tm = TM(Q, Sigma, Gamma, delta, s, t, r, verbose=True)
+    my_tm = TM.cached(Q, sorted(Sigma), sorted(Gamma), delta, s, t, r,
+                      no_halt=no_halt)
 
     return my_tm
 
@@ -142,19 +524,27 @@ def main(source_original, source_tokenized):
                             for line in f]]
     fo.close()
 
-    # extract_input(traces[0], traces_tokenized[0])
+    # Decode every trace once for both its input and its output
+    decoded = [decode_trace(traces[i], traces_tokenized[i])
+               for i in range(len(traces))]
 
-    for i in range(len(traces)):
-        print(extract_input(traces[i], traces_tokenized[i]))
+    for inputstring, _, _ in decoded:
+        print(inputstring)
 
-    # extract_output(traces[1], traces_tokenized[1])
+    for _, outputstring, _ in decoded:
+        print(outputstring)
 
+    # Check that the recreated TM reproduces every trace
+    my_tm = reverse_tm(traces, traces_tokenized)
+    my_tm.compile_to_python()
+    print("Recreated TM with " + str(len(my_tm.states)) + " states")
+    reproduced = 0
     for i in range(len(traces)):
-        print(extract_output(traces[i], traces_tokenized[i]))
-
-    # reverse_tm(traces, traces_tokenized)
-
-    reverse_tm(traces, traces_tokenized)
+        my_tm.set_input(decoded[i][0])
+        my_tm.transition_all()
+        if my_tm.get_execution_trace() == ' '.join(split_trace(traces[i])):
+            reproduced += 1
+    print("Reproduced traces: " + str(reproduced) + "/" + str(len(traces)))
 
 
 if __name__ == '__main__':
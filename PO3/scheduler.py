@@ -0,0 +1,171 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Dovetailing of many TM runs. TM.transition_all runs a single TM until it
+halts, and exits the program if it does not halt within its step limit.
+The scheduler instead takes turns: in every round, every unfinished run
+takes a slice of steps, and the slices grow from round to round. A run which
+halts after n steps is therefore finished after at most about twice the
+steps that every other run took by then, so one slow or non-halting TM, for
+example among the candidates tried while reverse engineering a trace, does
+not hold up the others. Runs are reported as soon as they finish.
+"""
+
+import sys
+import time
+
+
+# The number of steps of a run in the first round, and the factor by which
+# the slices grow every round
+FIRST_QUOTA = 64
+GROWTH = 2
+
+# The number of steps a run with a time budget takes between looking at the
+# clock
+TIME_CHECK_STEPS = 256
+
+
+class Job:
+    """
+    A run in a Scheduler, with its step limit and time budget, and the
+    number of slices and the time it took so far
+    """
+    __slots__ = ('key', 'run', 'max_steps', 'seconds', 'slices', 'elapsed')
+
+    def __init__(self, key, run, max_steps, seconds):
+        self.key = key
+        self.run = run
+        self.max_steps = max_steps
+        self.seconds = seconds
+        self.slices = 0
+        self.elapsed = 0.0
+
+
+class Scheduler:
+    """
+    Runs of TMs which take turns in rounds of growing slices of steps. The
+    slices of a run grow with the number of slices it took, so a run added
+    later starts with small slices as well.
+    """
+    __slots__ = ('jobs', 'quota', 'growth', 'rounds', 'finished')
+
+    def __init__(self, quota=FIRST_QUOTA, growth=GROWTH):
+        """
+        quota:  The number of steps of every run in the first round
+        growth: The factor by which the number of steps grows every round
+        """
+        if quota < 1 or growth < 1:
+            sys.exit("SchedulerError: The quota and the growth should be at" +
+                     " least 1")
+        self.jobs = []
+        self.quota = quota
+        self.growth = growth
+        self.rounds = 0
+        self.finished = {}
+
+    def __len__(self):
+        """ The number of runs which have not finished yet """
+        return len(self.jobs)
+
+    def add(self, key, machine, input_string, steps=None, seconds=None):
+        """
+        Add a run of a TM. A TM is run with a cursor (see TM.cursor), so the
+        same TM can be added for many inputs. Other machines with
+        set_input, transition and has_halted, such as a MultiTapeTM, are run
+        themselves and can only be added once at a time.
+        key:     The name under which the run is reported
+        steps:   The number of steps the run may take before it is assumed
+                 that it will not halt, by default the no_halt of the
+                 machine. The machine keeps its own limit.
+        seconds: The time the run may take in total, or None for no limit
+        returns: The run (a Cursor, or the machine itself)
+        """
+        run = machine.cursor() if hasattr(machine, 'cursor') else machine
+        run.set_input(input_string)
+        max_steps = run.max_steps if steps is None else steps
+        self.jobs.append(Job(key, run, max_steps, seconds))
+        return run
+
+    def run(self, seconds=None):
+        """
+        Take rounds until every run has finished. Stopping the iteration
+        preempts the runs between two slices, running out of 'seconds'
+        preempts the current run within its slice as well; they continue
+        where they were on the next call.
+        seconds: The time after which to stop, or None to continue until all
+                 runs have finished
+        returns: A generator of tuples (key, verdict, run) in the order in
+                 which the runs finish, where the verdict is 'accept',
+                 'reject', 'loop' (more steps than allowed), 'timeout' (more
+                 time than allowed) or 'error' (the TM stalled or violated
+                 the tape)
+        """
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        while self.jobs:
+            for job in list(self.jobs):
+                if job.slices > self.rounds:
+                    # Already taken in this round before being preempted
+                    continue
+                if deadline is not None and time.perf_counter() > deadline:
+                    return
+                verdict = self.run_slice(
+                    job, self.quota * self.growth ** job.slices, deadline)
+                if verdict is None and deadline is not None and \
+                        time.perf_counter() > deadline:
+                    # Preempted within the slice, which is taken again on
+                    # the next call
+                    return
+                job.slices += 1
+                if verdict is not None:
+                    self.jobs.remove(job)
+                    self.finished[job.key] = verdict
+                    yield job.key, verdict, job.run
+            self.rounds += 1
+
+    def run_slice(self, job, quota, deadline=None):
+        """
+        Let a run take up to 'quota' steps
+        deadline: The time (see time.perf_counter) after which to stop within
+                  the slice, or None to only stop at the time budget of the
+                  run
+        returns:  The verdict if the run finished, None otherwise
+        """
+        run = job.run
+        transition = run.transition
+        limit = min(run.step_counter + quota, job.max_steps + 1)
+        start = time.perf_counter()
+        if job.seconds is not None:
+            budget = start + job.seconds - job.elapsed
+            deadline = budget if deadline is None else min(deadline, budget)
+        machine_max_steps = run.max_steps
+        run.max_steps = job.max_steps
+        try:
+            if deadline is None:
+                while run.step_counter < limit and transition():
+                    pass
+            else:
+                while run.step_counter < limit and transition():
+                    if run.step_counter % TIME_CHECK_STEPS == 0 and \
+                            time.perf_counter() > deadline:
+                        break
+        except SystemExit:
+            return 'error'
+        finally:
+            run.max_steps = machine_max_steps
+            job.elapsed += time.perf_counter() - start
+
+        if run.has_halted():
+            return 'accept' if run.current_state == run.accept_state \
+                else 'reject'
+        if run.step_counter > job.max_steps:
+            return 'loop'
+        if job.seconds is not None and job.elapsed >= job.seconds:
+            return 'timeout'
+        return None
@@ -0,0 +1,242 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Benchmarks for the automata of PO1, PO2 and PO3 on synthetic traces.
+For every benchmark and size the throughput (symbols per second) and the
+peak memory (measured in a separate run with tracemalloc) are reported as
+JSON.
+
+Usage: python3 benchmark.py [--sizes 1000 100000 ...] [--large]
+                            [--repeat 3] [--only name ...]
+                            [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Sizes (in symbols) that are run by default, and the sizes that are only
+# run with --large, which take minutes and gigabytes of memory per benchmark
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+LARGE_SIZES = [10 ** 7, 10 ** 8]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ['PO1', 'PO2', 'PO3', 'service']:
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+import iotrace  # noqa: E402
+import pipeline  # noqa: E402
+import reverse  # noqa: E402
+import tmtrace  # noqa: E402
+import verification  # noqa: E402
+from TM import TM  # noqa: E402
+
+
+def generate_fileio(size, rng):
+    """
+    Proper file handling trace of 'size' system calls
+    """
+    trace = ['open']
+    while len(trace) < size - 1:
+        trace.append(rng.choice(['read', 'write']))
+    trace.append('close')
+    return trace
+
+
+def generate_steps(size, rng):
+    """
+    Steps (read, write, move) of a TM which stays on the tape and never
+    overwrites the left endmarker, with about 'size' tokens in total
+    returns: A list of (read, write, move) tuples, with moves 'R' or 'L'
+    """
+    steps = []
+    tape = ['⊢']
+    position = 0
+    for _ in range(max(1, size // 5)):
+        read = tape[position]
+        write = '⊢' if position == 0 else rng.choice(['0', '1', '⊔'])
+        tape[position] = write
+        if position == 0 or rng.random() < 0.6:
+            move = 'R'
+            position += 1
+            if position == len(tape):
+                tape.append(rng.choice(['0', '1']))
+        else:
+            move = 'L'
+            position -= 1
+        steps.append((read, write, move))
+    return steps
+
+
+def token(symbol):
+    """
+    Token of a tape symbol, as produced by the tmtrace lexer
+    """
+    return {'⊢': 'LEM', '⊔': 'BLANK'}.get(symbol, 'SYMBOL')
+
+
+def generate_traces(size, rng):
+    """
+    Original and tokenized execution trace of about 'size' tokens
+    """
+    original = []
+    tokenized = []
+    for read, write, move in generate_steps(size, rng):
+        original += ['-', read, '+', write, '>' if move == 'R' else '<']
+        tokenized += ['READ', token(read), 'WRITE', token(write),
+                      'MRIGHT' if move == 'R' else 'MLEFT']
+    return ' '.join(original), tokenized
+
+
+def create_tm(size):
+    """
+    TM which inverts its input, allowed to take enough steps for 'size'
+    """
+    Q = ['INVERT', 't', 'r']
+    Sigma = ['0', '1']
+    Gamma = ['0', '1', '⊔', '⊢']
+    delta = [(('INVERT', '⊢'), ('INVERT', '⊢', 'R')),
+             (('INVERT', '0'), ('INVERT', '1', 'R')),
+             (('INVERT', '1'), ('INVERT', '0', 'R')),
+             (('INVERT', '⊔'), ('t', '⊔', 'R'))]
+    return TM(Q, Sigma, Gamma, delta, 'INVERT', 't', 'r', no_halt=size + 10)
+
+
+def benchmark_fileio(size, rng):
+    fa = iotrace.create_fa()
+    trace = generate_fileio(size, rng)
+    return lambda: iotrace.verify_fileio(fa, trace)
+
+
+def benchmark_lexer(size, rng):
+    fa = tmtrace.create_fa()
+    trace = generate_traces(size, rng)[0]
+
+    def run():
+        fa.reset()
+        tmtrace.lexer(fa, trace)
+    return run
+
+
+def benchmark_verify_steps(size, rng):
+    trace = generate_traces(size, rng)[1]
+    return lambda: verification.verify_steps(trace)
+
+
+def benchmark_verify_position(size, rng):
+    trace = generate_traces(size, rng)[1]
+    return lambda: verification.verify_position(trace)
+
+
+def benchmark_verify_lem(size, rng):
+    trace = generate_traces(size, rng)[1]
+    return lambda: verification.verify_lem(trace)
+
+
+def benchmark_transition_all(size, rng):
+    tm = create_tm(size)
+    tm_input = ''.join(rng.choice('01') for _ in range(size))
+
+    def run():
+        tm.set_input(tm_input)
+        tm.transition_all()
+    return run
+
+
+def benchmark_extract_output(size, rng):
+    trace, trace_tokenized = generate_traces(size, rng)
+    return lambda: reverse.extract_output(trace, trace_tokenized)
+
+
+def benchmark_pipeline(size, rng):
+    trace_pipeline = pipeline.TracePipeline()
+    trace = generate_traces(size, rng)[0]
+    return lambda: trace_pipeline.process(trace)
+
+
+BENCHMARKS = {'verify_fileio': benchmark_fileio,
+              'tmtrace.lexer': benchmark_lexer,
+              'verify_steps': benchmark_verify_steps,
+              'verify_position': benchmark_verify_position,
+              'verify_lem': benchmark_verify_lem,
+              'TM.transition_all': benchmark_transition_all,
+              'reverse.extract_output': benchmark_extract_output,
+              'pipeline.process': benchmark_pipeline}
+
+
+def measure(name, size, repeat, seed=0):
+    """
+    Runs a single benchmark
+    returns: A dictionary with the best time, the throughput and the peak
+             memory used while running (excluding the generated input)
+    """
+    run = BENCHMARKS[name](size, random.Random(seed))
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'benchmark': name, 'size': size, 'seconds': best,
+            'symbols_per_second': size / best if best else None,
+            'peak_memory_bytes': peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--large', action='store_true',
+                        help='also run the sizes ' +
+                        ', '.join(str(size) for size in LARGE_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS),
+                        default=list(BENCHMARKS))
+    parser.add_argument('--output')
+    arguments = parser.parse_args()
+
+    sizes = list(arguments.sizes)
+    if arguments.large:
+        sizes += [size for size in LARGE_SIZES if size not in sizes]
+
+    results = []
+    for name in arguments.only:
+        for size in sizes:
+            result = measure(name, size, arguments.repeat)
+            if result['symbols_per_second'] is None:
+                # The clock did not advance during the run
+                throughput = 'too fast to measure'
+            else:
+                throughput = '%.0f symbols/s' % result['symbols_per_second']
+            print(name, size, throughput, file=sys.stderr)
+            results.append(result)
+
+    report = json.dumps({'python': sys.version.split()[0],
+                         'results': results}, indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
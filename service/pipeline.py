@@ -0,0 +1,112 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Fused pipeline from original (untokenized) Turing machine execution traces to
+verdicts. Every trace is lexed by the tmtrace lexer DFA, and each token is
+fed directly into the PDAs of verification as soon as it is recognized, so a
+trace is verified in a single pass without tokenized text files or
+splitting. The lexemes of a valid trace are then replayed by the decoder of
+reverse, which assumes that the head stays on the tape.
+For every trace the pipeline produces a tuple (valid, input, output), where
+input and output are None if the trace is not valid.
+
+Usage: python3 pipeline.py original_traces.txt
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ['PO1', 'PO2', 'PO3']:
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+import reverse  # noqa: E402
+import tmtrace  # noqa: E402
+import verification  # noqa: E402
+
+
+class TracePipeline:
+    """
+    Keeps the lexer. The PDAs are shared with verification and run through
+    new cursors for every trace, so traces can be processed concurrently.
+    """
+    __slots__ = ('lexer',)
+
+    def __init__(self):
+        self.lexer = tmtrace.create_lexer()
+
+    def process(self, trace):
+        """
+        Lexes, verifies and decodes a single trace
+        trace: A single string, without the newline
+        returns: A tuple (valid, input, output). If some part of the trace is
+                 not a token, sys.exit is called.
+        """
+        # A trace with a step for which there is no transition is rejected
+        # immediately, the other PDAs ignore missing transitions
+        steps_pda, *checks = verification.shared_cursors()
+        steps = steps_pda.transition
+        position, lem = [pda.transition for pda in checks]
+        pairs = []
+        keep = pairs.append
+
+        for lexeme, token in self.lexer.iter_tokens(trace):
+            if token == 'SPACE':
+                continue
+            if not steps(token):
+                return False, None, None
+            position(token)
+            lem(token)
+            keep((lexeme, token))
+
+        if not (steps_pda.is_accepting() and
+                all(pda.is_accepting() for pda in checks)):
+            return False, None, None
+
+        decoder = reverse.TraceDecoder()
+        feed = decoder.feed
+        for lexeme, token in pairs:
+            feed(lexeme, token)
+        inputstring, outputstring, _ = decoder.result()
+        return True, inputstring, outputstring
+
+    def process_lines(self, lines):
+        """
+        Processes traces one line at a time
+        lines: An iterable of strings, such as an open file
+        returns: A generator of (valid, input, output) tuples, in order. A
+                 trace which contains something other than tokens is not
+                 valid.
+        """
+        for line in lines:
+            try:
+                yield self.process(line.rstrip('\r\n'))
+            except SystemExit:
+                yield False, None, None
+
+
+def main(path):
+    """
+    Reads the original traces from the file at 'path' and prints the verdict,
+    input and output of every trace
+    """
+    pipeline = TracePipeline()
+    with open(path, encoding='utf-8') as f:
+        for valid, inputstring, outputstring in pipeline.process_lines(f):
+            if valid:
+                print("valid:", inputstring, "->", outputstring)
+            else:
+                print("invalid")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('RuntimeError: Use `python3 pipeline.py original_traces.txt`')
+    main(sys.argv[1])
@@ -0,0 +1,203 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+"""
+Streaming verification service for Turing machine execution traces.
+Clients connect over a UNIX socket or localhost TCP and send original
+(untokenized) traces, one per line. For every trace the server answers, in
+order, with one line of JSON:
+    {"valid": true, "input": "...", "output": "..."}
+    {"valid": false, "input": null, "output": null}
+    {"error": "..."}                      (the trace could not be tokenized,
+                                           was not UTF-8 or was too long)
+The automata are created once and shared by all clients. Every connection
+runs the reading, processing (the fused pipeline of pipeline.py) and writing
+stages concurrently, connected by bounded queues, so a slow client or stage
+makes the earlier stages wait instead of buffering without limit. Traces are
+processed in a thread, so that a long trace does not stop the server from
+reading and writing on the other connections.
+
+Usage: python3 server.py --unix /tmp/traces.sock [--line-limit BYTES]
+       python3 server.py --port 8765 [--line-limit BYTES]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ['PO1', 'PO2', 'PO3']:
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+import pipeline  # noqa: E402
+
+
+# Number of traces that may wait between two stages of a connection
+QUEUE_SIZE = 64
+
+# Marks the end of the traces of a connection in the stage queues
+END = None
+
+# Maximum length in bytes of a single trace, including the newline. Longer
+# traces are answered with an error.
+LINE_LIMIT = 64 * 2 ** 20
+
+
+class VerificationService:
+    """
+    Keeps the automata warm and serves the connections
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, line_limit=LINE_LIMIT):
+        self.queue_size = queue_size
+        self.line_limit = line_limit
+        self.pipeline = pipeline.TracePipeline()
+
+    def process(self, trace):
+        """
+        Lexes, verifies and decodes a single trace with the fused pipeline
+        returns: The JSON response for the trace. A trace for which the
+                 pipeline fails gets an error response, so that the other
+                 traces of the connection are still answered.
+        """
+        try:
+            valid, inputstring, outputstring = self.pipeline.process(trace)
+        except SystemExit as error:
+            return {'error': str(error)}
+        except Exception as error:
+            return {'error': type(error).__name__ + ': ' + str(error)}
+        return {'valid': valid, 'input': inputstring, 'output': outputstring}
+
+    async def read_stage(self, reader, queue):
+        """
+        Puts the traces in the queue. A trace which cannot be read is put in
+        the queue as its error response instead.
+        """
+        while True:
+            try:
+                line = await reader.readuntil(b'\n')
+            except asyncio.IncompleteReadError as error:
+                # The last trace need not end with a newline
+                line = error.partial
+                if not line:
+                    break
+            except asyncio.LimitOverrunError:
+                await skip_line(reader)
+                await queue.put({'error': 'TraceError: The trace is longer' +
+                                 ' than ' + str(self.line_limit) + ' bytes'})
+                continue
+
+            try:
+                trace = line.decode('utf-8')
+            except UnicodeDecodeError as error:
+                await queue.put({'error': 'TraceError: The trace is not' +
+                                 ' UTF-8: ' + str(error)})
+                continue
+            await queue.put(trace.rstrip('\r\n'))
+        await queue.put(END)
+
+    async def process_stage(self, inbox, outbox):
+        loop = asyncio.get_running_loop()
+        while True:
+            trace = await inbox.get()
+            if trace is END:
+                break
+            if isinstance(trace, dict):
+                # The error response of a trace which could not be read
+                await outbox.put(trace)
+                continue
+            await outbox.put(await loop.run_in_executor(
+                None, self.process, trace))
+        await outbox.put(END)
+
+    async def write_stage(self, writer, queue):
+        while True:
+            result = await queue.get()
+            if result is END:
+                break
+            writer.write(json.dumps(result, ensure_ascii=False).encode(
+                'utf-8') + b'\n')
+            # Wait for the client to read, which lets the queues fill up
+            await writer.drain()
+
+    async def handle(self, reader, writer):
+        """
+        Serve a single connection
+        """
+        traces = asyncio.Queue(self.queue_size)
+        results = asyncio.Queue(self.queue_size)
+        stages = [asyncio.ensure_future(stage) for stage in
+                  [self.read_stage(reader, traces),
+                   self.process_stage(traces, results),
+                   self.write_stage(writer, results)]]
+        try:
+            await asyncio.gather(*stages)
+        except ConnectionError:
+            pass
+        finally:
+            # Stop the other stages if one of them failed
+            for stage in stages:
+                stage.cancel()
+            writer.close()
+
+
+async def skip_line(reader):
+    """
+    Discard the rest of a line which is longer than the limit of 'reader'
+    """
+    while True:
+        try:
+            await reader.readuntil(b'\n')
+            return
+        except asyncio.IncompleteReadError:
+            return
+        except asyncio.LimitOverrunError as error:
+            # Nothing was consumed, drop what was searched for the newline
+            await reader.readexactly(error.consumed)
+
+
+async def serve(unix_path=None, host='127.0.0.1', port=8765,
+                line_limit=LINE_LIMIT):
+    """
+    Start the service on a UNIX socket if 'unix_path' is given, otherwise on
+    TCP, and serve until cancelled
+    line_limit: The maximum length of a trace in bytes
+    """
+    service = VerificationService(line_limit=line_limit)
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(
+            service.handle, unix_path, limit=line_limit)
+    else:
+        server = await asyncio.start_server(
+            service.handle, host, port, limit=line_limit)
+
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--unix', help='Path of the UNIX socket')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--line-limit', type=int, default=LINE_LIMIT,
+                        help='Maximum length of a trace in bytes')
+    arguments = parser.parse_args()
+
+    try:
+        asyncio.run(serve(arguments.unix, arguments.host, arguments.port,
+                          arguments.line_limit))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
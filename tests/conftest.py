@@ -0,0 +1,11 @@
+"""
+The engines and the service are imported by module name from their
+directories, in the same way as the programs in service and benchmarks do.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ['PO1', 'PO2', 'PO3', 'service']:
+    sys.path.insert(0, os.path.join(ROOT, directory))
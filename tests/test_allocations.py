@@ -0,0 +1,69 @@
+"""
+The steps of the engines allocate no new objects (see __slots__ and the
+transition methods), apart from the execution trace of a TM, which stores
+a fixed number of references to shared strings per step.
+"""
+
+import tracemalloc
+
+from FA import FA
+from PDA import PDA
+from TM import TM
+
+
+def traced_growth(step, steps):
+    """
+    The number of bytes of traced memory that are still allocated after
+    calling 'step' the given number of times
+    """
+    step()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(steps):
+            step()
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def test_fa_transition_allocates_nothing():
+    fa = FA(['even', 'odd'], ['a'], {'even': {'a': 'odd'},
+                                     'odd': {'a': 'even'}}, 'even', ['even'])
+    for steps in [1000, 10000]:
+        assert traced_growth(lambda: fa.transition('a'), steps) < 1024
+
+
+def test_pda_transition_allocates_nothing():
+    # Pushes on 'a' and pops on 'b', so the stack keeps the same size when
+    # the symbols alternate
+    delta = [(('q', 'a', '⊥'), ('q', ['A', '⊥'])),
+             (('q', 'a', 'A'), ('q', ['A', 'A'])),
+             (('q', 'b', 'A'), ('q', 'ϵ'))]
+    pda = PDA(['q'], ['a', 'b'], ['A', '⊥'], delta, 'q', ['q'])
+
+    def step():
+        pda.transition('a')
+        pda.transition('b')
+
+    for steps in [1000, 10000]:
+        assert traced_growth(step, steps) < 1024
+
+
+def test_tm_transition_only_grows_the_trace():
+    # Moves back and forth between the first two input cells, so the tape
+    # keeps the same size
+    delta = [(('p', '⊢'), ('p', '⊢', 'R')), (('p', 'a'), ('q', 'a', 'R')),
+             (('q', 'a'), ('p', 'a', 'L'))]
+    tm = TM(['p', 'q', 't', 'r'], ['a'], ['⊢', '⊔', 'a'], delta, 'p', 't',
+            'r', no_halt=10 ** 6)
+    tm.set_input('aa')
+
+    per_step = [traced_growth(tm.transition, steps) / steps
+                for steps in [10000, 100000]]
+
+    # Three references to shared fragments in the trace list, with room for
+    # the over-allocation of the list
+    for growth in per_step:
+        assert growth < 4 * 8
+    assert abs(per_step[0] - per_step[1]) < 8
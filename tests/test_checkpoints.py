@@ -0,0 +1,87 @@
+"""
+A log which is verified or lexed in two parts, with a checkpoint in
+between, gives the same verdicts and tokens as a single run over the whole
+log, wherever the first part ends.
+"""
+
+import os
+
+import checkpoint
+import tmtrace
+import verification
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_in_parts(main, source, tmp_path, capsys, cut):
+    """
+    Run 'main' on the first 'cut' bytes of the file at 'source', and again
+    after the rest was appended, as with --resume
+    returns: The output of both runs together
+    """
+    with open(source, 'rb') as f:
+        data = f.read()
+    tmp_path.mkdir()
+    path = tmp_path / 'log.txt'
+    checkpoints = checkpoint.CheckpointStore(str(tmp_path / 'checkpoints'))
+
+    path.write_bytes(data[:cut])
+    main(str(path), checkpoints)
+    with open(path, 'ab') as f:
+        f.write(data[cut:])
+    main(str(path), checkpoints)
+    return capsys.readouterr().out
+
+
+def cuts(source):
+    """
+    Positions in the file: in tokens, between tokens, at newlines and in
+    a character of more than one byte
+    """
+    with open(source, 'rb') as f:
+        data = f.read()
+    positions = [1, len(data) // 3, len(data) // 2, data.index(b'\n'),
+                 data.index(b'\n') + 1, len(data) - 1]
+    positions += [position + 1 for position, byte in enumerate(data)
+                  if byte >= 0x80][:1]
+    return sorted(set(positions))
+
+
+def test_partial_verification_matches_verify():
+    with open(os.path.join(ROOT, 'PO2', 'tokenized_traces.txt'),
+              encoding='utf-8') as f:
+        traces = [line.split() for line in f]
+    for trace in traces:
+        expected = verification.verify_steps(trace) and \
+            verification.verify_position(trace) and \
+            verification.verify_lem(trace)
+        for cut in range(len(trace) + 1):
+            configurations = verification.start_partial()
+            configurations = verification.continue_partial(configurations,
+                                                           trace[:cut])
+            configurations = verification.continue_partial(configurations,
+                                                           trace[cut:])
+            assert verification.finish_partial(configurations) == expected
+
+
+def test_verification_resumes_from_a_checkpoint(tmp_path, capsys):
+    source = os.path.join(ROOT, 'PO2', 'tokenized_traces.txt')
+
+    def main(path, checkpoints):
+        verification.main(path, verification.VerdictCache(), checkpoints)
+
+    main(source, None)
+    expected = capsys.readouterr().out
+    assert expected
+    for cut in cuts(source):
+        assert run_in_parts(main, source, tmp_path / str(cut), capsys,
+                            cut) == expected
+
+
+def test_tmtrace_resumes_from_a_checkpoint(tmp_path, capsys):
+    source = os.path.join(ROOT, 'PO1', 'tmtraces.txt')
+    tmtrace.main(source)
+    expected = capsys.readouterr().out
+    for cut in cuts(source):
+        assert run_in_parts(tmtrace.main, source, tmp_path / str(cut),
+                            capsys, cut) == expected
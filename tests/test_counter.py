@@ -0,0 +1,104 @@
+"""
+The vectorized counter engine (see counter.py) and its parallel runs end in
+the same configuration as following the relations symbol by symbol.
+"""
+
+import os
+import random
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+import verification  # noqa: E402
+from PDA import PDA  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYMBOLS = ['MLEFT', 'MRIGHT', 'READ', 'WRITE', 'BLANK', 'LEM', 'SYMBOL']
+
+
+def read_traces():
+    traces = []
+    for directory in ['PO2', 'PO3']:
+        with open(os.path.join(ROOT, directory, 'tokenized_traces.txt'),
+                  encoding='utf-8') as f:
+            traces += [line.split() for line in f]
+
+    # Also random sequences, with a symbol which is not in Sigma
+    rng = random.Random(41)
+    for _ in range(200):
+        traces.append(rng.choices(SYMBOLS + ['OTHER'],
+                                  [6, 6, 2, 2, 1, 2, 1, 1],
+                                  k=rng.randrange(60)))
+    return traces
+
+
+def configuration(pda, run):
+    cursor = pda.cursor()
+    return run(cursor), cursor.get_configuration()
+
+
+@pytest.mark.parametrize('create', [verification.create_position_pda,
+                                    verification.create_lem_pda])
+def test_verification_pdas_match_transition_all(create):
+    counter_pda = create()
+    assert counter_pda.compile_to_counter()
+    plain_pda = create()
+    traces = read_traces()
+
+    for trace in traces:
+        expected = configuration(plain_pda,
+                                 lambda run: run.transition_all(trace))
+        assert configuration(counter_pda, lambda run: run.transition_all(
+            numpy.array(trace, dtype=str))) == expected
+        assert configuration(counter_pda,
+                             lambda run: run.transition_all_parallel(
+                                 trace, workers=1, chunks=5)) == expected
+
+    # A long input, of which the chunks are summarized in worker processes
+    trace = [symbol for trace in traces for symbol in trace] * 20
+    expected = configuration(plain_pda, lambda run: run.transition_all(trace))
+    assert configuration(counter_pda, lambda run: run.transition_all_parallel(
+        trace, workers=2, chunks=16)) == expected
+
+
+def test_counter_pda_parallel_matches_transition_all():
+    # Counts the position of a head, where a write at zero must be followed
+    # by 'LEM' before the head moves
+    delta = [(('MAIN', 'MRIGHT', '⊥'), ('MAIN', ['1', '⊥'])),
+             (('MAIN', 'MRIGHT', '1'), ('MAIN', ['1', '1'])),
+             (('MAIN', 'MLEFT', '1'), ('MAIN', 'ϵ')),
+             (('MAIN', 'MLEFT', '⊥'), ('OFF', ['⊥'])),
+             (('MAIN', 'WRITE', '⊥'), ('CHECK', ['⊥'])),
+             (('CHECK', 'LEM', '⊥'), ('MAIN', ['⊥'])),
+             (('CHECK', 'SYMBOL', '⊥'), ('OFF', ['⊥'])),
+             (('CHECK', 'BLANK', '⊥'), ('OFF', ['⊥'])),
+             (('CHECK', 'MLEFT', '⊥'), ('OFF', ['⊥'])),
+             (('CHECK', 'MRIGHT', '⊥'), ('OFF', ['⊥']))]
+    counter_pda = PDA(['MAIN', 'CHECK', 'OFF'], SYMBOLS, ['⊥', '1'], delta,
+                      'MAIN', ['MAIN', 'CHECK'])
+    plain_pda = PDA(['MAIN', 'CHECK', 'OFF'], SYMBOLS, ['⊥', '1'], delta,
+                    'MAIN', ['MAIN', 'CHECK'])
+    assert counter_pda.compile_to_counter()
+
+    rng = random.Random(42)
+    for _ in range(200):
+        # Mostly to the right, so that some inputs stay on the tape
+        trace = rng.choices(SYMBOLS, [2, 3, 2, 1, 1, 2, 1],
+                            k=rng.randrange(80))
+        expected = configuration(plain_pda,
+                                 lambda run: run.transition_all(trace))
+        assert configuration(counter_pda,
+                             lambda run: run.transition_all_parallel(
+                                 trace, workers=1, chunks=7)) == expected
+
+
+def test_verify_parallel_matches_verify():
+    traces = read_traces()
+    traces.append([symbol for trace in traces[:10] for symbol in trace])
+    for trace in traces:
+        expected = verification.verify_steps(trace) and \
+            verification.verify_position(trace) and \
+            verification.verify_lem(trace)
+        assert verification.verify_parallel(trace, workers=1,
+                                            chunks=3) == expected
@@ -0,0 +1,126 @@
+"""
+TM and MultiTapeTM check the parts of a definition they share the same way
+(see TM.check_definition), and a MultiTapeTM converted to a single tape has
+the same runs on the tracks of its tape.
+"""
+
+import itertools
+import random
+
+import pytest
+
+from multitape import MultiTapeTM, split_tracks
+from TM import TM
+
+Q = ['s', 't', 'r']
+SIGMA = ['a']
+GAMMA = ['a', '⊔', '⊢']
+
+
+def construct_both(Q=Q, Sigma=SIGMA, Gamma=GAMMA, s='s', **options):
+    for construct in (lambda: TM(Q, Sigma, Gamma, [], s, 't', 'r',
+                                 **options),
+                      lambda: MultiTapeTM(Q, Sigma, Gamma, [], s, 't', 'r',
+                                          2, **options)):
+        with pytest.raises(SystemExit) as exit:
+            construct()
+        yield str(exit.value)
+
+
+@pytest.mark.parametrize('definition', [
+    {'Q': Q + ['s']},
+    {'s': 'q'},
+    {'Sigma': ['b']},
+    {'Gamma': ['a', '⊔']},
+    {'verbose_every': 0},
+])
+def test_both_reject_the_same_definitions(definition):
+    single, multi = construct_both(**definition)
+    assert single == multi
+
+
+def test_multitape_groups_transitions_by_state():
+    delta = [(('s', ['a', 'a']), ('t', ['a', 'a'], ['R', 'R'])),
+             (('t', ['a', 'a']), ('r', ['a', 'a'], ['L', 'L']))]
+    machine = MultiTapeTM(Q, SIGMA, GAMMA, delta, 's', 't', 'r', 2)
+    assert machine.states['s'].transition_table == \
+        {('a', 'a'): ('t', ('a', 'a'), ('R', 'R'))}
+    assert machine.states['t'].transition_table == \
+        {('a', 'a'): ('r', ('a', 'a'), ('L', 'L'))}
+    assert machine.states['r'].transition_table == {}
+
+
+def random_machine(rng, k, n, safe):
+    """
+    A MultiTapeTM with k tapes and n states besides 't' and 'r', with a
+    random transition for (almost) every state and symbols. A safe machine
+    never writes over or moves off the left endmarker.
+    """
+    states = ['q' + str(i) for i in range(n)] + ['t', 'r']
+    delta = []
+    for state in states[:n]:
+        for tape_symbols in itertools.product(GAMMA, repeat=k):
+            if not safe and rng.random() < 0.05:
+                continue
+            new_tape_symbols = []
+            movements = []
+            for symbol in tape_symbols:
+                if symbol == '⊢' and safe:
+                    new_tape_symbols.append('⊢')
+                    movements.append(rng.choice('RS'))
+                else:
+                    new_tape_symbols.append(rng.choice(GAMMA))
+                    movements.append(rng.choice('RLS'))
+            delta.append(((state, list(tape_symbols)),
+                          (rng.choice(states), new_tape_symbols, movements)))
+    return MultiTapeTM(states, SIGMA, GAMMA, delta, 'q0', 't', 'r', k,
+                       no_halt=60)
+
+
+def outcome(machine):
+    """ The verdict of a run, or the kind of error it stopped with """
+    try:
+        return machine.transition_all()
+    except SystemExit as error:
+        return str(error).split(':')[0]
+
+
+def without_blanks(tape):
+    """ A tape without the blanks at its end, which are not written """
+    tape = list(tape)
+    while tape[-1] == '⊔':
+        tape.pop()
+    return tape
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_single_tape_runs_like_multitape(seed):
+    rng = random.Random(seed)
+    for _ in range(25):
+        k = rng.randint(1, 3)
+        machine = random_machine(rng, k, 1 if k == 3 else rng.randint(1, 3),
+                                 rng.random() < 0.5)
+        single = machine.to_single_tape()
+        input_string = 'a' * rng.randint(0, 4)
+        machine.set_input(input_string)
+        single.set_input(input_string)
+
+        verdict = outcome(machine)
+        assert outcome(single) == verdict
+        if verdict in (True, False):
+            tapes = split_tracks(single.get_tape_contents(), k)
+            for j in range(k):
+                assert without_blanks(tapes[j]) == \
+                    without_blanks(machine.get_tape_contents(j))
+
+
+def test_staying_in_place_is_traced_as_equals():
+    delta = [(('s', ['⊢', '⊢']), ('s', ['⊢', '⊢'], ['R', 'S'])),
+             (('s', ['a', '⊢']), ('t', ['a', '⊢'], ['S', 'R']))]
+    machine = MultiTapeTM(Q, SIGMA, GAMMA, delta, 's', 't', 'r', 2)
+    machine.set_input('a')
+    assert machine.transition_all()
+    assert machine.get_execution_trace(0) == '- ⊢ + ⊢ > - a + a ='
+    assert machine.get_execution_trace(1) == '- ⊢ + ⊢ = - ⊢ + ⊢ >'
+    assert machine.get_execution_trace() == \
+        '- ⊢ + ⊢ > | - ⊢ + ⊢ = - a + a = | - ⊢ + ⊢ >'
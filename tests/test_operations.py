@@ -0,0 +1,122 @@
+"""
+The equivalence and inclusion checks agree with enumerating all short words
+on small random automata, and their counterexamples separate the languages.
+"""
+
+import itertools
+import random
+
+import pytest
+
+from FA import FA
+from NFA import NFA
+import operations
+
+SIGMA = ['a', 'b']
+
+# Longer than the shortest word which separates the random automata
+WORD_LENGTH = 8
+
+
+def random_fa(rng):
+    """ A random FA with up to three states and some missing transitions """
+    Q = ['q' + str(i) for i in range(rng.randint(1, 3))]
+    delta = {}
+    for state in Q:
+        for symbol in SIGMA:
+            if rng.random() < 0.8:
+                delta.setdefault(state, {})[symbol] = rng.choice(Q)
+    F = [state for state in Q if rng.random() < 0.5]
+    return FA(Q, SIGMA, delta, Q[0], F)
+
+
+def doubled(fa):
+    """
+    An FA with the same language as 'fa' and twice as many states, which
+    alternate between two copies of every state
+    """
+    Q = [state + copy for state in fa.states for copy in "'\""]
+    delta = {}
+    for name, state in fa.states.items():
+        for copy, other in ["'\"", "\"'"]:
+            if state.transition_table:
+                delta[name + copy] = dict(
+                    (symbol, next_state + other)
+                    for symbol, next_state in state.transition_table.items())
+    F = [state.name + copy for state in fa.final_states for copy in "'\""]
+    return FA(Q, SIGMA, delta, fa.start_state.name + "'", F)
+
+
+def union(first, second):
+    """ An NFA for the union of the languages of two FAs """
+    Q = ['s']
+    delta = {'s': {'ϵ': []}}
+    F = []
+    for tag, fa in [('1', first), ('2', second)]:
+        Q += [tag + name for name in fa.states]
+        delta['s']['ϵ'].append(tag + fa.start_state.name)
+        for name, state in fa.states.items():
+            if state.transition_table:
+                delta[tag + name] = dict(
+                    (symbol, tag + next_state)
+                    for symbol, next_state in state.transition_table.items())
+        F += [tag + state.name for state in fa.final_states]
+    return NFA(Q, SIGMA, delta, 's', F)
+
+
+def accepts(machine, word):
+    machine.reset()
+    return machine.transition_all(list(word)) and machine.is_final()
+
+
+def words():
+    for n in range(WORD_LENGTH + 1):
+        for word in itertools.product(SIGMA, repeat=n):
+            yield list(word)
+
+
+def random_pairs(seed):
+    """ Pairs of automata, some of which are equivalent or included """
+    rng = random.Random(seed)
+    for _ in range(40):
+        first = random_fa(rng)
+        second = random_fa(rng)
+        yield first, second
+        yield first, doubled(first)
+        yield first, union(first, second)
+        yield union(first, second), second
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_equivalence_matches_enumeration(seed):
+    for first, second in random_pairs(seed):
+        word = operations.counterexample(first, second)
+        if word is None:
+            for other in words():
+                assert accepts(first, other) == accepts(second, other)
+        else:
+            assert accepts(first, word) != accepts(second, word)
+        assert operations.equivalent(first, second) == (word is None)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_inclusion_matches_enumeration(seed):
+    for first, second in random_pairs(seed):
+        shortest = next((word for word in words() if accepts(first, word) and
+                         not accepts(second, word)), None)
+        word = operations.inclusion_counterexample(first, second)
+        if shortest is None:
+            assert word is None
+        else:
+            assert word is not None and len(word) == len(shortest)
+            assert accepts(first, word) and not accepts(second, word)
+        assert operations.is_included(first, second) == (word is None)
+
+
+def test_doubled_and_union_are_related():
+    rng = random.Random(0)
+    first = random_fa(rng)
+    second = random_fa(rng)
+    assert operations.equivalent(first, doubled(first))
+    assert operations.is_included(first, union(first, second))
+    assert operations.is_included(second, union(first, second))
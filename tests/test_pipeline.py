@@ -0,0 +1,21 @@
+"""
+The fused pipeline only decodes traces which pass every check, so a trace in
+which the head leaves the tape is not valid rather than an error.
+"""
+
+import pipeline
+
+OFF_TAPE = '- ⊔ + 0 < - 0 + 0 < - ⊔ + ⊔ >'
+VALID = '- ⊢ + ⊢ > - 0 + 1 > - 1 + 0 > - ⊔ + ⊔ <'
+
+
+def test_off_tape_trace_is_not_valid():
+    assert pipeline.TracePipeline().process(OFF_TAPE) == (False, None, None)
+
+
+def test_off_tape_trace_does_not_stop_the_lines():
+    results = list(pipeline.TracePipeline().process_lines(
+        [VALID + '\n', OFF_TAPE + '\n', VALID]))
+    assert results[0] == (True, '01', '10')
+    assert results[1] == (False, None, None)
+    assert results[2] == results[0]
@@ -0,0 +1,102 @@
+"""
+Regular expressions compile to FAs which accept exactly the strings that
+Python's re module matches, and the generated tmtrace lexer splits traces
+into the same tokens as the hand-written FA lexer.
+"""
+
+import itertools
+import os
+import random
+import re
+
+import pytest
+
+import regex
+import tmtrace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ALPHABET = 'ab+'
+
+
+def random_pattern(rng, depth=3):
+    """ A random regular expression over ALPHABET in the supported syntax """
+    kind = rng.choice(['char', 'class', 'group', 'concat', 'union',
+                       'repeat'] if depth > 0 else ['char', 'class'])
+    if kind == 'char':
+        return rng.choice(['a', 'b', '\\+'])
+    if kind == 'class':
+        return rng.choice(['[ab]', '[a+]', '[a-b]', '[b]'])
+    if kind == 'group':
+        return '(' + random_pattern(rng, depth - 1) + ')'
+    if kind == 'concat':
+        return random_pattern(rng, depth - 1) + random_pattern(rng, depth - 1)
+    if kind == 'union':
+        return random_pattern(rng, depth - 1) + '|' + \
+            random_pattern(rng, depth - 1)
+    return '(' + random_pattern(rng, depth - 1) + ')' + rng.choice('*+?')
+
+
+def words(length):
+    """ All strings over ALPHABET of at most 'length' characters """
+    for n in range(length + 1):
+        for word in itertools.product(ALPHABET, repeat=n):
+            yield ''.join(word)
+
+
+def accepts(fa, word):
+    fa.reset()
+    return fa.transition_all(list(word)) and fa.is_final()
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_compile_regex_matches_re(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        pattern = random_pattern(rng)
+        fa = regex.compile_regex(pattern)
+        for word in words(5):
+            assert accepts(fa, word) == \
+                (re.fullmatch(pattern, word) is not None), (pattern, word)
+
+
+def test_lexer_takes_the_longest_match_of_the_first_rule():
+    lexer = regex.Lexer([('A', 'a'), ('AB', 'ab'), ('AS', 'a+'),
+                         ('B', 'b|ba')])
+    assert lexer.tokenize('aaba') == [('aa', 'AS'), ('ba', 'B')]
+    assert lexer.tokenize('aba') == [('ab', 'AB'), ('a', 'A')]
+    assert lexer.tokenize_prefix('abaa') == ([('ab', 'AB')], 'aa')
+
+
+def old_tokens(trace):
+    """ The tokens of the hand-written lexer, or None if it rejects """
+    try:
+        return tmtrace.lexer(tmtrace.create_fa(), trace)
+    except SystemExit:
+        return None
+
+
+def new_tokens(trace):
+    """ The tokens of the generated lexer, or None if it rejects """
+    try:
+        return tmtrace.create_lexer().tokenize(trace)
+    except SystemExit:
+        return None
+
+
+def test_lexer_matches_fa_lexer_on_tmtraces():
+    with open(os.path.join(ROOT, 'PO1', 'tmtraces.txt'),
+              encoding='utf-8') as f:
+        traces = f.read().splitlines()
+    assert traces
+    for trace in traces:
+        assert new_tokens(trace) == old_tokens(trace) is not None
+
+
+def test_lexer_matches_fa_lexer_on_random_traces():
+    rng = random.Random(0)
+    characters = ' <>-+⊔⊢aZ09'
+    for _ in range(500):
+        trace = ''.join(rng.choice(characters + '.' * (rng.random() < 0.1))
+                        for _ in range(rng.randint(0, 20)))
+        assert new_tokens(trace) == old_tokens(trace)
@@ -0,0 +1,28 @@
+"""
+The input of a trace ends at the first blank the head reads, and the output
+is the tape without the blanks at its end.
+"""
+
+import pytest
+
+import reverse
+import tmtrace
+
+
+def tokens(trace):
+    return [token for _, token in tmtrace.create_lexer().iter_tokens(trace)
+            if token != 'SPACE']
+
+
+@pytest.mark.parametrize('trace, inputstring, outputstring', [
+    ('- ⊢ + ⊢ > - 0 + 1 > - 1 + 0 > - ⊔ + ⊔ <', '01', '10'),
+    ('- ⊢ + ⊢ > - ⊔ + 0 <', '', '0'),
+    ('- ⊢ + ⊢ > - 1 + ⊔ > - ⊔ + 0 >', '1', '⊔0'),
+    ('- ⊢ + ⊢ > - 1 + 1 > - ⊔ + ⊔ > - 0 + 0 <', '1', '1⊔0'),
+    ('- ⊢ + ⊢ > - 1 + 1 > - ⊔ + ⊔ <', '1', '1'),
+])
+def test_input_ends_at_the_first_blank(trace, inputstring, outputstring):
+    assert reverse.extract_input(trace, tokens(trace)) == inputstring
+    assert reverse.extract_output(trace, tokens(trace)) == outputstring
+    assert reverse.decode_trace(trace, tokens(trace))[:2] == \
+        (inputstring, outputstring)
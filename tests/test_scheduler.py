@@ -0,0 +1,49 @@
+"""
+The scheduler preempts runs within a slice when the time of a call runs out,
+and keeps the step limit of a run apart from the limit of its machine.
+"""
+
+import time
+
+from multitape import MultiTapeTM
+from scheduler import Scheduler
+from TM import TM
+
+Q = ['s', 't', 'r']
+GAMMA = ['a', '⊔', '⊢']
+
+
+def looping_tm(no_halt):
+    """ A TM which moves back and forth over the left endmarker forever """
+    delta = [(('s', '⊢'), ('s', '⊢', 'R')),
+             (('s', 'a'), ('s', 'a', 'L')),
+             (('s', '⊔'), ('s', '⊔', 'L'))]
+    return TM(Q, ['a'], GAMMA, delta, 's', 't', 'r', no_halt=no_halt)
+
+
+def test_calls_stop_at_their_deadline():
+    scheduler = Scheduler()
+    scheduler.add('loop', looping_tm(10**12), 'a')
+    for _ in range(30):
+        start = time.perf_counter()
+        assert list(scheduler.run(seconds=0.01)) == []
+        assert time.perf_counter() - start < 0.5
+    assert len(scheduler) == 1
+
+
+def test_steps_do_not_change_the_machine():
+    delta = [(('s', ['⊢']), ('s', ['⊢'], ['R'])),
+             (('s', ['a']), ('s', ['a'], ['L']))]
+    machine = MultiTapeTM(Q, ['a'], GAMMA, delta, 's', 't', 'r', 1,
+                          no_halt=10**6)
+    scheduler = Scheduler()
+    scheduler.add('loop', machine, 'a', steps=100)
+    assert [verdict for _, verdict, _ in scheduler.run()] == ['loop']
+    assert machine.max_steps == 10**6
+
+
+def test_steps_beyond_the_machine_limit():
+    scheduler = Scheduler()
+    run = scheduler.add('loop', looping_tm(100), 'a', steps=1000)
+    assert [verdict for _, verdict, _ in scheduler.run()] == ['loop']
+    assert run.step_counter == 1001
@@ -0,0 +1,74 @@
+"""
+A connection to the verification service answers every trace, also traces
+which are too long, not UTF-8 or fail in the pipeline, and keeps serving
+the traces after them.
+"""
+
+import asyncio
+import json
+import os
+
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def exchange(path, data, line_limit):
+    """
+    Send 'data' to a service with the given line limit on a UNIX socket
+    returns: The responses, one per line
+    """
+    task = asyncio.ensure_future(server.serve(path, line_limit=line_limit))
+    while not os.path.exists(path):
+        await asyncio.sleep(0.01)
+    try:
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(data)
+        writer.write_eof()
+        responses = [json.loads(line) for line in
+                     (await reader.read()).splitlines()]
+        writer.close()
+        return responses
+    finally:
+        task.cancel()
+
+
+def test_unreadable_traces_get_an_error(tmp_path):
+    with open(os.path.join(ROOT, 'PO2', 'original_traces.txt'), 'rb') as f:
+        trace = f.readline()
+    line_limit = 4 * len(trace)
+    data = (trace + b'- ' * line_limit + b'\n' + trace +
+            b'\xff\xfe\n' + trace.rstrip(b'\n'))
+
+    responses = asyncio.run(exchange(str(tmp_path / 'traces.sock'), data,
+                                     line_limit))
+
+    assert len(responses) == 5
+    assert 'valid' in responses[0]
+    assert 'longer than' in responses[1]['error']
+    assert responses[2] == responses[0]
+    assert 'UTF-8' in responses[3]['error']
+    assert responses[4] == responses[0]
+
+
+def test_failing_trace_gets_an_error(tmp_path, monkeypatch):
+    off_tape = '- ⊔ + 0 < - 0 + 0 < - ⊔ + ⊔ >'
+    process = server.pipeline.TracePipeline.process
+
+    def fail_off_tape(self, trace):
+        if trace == off_tape:
+            raise IndexError('list assignment index out of range')
+        return process(self, trace)
+
+    monkeypatch.setattr(server.pipeline.TracePipeline, 'process',
+                        fail_off_tape)
+    valid = '- ⊢ + ⊢ > - 0 + 1 > - 1 + 0 > - ⊔ + ⊔ <'
+    data = '\n'.join([valid, off_tape, valid, '']).encode('utf-8')
+
+    responses = asyncio.run(exchange(str(tmp_path / 'traces.sock'), data,
+                                     server.LINE_LIMIT))
+
+    assert len(responses) == 3
+    assert responses[0] == {'valid': True, 'input': '01', 'output': '10'}
+    assert responses[1]['error'].startswith('IndexError')
+    assert responses[2] == responses[0]
@@ -0,0 +1,63 @@
+"""
+PO2 and PO3 are also handed in on their own, so the PDA and TM engines work
+without PO1: automata are then not cached, their compiled code is not shared
+and bounded PDAs are not compiled to FAs.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bounded
+import PDA
+import TM
+import verification
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('directory, code', [
+    ('PO2', "import PDA; assert PDA.engine is None"),
+    ('PO3', "import TM, multitape, reverse, scheduler;"
+            " assert TM.engine is None"),
+])
+def test_imports_without_po1(directory, code):
+    environment = dict(os.environ)
+    environment.pop('PYTHONPATH', None)
+    subprocess.run([sys.executable, '-c', code], check=True,
+                   cwd=os.path.join(ROOT, directory), env=environment)
+
+
+def test_bounded_pda_without_fa(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'FA', None)
+    monkeypatch.setattr(bounded, 'compiled', {})
+    pda = verification.create_steps_pda()
+    assert bounded.compile_to_fa(pda, False) is None
+    assert not pda.compile_to_fa()
+
+    verification.compile_bounded(pda)
+    assert pda.compiled is not None
+    pda.transition_all(['READ', 'LEM', 'WRITE', 'LEM', 'MRIGHT'])
+    assert pda.is_accepting()
+
+
+def test_engines_without_engine(monkeypatch):
+    monkeypatch.setattr(PDA, 'engine', None)
+    monkeypatch.setattr(TM, 'engine', None)
+
+    pda = PDA.PDA.cached(['q'], ['a'], ['⊥'],
+                         [(('q', 'a', '⊥'), ('q', ['⊥']))], 'q', ['q'])
+    pda.compile_to_python()
+    pda.transition_all(['a', 'a'])
+    assert pda.is_accepting()
+
+    tm = TM.TM.cached(['s', 't', 'r'], ['a'], ['a', '⊔', '⊢'],
+                      [(('s', '⊢'), ('s', '⊢', 'R')),
+                       (('s', 'a'), ('s', 'a', 'R')),
+                       (('s', '⊔'), ('t', '⊔', 'L'))], 's', 't', 'r')
+    tm.compile_to_python()
+    tm.set_input('aa')
+    tm.transition_all()
+    assert tm.current_state == tm.accept_state
@@ -0,0 +1,31 @@
+"""
+Verdicts are cached by the tokens of a trace, so the same trace with other
+whitespace is verified only once.
+"""
+
+import verification
+
+
+def test_whitespace_does_not_change_the_key():
+    cache = verification.VerdictCache()
+    trace = 'READ LEM WRITE LEM MRIGHT'
+    assert cache.key(trace.split()) == \
+        cache.key(' READ  LEM\tWRITE LEM MRIGHT \r'.split())
+    assert cache.key(trace.split()) != cache.key('READ LEM'.split())
+
+
+def test_main_verifies_respaced_traces_once(tmp_path, capsys,
+                                            monkeypatch):
+    path = tmp_path / 'traces.txt'
+    path.write_text('READ LEM WRITE LEM MRIGHT\n'
+                    'READ  LEM WRITE LEM   MRIGHT \n', encoding='utf-8')
+    verified = []
+    verify_steps = verification.verify_steps
+    monkeypatch.setattr(verification, 'verify_steps', lambda trace: (
+        verified.append(trace), verify_steps(trace))[1])
+
+    verification.main(str(path), verification.VerdictCache())
+
+    assert len(verified) == 1
+    assert capsys.readouterr().out.splitlines() == \
+        [str('READ LEM WRITE LEM MRIGHT'.split())] * 2